@@ -0,0 +1,318 @@
+import bisect
+import heapq
+import json
+import threading
+from array import array
+
+# Коды типов действий (колонка kind)
+KIND_MOUSE_MOVE = 0
+KIND_MOUSE_PRESS = 1
+KIND_MOUSE_RELEASE = 2
+KIND_MOUSE_SCROLL = 3
+KIND_KEY_PRESS = 4
+KIND_KEY_RELEASE = 5
+
+KIND_NAMES = {
+    KIND_MOUSE_MOVE: 'mouse_move',
+    KIND_MOUSE_PRESS: 'mouse_click',
+    KIND_MOUSE_RELEASE: 'mouse_click',
+    KIND_MOUSE_SCROLL: 'mouse_scroll',
+    KIND_KEY_PRESS: 'key_press',
+    KIND_KEY_RELEASE: 'key_release',
+}
+
+# Код для строк, которых нет (движение мыши, прокрутка)
+NO_NAME = -1
+
+# Размер порции при потоковом чтении колонок
+CHUNK_SIZE = 4096
+
+# Сколько событий может "обогнать" соседей при записи из разных потоков слушателей
+REORDER_WINDOW = 64
+
+# Колонки и их типы array/memoryview (порядок важен для формата .clk v2)
+COLUMNS = ('timestamps', 'xs', 'ys', 'dxs', 'dys', 'codes', 'kinds')
+COLUMN_TYPES = {
+    'timestamps': 'd',
+    'xs': 'i',
+    'ys': 'i',
+    'dxs': 'i',
+    'dys': 'i',
+    'codes': 'i',
+    'kinds': 'B',
+}
+
+
+class ActionColumns:
+    """
+    Общий интерфейс чтения колонок действий.
+
+    Наследник должен предоставить колонки timestamps, kinds, xs, ys, dxs, dys,
+    codes (любые последовательности: array, memoryview), таблицу строк names,
+    а также max_timestamp, is_sorted и meta (метаданные для заголовка файла).
+    """
+
+    def row(self, index):
+        """Возвращает действие как кортеж (timestamp, kind, x, y, dx, dy, code)"""
+        return (self.timestamps[index], self.kinds[index], self.xs[index], self.ys[index],
+                self.dxs[index], self.dys[index], self.codes[index])
+
+    def name(self, code):
+        return self.names[code] if code != NO_NAME else None
+
+    def action_dict(self, index):
+        """Строит словарь действия в формате старого Recorder"""
+        kind = self.kinds[index]
+        action = {'type': KIND_NAMES[kind], 'timestamp': self.timestamps[index]}
+        if kind in (KIND_KEY_PRESS, KIND_KEY_RELEASE):
+            action['key'] = self.names[self.codes[index]]
+            return action
+        action['x'] = self.xs[index]
+        action['y'] = self.ys[index]
+        if kind == KIND_MOUSE_SCROLL:
+            action['dx'] = self.dxs[index]
+            action['dy'] = self.dys[index]
+        elif kind != KIND_MOUSE_MOVE:
+            action['button'] = self.names[self.codes[index]]
+            action['pressed'] = kind == KIND_MOUSE_PRESS
+        return action
+
+    def to_list(self):
+        return [self.action_dict(i) for i in range(len(self))]
+
+    def iter_rows(self, chunk_size=CHUNK_SIZE, start=0):
+        """
+        Потоково отдает строки (timestamp, kind, x, y, dx, dy, code), начиная со строки start.
+
+        Колонки читаются порциями; длина перечитывается перед каждой порцией,
+        поэтому итерация по "живому" буферу подхватывает новые события.
+        """
+        while start < len(self):
+            end = min(start + chunk_size, len(self))
+            yield from zip(self.timestamps[start:end], self.kinds[start:end],
+                           self.xs[start:end], self.ys[start:end],
+                           self.dxs[start:end], self.dys[start:end], self.codes[start:end])
+            start = end
+
+    def index_at(self, timestamp):
+        """Индекс первой строки с меткой не меньше timestamp (двоичный поиск, запись упорядочена)"""
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def dump_json(self, f, chunk_size=4096):
+        """Пишет буфер в старом JSON формате порциями, не строя весь список словарей"""
+        f.write('[')
+        count = len(self)
+        for start in range(0, count, chunk_size):
+            end = min(start + chunk_size, count)
+            if start:
+                f.write(', ')
+            f.write(', '.join(json.dumps(self.action_dict(i)) for i in range(start, end)))
+        f.write(']')
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __bool__(self):
+        return len(self.timestamps) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.action_dict(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("action index out of range")
+        return self.action_dict(index)
+
+    def __iter__(self):
+        # Длину фиксируем заранее: буфер может пополняться во время итерации
+        for i in range(len(self)):
+            yield self.action_dict(i)
+
+    def nbytes(self):
+        """Приблизительный объем памяти, занятый колонками"""
+        return sum(col.itemsize * len(col) for col in (
+            self.timestamps, self.kinds, self.xs, self.ys, self.dxs, self.dys, self.codes))
+
+    def to_buffer(self):
+        """Копирует колонки в новый ActionBuffer (например, чтобы отпустить отображенный файл)"""
+        buffer = ActionBuffer()
+        for name in COLUMNS:
+            getattr(buffer, name).frombytes(memoryview(getattr(self, name)).cast('B'))
+        for name in self.names:
+            buffer.intern(name)
+        buffer.max_timestamp = self.max_timestamp
+        buffer.is_sorted = self.is_sorted
+        buffer.meta = dict(self.meta)
+        return buffer
+
+    def close(self):
+        """Освобождает ресурсы источника (для буфера в памяти ничего не делает)"""
+        pass
+
+
+class ActionBuffer(ActionColumns):
+    """
+    Колоночное хранилище записанных действий.
+
+    Каждое действие занимает одну строку в типизированных колонках
+    (array), а имена клавиш и кнопок хранятся один раз в таблице строк.
+    Для старого кода оставлен словарный вид: индексация и итерация
+    возвращают словари того же формата, что писал Recorder.
+    """
+
+    def __init__(self):
+        for name in COLUMNS:
+            setattr(self, name, array(COLUMN_TYPES[name]))
+        self.names = []          # Таблица строк: код -> имя клавиши/кнопки
+        self._name_codes = {}    # Обратная таблица: имя -> код
+        self.max_timestamp = 0.0
+        self.is_sorted = True    # Сбрасывается при первой вставке "из прошлого"
+        self.meta = {}
+        # Несколько потоков слушателей пишут в один буфер, строка должна добавляться целиком
+        self._lock = threading.Lock()
+
+    # --- Таблица строк ---
+
+    def intern(self, name):
+        """Возвращает код строки, добавляя её в таблицу при необходимости"""
+        code = self._name_codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._name_codes.get(name)
+                if code is None:
+                    code = len(self.names)
+                    self.names.append(name)
+                    self._name_codes[name] = code
+        return code
+
+    # --- Добавление ---
+
+    def append_row(self, timestamp, kind, x=0, y=0, dx=0, dy=0, code=NO_NAME):
+        """Добавляет одно действие в колонки и возвращает его индекс"""
+        with self._lock:
+            if self.timestamps and timestamp < self.timestamps[-1]:
+                self.is_sorted = False
+            self.timestamps.append(timestamp)
+            self.kinds.append(kind)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.dxs.append(dx)
+            self.dys.append(dy)
+            self.codes.append(code)
+            if timestamp > self.max_timestamp:
+                self.max_timestamp = timestamp
+            return len(self.timestamps) - 1
+
+    # Координаты приводятся к int: на некоторых платформах pynput отдает float
+
+    def append_move(self, timestamp, x, y):
+        return self.append_row(timestamp, KIND_MOUSE_MOVE, int(x), int(y))
+
+    def append_click(self, timestamp, x, y, button, pressed):
+        kind = KIND_MOUSE_PRESS if pressed else KIND_MOUSE_RELEASE
+        return self.append_row(timestamp, kind, int(x), int(y), code=self.intern(button))
+
+    def append_scroll(self, timestamp, x, y, dx, dy):
+        return self.append_row(timestamp, KIND_MOUSE_SCROLL, int(x), int(y), int(dx), int(dy))
+
+    def append_key(self, timestamp, key, pressed):
+        kind = KIND_KEY_PRESS if pressed else KIND_KEY_RELEASE
+        return self.append_row(timestamp, kind, code=self.intern(key))
+
+    def append(self, action):
+        """Добавляет действие в старом словарном формате"""
+        action_type = action['type']
+        timestamp = action.get('timestamp', 0)
+
+        if action_type == 'mouse_move':
+            self.append_move(timestamp, action['x'], action['y'])
+        elif action_type == 'mouse_click':
+            self.append_click(timestamp, action['x'], action['y'],
+                              action['button'], action['pressed'])
+        elif action_type == 'mouse_scroll':
+            self.append_scroll(timestamp, action['x'], action['y'],
+                               action['dx'], action['dy'])
+        elif action_type in ('key_press', 'key_release'):
+            self.append_key(timestamp, action['key'], action_type == 'key_press')
+        else:
+            raise ValueError(f"Неизвестный тип действия: {action_type}")
+
+    def extend(self, actions):
+        for action in actions:
+            self.append(action)
+
+    @classmethod
+    def from_actions(cls, actions):
+        """Создает буфер из списка словарей (старый формат .clk)"""
+        buffer = cls()
+        buffer.extend(actions)
+        return buffer
+
+    @classmethod
+    def from_source(cls, source):
+        """Копирует в память любой источник строк (например, StreamedActions)"""
+        buffer = cls()
+        for name in source.names:
+            buffer.intern(name)
+        for row in source.iter_rows():
+            buffer.append_row(*row)
+        buffer.meta = dict(source.meta)
+        return buffer
+
+    @classmethod
+    def coerce(cls, actions):
+        """Возвращает actions как источник строк, конвертируя список словарей при необходимости"""
+        if hasattr(actions, 'iter_rows'):
+            return actions
+        buffer = cls.from_actions(actions)
+        buffer.sort()
+        return buffer
+
+    def sort(self):
+        """Упорядочивает действия по времени (один раз; для упорядоченного буфера ничего не делает)"""
+        with self._lock:
+            if self.is_sorted:
+                return
+            order = sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__)
+            for name in COLUMNS:
+                column = getattr(self, name)
+                setattr(self, name, array(column.typecode, (column[i] for i in order)))
+            self.is_sorted = True
+
+
+def reorder(rows, window=REORDER_WINDOW, stats=None):
+    """
+    Восстанавливает порядок по времени в потоке строк с ограниченным окном.
+
+    Слушатели мыши и клавиатуры работают в разных потоках, поэтому событие
+    изредка попадает в буфер чуть позже соседа с большей меткой времени.
+    Окно из window строк (куча) исправляет такие перестановки без сортировки
+    всего потока. Строка, опоздавшая сильнее окна, отдается сразу же
+    (её метка меньше уже выданной) и учитывается в stats['late'].
+    """
+    heap = []
+    sequence = 0 # Для стабильности при равных метках времени
+    last_timestamp = None
+    for row in rows:
+        heapq.heappush(heap, (row[0], sequence, row))
+        sequence += 1
+        if len(heap) <= window:
+            continue
+        timestamp, _, ready = heapq.heappop(heap)
+        if last_timestamp is not None and timestamp < last_timestamp:
+            if stats is not None:
+                stats['late'] = stats.get('late', 0) + 1
+        else:
+            last_timestamp = timestamp
+        yield ready
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def ordered_rows(source, window=REORDER_WINDOW, stats=None):
+    """Строки источника по возрастанию времени: упорядоченный источник отдается как есть"""
+    rows = source.iter_rows()
+    if source.is_sorted:
+        return rows
+    return reorder(rows, window, stats)
@@ -0,0 +1,229 @@
+"""
+Журнал сообщений с уровнями и фоновой записью.
+
+print() в цикле воспроизведения и в путях расписания пишет синхронно:
+форматирует строку и ждет консоль (в оконной сборке PyInstaller консоли
+нет вовсе, и вывод - чистые накладные расходы). Здесь вызов журнала только
+сравнивает уровень и кладет кортеж (время, уровень, источник, шаблон,
+аргументы) в кольцо - deque(maxlen=capacity), append и popleft которого
+атомарны в CPython, поэтому пишущие потоки не берут блокировок.
+Форматирование и вывод делает фоновый поток-писатель. Пустое кольцо он
+ждет без таймаута (в простое не просыпается): первое сообщение будит его,
+и он собирает пачку еще FLUSH_INTERVAL, а сразу - на WARNING и выше или
+когда кольцо наполовину полно. Пробуждения считаются в wakeups.
+
+Сообщение ниже порога стоит одного сравнения; в горячих циклах уровень
+проверяется один раз до цикла (Logger.enabled), и тогда отключенный
+вызов не стоит ничего. Шаблоны - в стиле str.format, аргументы
+форматируются писателем: "Повторение {}/{}".
+
+Если писатель не успевает и кольцо переполнено, самые старые сообщения
+вытесняются (dropped). Вывод - в sys.stdout (в формате "[Источник] текст",
+как раньше print) и, если задан, в файл с отметкой времени и уровнем;
+файл больше max_bytes переименовывается в .1.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {level: name.upper() for name, level in LEVELS.items()}
+
+# Сколько сообщений может ждать писателя
+DEFAULT_CAPACITY = 1 << 14
+
+# Как часто писатель разбирает кольцо, секунд
+FLUSH_INTERVAL = 0.25
+
+# Размер файла журнала, после которого он переименовывается в .1
+DEFAULT_MAX_BYTES = 1 << 20
+
+
+class LogWriter:
+    """
+    Кольцо сообщений и фоновый поток, который их форматирует и выводит.
+
+    :param level: Порог: сообщения ниже не попадают в кольцо
+    :param stream: Выводить в sys.stdout (берется в момент записи)
+    :param path: Файл журнала (None - без файла)
+    """
+
+    def __init__(self, level=INFO, stream=True, path=None, capacity=DEFAULT_CAPACITY,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.level = level
+        self.stream = stream
+        self.path = path
+        self.max_bytes = max_bytes
+        self._ring = deque(maxlen=capacity)
+        self._wake_size = capacity // 2 # Кольцо наполовину полно - писатель будится, не дожидаясь интервала
+        self.emitted = 0 # Попало в кольцо
+        self.written = 0 # Выведено писателем
+        self.wakeups = 0 # Пробуждений писателя
+        self._pending = False # Писатель уже разбужен и разберет кольцо
+        self._urgent = False  # Разобрать, не дожидаясь FLUSH_INTERVAL
+        self._wake = threading.Event()
+        self._flushed = threading.Condition()
+        self._thread = None
+        self._file = None
+
+    @property
+    def dropped(self):
+        """Сообщений, вытесненных из переполненного кольца"""
+        return self.emitted - self.written - len(self._ring)
+
+    def emit(self, level, source, template, args):
+        """Кладет сообщение в кольцо (из любого потока)"""
+        self._ring.append((time.time(), level, source, template, args))
+        self.emitted += 1 # Счетчик без блокировки: неточен при гонке, но только для диагностики
+        if self._thread is None:
+            self._start()
+        if level >= WARNING or len(self._ring) > self._wake_size:
+            self._urgent = True
+            self._wake.set()
+        elif not self._pending:
+            self._pending = True
+            self._wake.set()
+
+    def _start(self):
+        with self._flushed:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait() # Без таймаута: пока сообщений нет, поток спит
+            self._wake.clear()
+            if not self._urgent:
+                # Собираем пачку; срочное сообщение или flush() будят раньше
+                self._wake.wait(FLUSH_INTERVAL)
+                self._wake.clear()
+            self.wakeups += 1
+            # Флаги сбрасываются до разбора: сообщение, пришедшее во время него, разбудит снова
+            self._urgent = False
+            self._pending = False
+            self._drain()
+
+    def _drain(self):
+        # Под блокировкой целиком, чтобы flush не принял за готовое кольцо,
+        # уже разобранное, но еще не выведенное (пишущие потоки ее не берут)
+        with self._flushed:
+            ring = self._ring
+            lines = []
+            while ring:
+                try:
+                    created, level, source, template, args = ring.popleft()
+                except IndexError:
+                    break
+                try:
+                    text = template.format(*args) if args else template
+                except Exception as e: # Ошибка в шаблоне не должна останавливать писатель
+                    text = f"{template!r} {args!r} ({e})"
+                lines.append((created, level, f"[{source}] {text}"))
+            if lines:
+                self._write(lines)
+            self.written += len(lines)
+            self._flushed.notify_all()
+
+    def _write(self, lines):
+        stream = sys.stdout if self.stream else None
+        if stream is not None: # В оконной сборке PyInstaller sys.stdout - None
+            try:
+                stream.write("".join(line + "\n" for _created, _level, line in lines))
+                stream.flush()
+            except (OSError, ValueError):
+                pass # Консоль закрыта
+        if self.path:
+            try:
+                self._write_file(lines)
+            except OSError:
+                self.path = None # Файл недоступен: дальше только консоль
+
+    def _write_file(self, lines):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for created, level, line in lines:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))
+            self._file.write(f"{stamp}.{int(created % 1 * 1000):03d} {LEVEL_NAMES.get(level, level)} {line}\n")
+        self._file.flush()
+        if self._file.tell() > self.max_bytes:
+            self._file.close()
+            self._file = None
+            os.replace(self.path, self.path + '.1')
+
+    def flush(self, timeout=1.0):
+        """Ждет, пока писатель выведет всё, что уже лежит в кольце"""
+        if self._thread is None or not self._ring:
+            return
+        with self._flushed:
+            self._urgent = True
+            self._wake.set()
+            self._flushed.wait_for(lambda: not self._ring, timeout)
+
+
+class Logger:
+    """Источник сообщений ("Player", "Scheduler", ...) поверх общего LogWriter"""
+
+    def __init__(self, source, writer):
+        self.source = source
+        self.writer = writer
+
+    def enabled(self, level):
+        """Пройдет ли сообщение уровня level (проверять один раз до горячего цикла)"""
+        return level >= self.writer.level
+
+    def log(self, level, template, *args):
+        if level >= self.writer.level:
+            self.writer.emit(level, self.source, template, args)
+
+    def debug(self, template, *args):
+        if DEBUG >= self.writer.level:
+            self.writer.emit(DEBUG, self.source, template, args)
+
+    def info(self, template, *args):
+        if INFO >= self.writer.level:
+            self.writer.emit(INFO, self.source, template, args)
+
+    def warning(self, template, *args):
+        if WARNING >= self.writer.level:
+            self.writer.emit(WARNING, self.source, template, args)
+
+    def error(self, template, *args):
+        if ERROR >= self.writer.level:
+            self.writer.emit(ERROR, self.source, template, args)
+
+
+writer = LogWriter()
+atexit.register(writer.flush)
+
+
+def get_logger(source):
+    return Logger(source, writer)
+
+
+def configure(level=None, stream=None, path=None):
+    """Меняет порог (DEBUG..ERROR или имя), вывод в консоль и файл журнала ('' - без файла)"""
+    if isinstance(level, str):
+        level = LEVELS[level.lower()]
+    if level is not None:
+        writer.level = level
+    if stream is not None:
+        writer.stream = stream
+    if path is not None:
+        with writer._flushed: # Не посреди записи писателем
+            if writer._file is not None:
+                writer._file.close()
+                writer._file = None
+            writer.path = path or None
+
+
+def flush(timeout=1.0):
+    writer.flush(timeout)
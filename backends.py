@@ -0,0 +1,449 @@
+"""
+Бэкенды ввода для Player.
+
+Player не обращается к pynput или Win32 напрямую, а вызывает методы
+InputBackend. Имена клавиш и кнопок из записи ('Key.enter', 'Button.left', 'a')
+переводятся бэкендом в собственные объекты через resolve_key/resolve_button.
+
+    PynputBackend        - pynput (по умолчанию, как раньше)
+    Win32SendInputBackend - прямые вызовы SendInput через ctypes (только Windows)
+    CaptureBackend       - ничего не отправляет, запоминает вызовы с метками времени
+                           (для тестов и бенчмарков без графической среды)
+"""
+import sys
+import time
+
+from actions import (KIND_MOUSE_MOVE, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE, KIND_MOUSE_SCROLL,
+                     KIND_KEY_PRESS, KIND_KEY_RELEASE)
+
+# Специальные клавиши, которые пишет Recorder (str(Key.xxx))
+SPECIAL_KEYS = (
+    'alt', 'alt_l', 'alt_r', 'alt_gr', 'backspace', 'caps_lock', 'cmd', 'cmd_l', 'cmd_r',
+    'ctrl', 'ctrl_l', 'ctrl_r', 'delete', 'down', 'end', 'enter', 'esc',
+    'f1', 'f2', 'f3', 'f4', 'f5', 'f6', 'f7', 'f8', 'f9', 'f10', 'f11', 'f12',
+    'home', 'insert', 'left', 'menu', 'num_lock', 'page_down', 'page_up', 'pause',
+    'print_screen', 'right', 'scroll_lock', 'shift', 'shift_l', 'shift_r', 'space', 'tab', 'up',
+)
+
+MOUSE_BUTTONS = ('left', 'right', 'middle')
+
+
+class InputBackend:
+    """
+    Интерфейс бэкенда ввода.
+
+    resolve_* вызываются при подготовке воспроизведения, остальные методы -
+    в цикле воспроизведения, поэтому они должны быть как можно дешевле.
+    resolve_key возвращает None для клавиш, которые нельзя воспроизвести.
+
+    Перед воспроизведением каждое событие один раз переводится в операцию
+    бэкенда через compile_op (см. program.py), а send_batch получает пачку
+    таких операций, которые должны сработать одновременно. По умолчанию
+    операция - это готовый вызов (метод, аргументы), и пачка выполняется
+    по одной операции; бэкенд может переопределить оба метода и, например,
+    заранее собрать структуры для одного системного вызова на пачку.
+
+    wait_idle нужен турбо-режиму Player: после пачки он ждет, пока
+    получатель обработает отправленный ввод. Бэкенд, который не может
+    этого узнать, возвращает None, и темп задает только минимальный шаг.
+    """
+
+    name = 'base'
+
+    def compile_op(self, kind, x, y, dx, dy, token):
+        """Переводит событие (код действия, координаты, разрешенный token) в операцию для send_batch"""
+        if kind == KIND_MOUSE_MOVE:
+            return (self.move, (x, y))
+        if kind == KIND_MOUSE_PRESS:
+            return (self.press_button, (token, x, y))
+        if kind == KIND_MOUSE_RELEASE:
+            return (self.release_button, (token, x, y))
+        if kind == KIND_MOUSE_SCROLL:
+            return (self.scroll, (x, y, dx, dy))
+        if kind == KIND_KEY_PRESS:
+            return (self.press_key, (token,))
+        if kind == KIND_KEY_RELEASE:
+            return (self.release_key, (token,))
+        raise ValueError(f"Неизвестный код действия: {kind}")
+
+    def send_batch(self, ops):
+        for method, args in ops:
+            method(*args)
+
+    def wait_idle(self, timeout):
+        """
+        Ждет, пока отправленный ввод будет обработан, не дольше timeout секунд.
+
+        :return: True - ввод обработан, False - истек timeout, None - бэкенд не умеет ждать
+        """
+        return None
+
+    def resolve_button(self, name):
+        raise NotImplementedError
+
+    def resolve_key(self, name):
+        raise NotImplementedError
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def press_button(self, button, x, y):
+        raise NotImplementedError
+
+    def release_button(self, button, x, y):
+        raise NotImplementedError
+
+    def scroll(self, x, y, dx, dy):
+        raise NotImplementedError
+
+    def press_key(self, key):
+        raise NotImplementedError
+
+    def release_key(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PynputBackend(InputBackend):
+    """Ввод через контроллеры pynput"""
+
+    name = 'pynput'
+
+    def __init__(self):
+        from pynput.keyboard import Key, Controller as KeyboardController
+        from pynput.mouse import Button, Controller as MouseController
+        self.mouse = MouseController()
+        self.keyboard = KeyboardController()
+        # Таблицы строятся один раз, а не на каждом событии
+        self._buttons = {f'Button.{name}': getattr(Button, name) for name in MOUSE_BUTTONS}
+        self._default_button = Button.left
+        self._keys = {f'Key.{name}': getattr(Key, name) for name in SPECIAL_KEYS if hasattr(Key, name)}
+
+    def resolve_button(self, name):
+        return self._buttons.get(name, self._default_button)
+
+    def resolve_key(self, name):
+        if name in self._keys:
+            return self._keys[name]
+        elif name and len(name) == 1:
+            return name
+        return None
+
+    def move(self, x, y):
+        self.mouse.position = (x, y)
+
+    def press_button(self, button, x, y):
+        # Установка курсора в нужное положение
+        self.mouse.position = (x, y)
+        self.mouse.press(button)
+
+    def release_button(self, button, x, y):
+        self.mouse.position = (x, y)
+        self.mouse.release(button)
+
+    def scroll(self, x, y, dx, dy):
+        self.mouse.position = (x, y)
+        self.mouse.scroll(dx, dy)
+
+    def press_key(self, key):
+        self.keyboard.press(key)
+
+    def release_key(self, key):
+        self.keyboard.release(key)
+
+
+class Win32SendInputBackend(InputBackend):
+    """
+    Ввод через WinAPI SendInput (ctypes, без pywin32).
+
+    Клик отправляется одной структурой INPUT с флагами перемещения и кнопки,
+    а не двумя вызовами, как через pynput. Пачка одновременных событий
+    уходит одним вызовом SendInput с массивом INPUT.
+    """
+
+    name = 'win32'
+
+    # Флаги MOUSEINPUT
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_WHEEL = 0x0800
+    MOUSEEVENTF_HWHEEL = 0x1000
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    BUTTON_FLAGS = {
+        'Button.left': (0x0002, 0x0004),
+        'Button.right': (0x0008, 0x0010),
+        'Button.middle': (0x0020, 0x0040),
+    }
+    WHEEL_DELTA = 120
+
+    # Флаги KEYBDINPUT
+    KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_KEYUP = 0x0002
+    KEYEVENTF_UNICODE = 0x0004
+
+    VIRTUAL_KEYS = {
+        'alt': 0x12, 'alt_l': 0xA4, 'alt_r': 0xA5, 'alt_gr': 0xA5, 'backspace': 0x08,
+        'caps_lock': 0x14, 'cmd': 0x5B, 'cmd_l': 0x5B, 'cmd_r': 0x5C, 'ctrl': 0x11,
+        'ctrl_l': 0xA2, 'ctrl_r': 0xA3, 'delete': 0x2E, 'down': 0x28, 'end': 0x23,
+        'enter': 0x0D, 'esc': 0x1B, 'home': 0x24, 'insert': 0x2D, 'left': 0x25,
+        'menu': 0x5D, 'num_lock': 0x90, 'page_down': 0x22, 'page_up': 0x21, 'pause': 0x13,
+        'print_screen': 0x2C, 'right': 0x27, 'scroll_lock': 0x91, 'shift': 0x10,
+        'shift_l': 0xA0, 'shift_r': 0xA1, 'space': 0x20, 'tab': 0x09, 'up': 0x26,
+    }
+    VIRTUAL_KEYS.update({f'f{i}': 0x6F + i for i in range(1, 13)})
+    EXTENDED_KEYS = {'alt_r', 'alt_gr', 'cmd', 'cmd_l', 'cmd_r', 'ctrl_r', 'delete', 'down',
+                     'end', 'home', 'insert', 'left', 'menu', 'num_lock', 'page_down',
+                     'page_up', 'print_screen', 'right', 'up'}
+
+    def __init__(self):
+        if sys.platform != 'win32':
+            raise OSError("Win32SendInputBackend доступен только в Windows")
+        import ctypes
+        from ctypes import wintypes
+
+        ULONG_PTR = ctypes.c_size_t
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                        ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ULONG_PTR)]
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                        ('time', wintypes.DWORD), ('dwExtraInfo', ULONG_PTR)]
+
+        class HARDWAREINPUT(ctypes.Structure):
+            _fields_ = [('uMsg', wintypes.DWORD), ('wParamL', wintypes.WORD), ('wParamH', wintypes.WORD)]
+
+        class _INPUTUNION(ctypes.Union):
+            _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT), ('hi', HARDWAREINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+        self._ctypes = ctypes
+        self.INPUT = INPUT
+        self._user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self._user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+        self._user32.SendInput.restype = wintypes.UINT
+        self._user32.VkKeyScanW.argtypes = (wintypes.WCHAR,)
+        self._user32.VkKeyScanW.restype = ctypes.c_short
+        self._user32.GetForegroundWindow.restype = wintypes.HWND
+        self._user32.GetWindowThreadProcessId.argtypes = (wintypes.HWND, ctypes.POINTER(wintypes.DWORD))
+        self._user32.WaitForInputIdle.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+        self._user32.WaitForInputIdle.restype = wintypes.DWORD
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        self._kernel32.OpenProcess.restype = wintypes.HANDLE
+        self._kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        self._wintypes = wintypes
+        # Процесс активного окна, обработку ввода которым ждет wait_idle
+        self._idle_pid = None
+        self._idle_process = None
+        self._refresh_screen()
+
+    def _refresh_screen(self):
+        """Границы виртуального рабочего стола (все мониторы) для абсолютных координат"""
+        get_metric = self._user32.GetSystemMetrics
+        self._left = get_metric(76)     # SM_XVIRTUALSCREEN
+        self._top = get_metric(77)      # SM_YVIRTUALSCREEN
+        self._width = max(get_metric(78) - 1, 1)   # SM_CXVIRTUALSCREEN
+        self._height = max(get_metric(79) - 1, 1)  # SM_CYVIRTUALSCREEN
+
+    def _mouse_input(self, x, y, flags, data=0):
+        item = self.INPUT(type=0) # INPUT_MOUSE
+        mi = item.u.mi
+        mi.dx = (x - self._left) * 65535 // self._width
+        mi.dy = (y - self._top) * 65535 // self._height
+        mi.mouseData = data & 0xFFFFFFFF
+        mi.dwFlags = flags | self.MOUSEEVENTF_MOVE | self.MOUSEEVENTF_ABSOLUTE | self.MOUSEEVENTF_VIRTUALDESK
+        return item
+
+    def _key_input(self, key, up):
+        vk, scan, flags = key
+        item = self.INPUT(type=1) # INPUT_KEYBOARD
+        ki = item.u.ki
+        ki.wVk = vk
+        ki.wScan = scan
+        ki.dwFlags = flags | (self.KEYEVENTF_KEYUP if up else 0)
+        return item
+
+    def _send(self, *items):
+        array_type = self.INPUT * len(items)
+        sent = self._user32.SendInput(len(items), array_type(*items), self._ctypes.sizeof(self.INPUT))
+        if sent != len(items):
+            raise OSError(self._ctypes.get_last_error(), "SendInput заблокирован (UIPI или другой рабочий стол)")
+
+    def wait_idle(self, timeout):
+        """WaitForInputIdle для процесса активного окна: процесс разобрал очередь ввода и ждет новый"""
+        window = self._user32.GetForegroundWindow()
+        if not window:
+            return None
+        pid = self._wintypes.DWORD()
+        self._user32.GetWindowThreadProcessId(window, self._ctypes.byref(pid))
+        if pid.value != self._idle_pid:
+            self._close_idle_process()
+            # SYNCHRONIZE | PROCESS_QUERY_LIMITED_INFORMATION
+            self._idle_process = self._kernel32.OpenProcess(0x00100000 | 0x1000, False, pid.value)
+            self._idle_pid = pid.value
+        if not self._idle_process:
+            return None # Нет прав на процесс (например, запущен от администратора)
+        result = self._user32.WaitForInputIdle(self._idle_process, int(timeout * 1000))
+        if result == 0xFFFFFFFF: # WAIT_FAILED: у процесса нет очереди сообщений (консоль)
+            return None
+        return result == 0
+
+    def _close_idle_process(self):
+        if self._idle_process:
+            self._kernel32.CloseHandle(self._idle_process)
+        self._idle_process = None
+        self._idle_pid = None
+
+    def close(self):
+        self._close_idle_process()
+
+    def resolve_button(self, name):
+        return self.BUTTON_FLAGS.get(name, self.BUTTON_FLAGS['Button.left'])
+
+    def resolve_key(self, name):
+        if name and name.startswith('Key.'):
+            short = name[4:]
+            vk = self.VIRTUAL_KEYS.get(short)
+            if vk is None:
+                return None
+            return (vk, 0, self.KEYEVENTF_EXTENDEDKEY if short in self.EXTENDED_KEYS else 0)
+        if not name or len(name) != 1:
+            return None
+        scan = self._user32.VkKeyScanW(name)
+        # Символ без модификаторов отправляем виртуальной клавишей (работают сочетания вроде Ctrl+C),
+        # остальные - как Unicode символ
+        if scan != -1 and (scan >> 8) & 0xFF == 0:
+            return (scan & 0xFF, 0, 0)
+        if ord(name) > 0xFFFF:
+            return None
+        return (0, ord(name), self.KEYEVENTF_UNICODE)
+
+    def _scroll_inputs(self, x, y, dx, dy):
+        items = []
+        if dy:
+            items.append(self._mouse_input(x, y, self.MOUSEEVENTF_WHEEL, dy * self.WHEEL_DELTA))
+        if dx:
+            items.append(self._mouse_input(x, y, self.MOUSEEVENTF_HWHEEL, dx * self.WHEEL_DELTA))
+        return items
+
+    def move(self, x, y):
+        self._send(self._mouse_input(x, y, 0))
+
+    def press_button(self, button, x, y):
+        self._send(self._mouse_input(x, y, button[0]))
+
+    def release_button(self, button, x, y):
+        self._send(self._mouse_input(x, y, button[1]))
+
+    def scroll(self, x, y, dx, dy):
+        items = self._scroll_inputs(x, y, dx, dy)
+        if items:
+            self._send(*items)
+
+    def compile_op(self, kind, x, y, dx, dy, token):
+        """Операция - кортеж готовых структур INPUT (собираются один раз до воспроизведения)"""
+        if kind == KIND_MOUSE_MOVE:
+            return (self._mouse_input(x, y, 0),)
+        if kind == KIND_MOUSE_PRESS:
+            return (self._mouse_input(x, y, token[0]),)
+        if kind == KIND_MOUSE_RELEASE:
+            return (self._mouse_input(x, y, token[1]),)
+        if kind == KIND_MOUSE_SCROLL:
+            return tuple(self._scroll_inputs(x, y, dx, dy))
+        if kind in (KIND_KEY_PRESS, KIND_KEY_RELEASE):
+            return (self._key_input(token, kind == KIND_KEY_RELEASE),)
+        raise ValueError(f"Неизвестный код действия: {kind}")
+
+    def send_batch(self, ops):
+        items = [item for op in ops for item in op]
+        if items:
+            self._send(*items)
+
+    def press_key(self, key):
+        self._send(self._key_input(key, False))
+
+    def release_key(self, key):
+        self._send(self._key_input(key, True))
+
+
+class CaptureBackend(InputBackend):
+    """
+    Бэкенд без вывода: запоминает, что было бы отправлено, с меткой perf_counter.
+
+    Подходит для тестов и измерения пропускной способности и точности
+    всего пути воспроизведения на машине без графической среды.
+    С keep=False события только считаются (для длинных бенчмарков).
+    """
+
+    name = 'capture'
+
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.events = []   # (perf_counter, операция, аргументы)
+        self.count = 0
+        self.batches = 0
+        self.idle_waits = 0
+
+    def _capture(self, op, *args):
+        self.count += 1
+        if self.keep:
+            self.events.append((time.perf_counter(), op, args))
+
+    def resolve_button(self, name):
+        return name if name in ('Button.left', 'Button.right', 'Button.middle') else 'Button.left'
+
+    def resolve_key(self, name):
+        if name and (name.startswith('Key.') or len(name) == 1):
+            return name
+        return None
+
+    def move(self, x, y):
+        self._capture('move', x, y)
+
+    def press_button(self, button, x, y):
+        self._capture('press_button', button, x, y)
+
+    def release_button(self, button, x, y):
+        self._capture('release_button', button, x, y)
+
+    def scroll(self, x, y, dx, dy):
+        self._capture('scroll', x, y, dx, dy)
+
+    def press_key(self, key):
+        self._capture('press_key', key)
+
+    def release_key(self, key):
+        self._capture('release_key', key)
+
+    def send_batch(self, ops):
+        self.batches += 1
+        super().send_batch(ops)
+
+    def wait_idle(self, timeout):
+        # Получателя нет: отправленное "обработано" сразу
+        self.idle_waits += 1
+        return True
+
+    def clear(self):
+        self.events = []
+        self.count = 0
+        self.batches = 0
+        self.idle_waits = 0
+
+
+BACKENDS = {
+    'pynput': PynputBackend,
+    'win32': Win32SendInputBackend,
+    'capture': CaptureBackend,
+}
+
+
+def create_backend(name=None):
+    """Создает бэкенд по имени; по умолчанию pynput, как раньше"""
+    return BACKENDS[name or 'pynput']()
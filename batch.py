@@ -0,0 +1,312 @@
+"""
+Пакетный запуск записей: очередь заданий, которые воспроизводятся подряд.
+
+Задание (Job) - файл .clk со своими повторами, скоростью и параметрами
+воспроизведения (фрагмент, паузы, турбо). Очередь собирается из списка
+файлов, каталогов (все .clk по имени) и файлов заданий .json.
+
+Пока играет текущее задание, следующие (не больше prefetch) готовятся
+в пуле процессов: запись разбирается (JSON, распаковка v3), строки
+упорядочиваются и проходят все преобразования шкалы времени
+(program.timeline_rows), а результат пишется во временный файл v2.
+Главному процессу остается только отобразить его в память, поэтому
+между заданиями нет паузы на загрузку. Записи v2 без преобразований
+воспроизводятся из исходного файла без подготовки.
+
+По каждому заданию собирается статистика (ожидание подготовки, подготовка,
+открытие, воспроизведение, событий в секунду, опоздание действий - см.
+latency.py), а после каждого задания
+состояние очереди атомарно пишется в файл состояния: прерванный пакет
+продолжается с первого незавершенного задания.
+"""
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import applog
+import clkformat
+import program
+from actions import ActionBuffer
+from player import TURBO_MODES
+from timeline import GAP_CAP, GAP_MODES, check_gap
+
+STATE_VERSION = 1
+
+# Сколько следующих заданий готовится заранее
+DEFAULT_PREFETCH = 2
+
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+STATUS_STOPPED = 'stopped'
+
+log = applog.get_logger('Batch')
+
+
+class Job:
+    """Одно задание очереди: запись и параметры Player.play (ValueError для неверных)"""
+
+    def __init__(self, path, repeat=1, speed=1.0, start=None, end=None, max_gap=None,
+                 gap_mode=GAP_CAP, turbo=None, min_gap=0.0):
+        # Задания приходят из JSON: ошибка видна при чтении очереди, а не посреди нее
+        if gap_mode not in GAP_MODES:
+            raise ValueError(f"Неизвестный режим пауз: {gap_mode}")
+        check_gap(max_gap, gap_mode)
+        if turbo is not None and turbo not in TURBO_MODES:
+            raise ValueError(f"Неизвестный турбо-режим: {turbo}")
+        if min_gap < 0:
+            raise ValueError("Минимальный шаг не может быть отрицательным")
+        self.path = path
+        self.repeat = repeat
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.max_gap = max_gap
+        self.gap_mode = gap_mode
+        self.turbo = turbo
+        self.min_gap = min_gap
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    @property
+    def transformed(self):
+        """Нужны ли преобразования шкалы времени (фрагмент, паузы, турбо)"""
+        return (self.start is not None or self.end is not None or self.max_gap is not None
+                or self.turbo is not None)
+
+
+def load_jobs(sources, **defaults):
+    """
+    Собирает задания из файлов .clk, каталогов и файлов заданий .json.
+
+    Файл заданий - список путей или словарей Job.to_dict(); относительные
+    пути считаются от каталога файла заданий. defaults (repeat, speed, ...)
+    применяются к заданиям, где параметр не задан.
+    """
+    jobs = []
+    for source in sources:
+        if os.path.isdir(source):
+            for path in sorted(glob.glob(os.path.join(source, '*.clk'))):
+                jobs.append(Job(path, **defaults))
+        elif source.lower().endswith('.json'):
+            with open(source, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            base = os.path.dirname(os.path.abspath(source))
+            for entry in entries:
+                if isinstance(entry, str):
+                    entry = {'path': entry}
+                entry = dict(defaults, **entry)
+                entry['path'] = os.path.join(base, entry['path'])
+                jobs.append(Job.from_dict(entry))
+        else:
+            jobs.append(Job(source, **defaults))
+    return jobs
+
+
+def prepare(job, cache_path):
+    """
+    Готовит запись задания к воспроизведению (выполняется в процессе пула).
+
+    :param job: Job.to_dict()
+    :return: (путь к готовой записи, секунды подготовки, создан ли временный файл)
+    """
+    started = time.perf_counter()
+    job = Job.from_dict(job)
+    actions = clkformat.load(job.path)
+    try:
+        if isinstance(actions, clkformat.MappedActions) and actions.is_sorted and not job.transformed:
+            return job.path, time.perf_counter() - started, False
+        buffer = ActionBuffer()
+        for name in actions.names:
+            buffer.intern(name)
+        turbo_gap = job.min_gap if job.turbo is not None else None
+        for row in program.timeline_rows(actions, job.start, job.end, job.max_gap, job.gap_mode, turbo_gap):
+            buffer.append_row(*row)
+        buffer.meta = dict(actions.meta)
+    finally:
+        actions.close()
+    clkformat.save(cache_path, buffer)
+    return cache_path, time.perf_counter() - started, True
+
+
+def load_state(path):
+    """Задания и результаты из файла состояния: (jobs, results)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"Неподдерживаемая версия файла состояния: {state.get('version')}")
+    return [Job.from_dict(job) for job in state['jobs']], state['results']
+
+
+class BatchRunner:
+    """
+    Воспроизводит очередь заданий через один Player.
+
+    Функции обратного вызова Player (on_finished/on_error) на время run()
+    заменяются собственными. on_job(index, job, result) вызывается после
+    каждого задания из потока, вызвавшего run().
+
+    :param state_path: Файл состояния; если он есть и описывает те же
+                       задания, завершенные задания пропускаются
+    :param prefetch: Сколько следующих заданий готовить заранее
+    :param workers: Процессов в пуле (по умолчанию prefetch)
+    """
+
+    def __init__(self, jobs, player, state_path=None, prefetch=DEFAULT_PREFETCH, workers=None, on_job=None):
+        self.jobs = list(jobs)
+        self.player = player
+        self.state_path = state_path
+        self.prefetch = max(1, prefetch)
+        self.workers = workers or self.prefetch
+        self.on_job = on_job
+        self.results = [None] * len(self.jobs)
+        self._stopped = False
+        self._finished = threading.Event()
+        self._error = None
+        if state_path and os.path.exists(state_path):
+            self._resume(state_path)
+
+    def _resume(self, state_path):
+        try:
+            jobs, results = load_state(state_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("Файл состояния {} не прочитан ({}), очередь начинается заново.", state_path, e)
+            return
+        if [job.to_dict() for job in jobs] != [job.to_dict() for job in self.jobs]:
+            log.warning("Файл состояния {} описывает другую очередь, она начинается заново.", state_path)
+            return
+        self.results = results
+        done = sum(1 for result in results if result and result['status'] == STATUS_DONE)
+        log.info("Продолжение очереди: выполнено {} из {}.", done, len(jobs))
+
+    @property
+    def pending(self):
+        """Индексы заданий, которые еще нужно выполнить"""
+        return [index for index, result in enumerate(self.results)
+                if not result or result['status'] != STATUS_DONE]
+
+    def stop(self):
+        """Останавливает текущее задание и очередь (незавершенные останутся в файле состояния)"""
+        self._stopped = True
+        self.player.stop()
+
+    def run(self):
+        """Выполняет очередь; возвращает результаты по всем заданиям"""
+        pending = self.pending
+        cache_dir = tempfile.mkdtemp(prefix='clk-batch-')
+        self._stopped = False
+        self.player.on_finished = self._finished.set
+        self.player.on_error = self._on_error
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures = {}
+        try:
+            for position, index in enumerate(pending):
+                # Держим в пуле следующие prefetch заданий, включая текущее
+                for ahead in pending[position:position + self.prefetch + 1]:
+                    if ahead not in futures:
+                        cache_path = os.path.join(cache_dir, f'{ahead}.clk')
+                        futures[ahead] = pool.submit(prepare, self.jobs[ahead].to_dict(), cache_path)
+                if self._stopped:
+                    break
+                result = self._run_job(index, futures.pop(index))
+                self.results[index] = result
+                self._save_state()
+                if self.on_job is not None:
+                    self.on_job(index, self.jobs[index], result)
+        finally:
+            for future in futures.values():
+                future.cancel()
+            pool.shutdown(wait=True)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        return self.results
+
+    def _on_error(self, message):
+        self._error = message
+        self._finished.set()
+
+    def _run_job(self, index, future):
+        job = self.jobs[index]
+        result = {'path': job.path, 'started_at': datetime.now().isoformat(timespec='seconds')}
+        waited_from = time.perf_counter()
+        try:
+            path, prepare_time, temporary = future.result()
+        except Exception as e:
+            result.update(status=STATUS_ERROR, error=f"Не удалось подготовить запись: {e}")
+            log.error("{}: {}", job.path, result['error'])
+            return result
+        opened_from = time.perf_counter()
+        result['wait_s'] = opened_from - waited_from
+        result['prepare_s'] = prepare_time
+        try:
+            actions = clkformat.load(path)
+        except (OSError, ValueError) as e:
+            if temporary:
+                os.remove(path)
+            result.update(status=STATUS_ERROR, error=f"Не удалось открыть запись: {e}")
+            log.error("{}: {}", job.path, result['error'])
+            return result
+        result['open_s'] = time.perf_counter() - opened_from
+        self._finished.clear()
+        self._error = None
+        try:
+            played_from = time.perf_counter()
+            # Фрагмент и паузы уже применены при подготовке; турбо передается ради шага и drain
+            try:
+                self.player.play(actions, job.repeat, job.speed, turbo=job.turbo, min_gap=job.min_gap)
+            except (OSError, ValueError) as e:
+                result.update(status=STATUS_ERROR, error=f"Воспроизведение не запущено: {e}")
+                log.error("{}: {}", job.path, result['error'])
+                return result
+            try:
+                # join с таймаутом, чтобы Ctrl+C доходил до главного потока
+                while self.player.play_thread.is_alive():
+                    self.player.play_thread.join(0.1)
+            except KeyboardInterrupt:
+                self.stop()
+                self.player.play_thread.join()
+                result['status'] = STATUS_STOPPED
+                self.results[index] = result
+                self._save_state()
+                raise
+            result['play_s'] = time.perf_counter() - played_from
+        finally:
+            actions.close()
+            if temporary:
+                os.remove(path)
+        stats = self.player.stats
+        result['events'] = stats.get('batched_events', 0)
+        result['events_per_second'] = stats.get('events_per_second', 0.0)
+        if self.player.report is not None:
+            result['lateness'] = self.player.report['lateness']
+            result['overruns'] = self.player.report['overruns']
+        if self._error:
+            result.update(status=STATUS_ERROR, error=self._error)
+        elif self._finished.is_set():
+            result['status'] = STATUS_DONE
+        else:
+            result['status'] = STATUS_STOPPED
+        return result
+
+    def _save_state(self):
+        """Пишет состояние очереди атомарно (временный файл и переименование)"""
+        if not self.state_path:
+            return
+        state = {
+            'version': STATE_VERSION,
+            'jobs': [job.to_dict() for job in self.jobs],
+            'results': self.results,
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,82 @@
+"""
+Микробенчмарк пакетной отправки событий (send_batch) на бэкенде-заглушке.
+
+Заглушка имитирует стоимость системного вызова (по умолчанию 20 мкс):
+при отправке по одному каждое событие - отдельный вызов (клик - два, как
+position + press в pynput), при пакетной отправке - один вызов на пачку.
+Для каждой скорости печатается отставание конца воспроизведения от
+расписания, число "системных вызовов" и счетчики пачек Player.stats.
+
+Запуск: python benchmarks/bench_batch.py [--events 5000] [--syscall-us 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import CaptureBackend
+from bench_playback import make_recording
+from player import Player
+
+
+class StubSyscallBackend(CaptureBackend):
+    """CaptureBackend, у которого каждый "системный вызов" занимает заданное время"""
+
+    def __init__(self, syscall_cost, batched):
+        super().__init__(keep=False)
+        self.syscall_cost = syscall_cost
+        self.batched = batched
+        self.syscalls = 0
+        self.last_sent = 0.0
+
+    def _syscall(self):
+        self.syscalls += 1
+        deadline = time.perf_counter() + self.syscall_cost
+        while time.perf_counter() < deadline:
+            pass
+        self.last_sent = time.perf_counter()
+
+    def _capture(self, op, *args):
+        super()._capture(op, *args)
+        if not self.batched:
+            # В pynput клик и прокрутка - это установка позиции плюс само действие
+            if op in ('press_button', 'release_button', 'scroll'):
+                self._syscall()
+            self._syscall()
+
+    def send_batch(self, ops):
+        super().send_batch(ops)
+        if self.batched:
+            self._syscall()
+
+
+def run(recording, speed_factor, syscall_cost, batched):
+    backend = StubSyscallBackend(syscall_cost, batched)
+    player = Player(backend=backend, batch_window=0.0005 if batched else None)
+    started = time.perf_counter()
+    player.play(recording, 1, speed_factor)
+    player.play_thread.join()
+    scheduled_end = started + recording.max_timestamp / speed_factor
+    return backend, player.stats, backend.last_sent - scheduled_end
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=1000.0)
+    parser.add_argument('--syscall-us', type=float, default=20.0)
+    args = parser.parse_args()
+
+    recording = make_recording(args.events, args.rate)
+    print(f"{'Скорость':>8} {'Режим':<9} {'Отставание, мс':>15} {'Вызовов':>9} {'Пачек':>7} {'Макс. пачка':>12}")
+    for speed_factor in (1.0, 5.0, 10.0, 50.0):
+        for label, batched in (('по одному', False), ('пачками', True)):
+            backend, stats, behind = run(recording, speed_factor, args.syscall_us / 1e6, batched)
+            print(f"{speed_factor:>7.0f}x {label:<9} {behind * 1000:>15.1f} {backend.syscalls:>9} "
+                  f"{stats.get('batches', 0):>7} {stats.get('max_batch', 0):>12}")
+
+
+if __name__ == "__main__":
+    main()
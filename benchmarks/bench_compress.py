@@ -0,0 +1,109 @@
+"""
+Бенчмарк сжатого формата v3 (clkblocks.py) против JSON (v1) и v2.
+
+Запись моделирует реальную сессию: траектория мыши - случайное блуждание
+с частотой 1 кГц, изредка клики и клавиши. Для каждого формата выводятся
+размер файла, скорость записи и чтения (полный проход по строкам) в событиях
+в секунду и время до первой строки при старте с середины записи.
+
+Запуск: python benchmarks/bench_compress.py [количество_событий] [--json-limit N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clkblocks
+import clkformat
+from actions import ActionBuffer
+
+
+def make_session(count, seed=1):
+    random.seed(seed)
+    buffer = ActionBuffer()
+    x, y = 960, 540
+    for i in range(count):
+        timestamp = i / 1000.0 + random.random() * 0.0002
+        if i % 500 == 0:
+            buffer.append_click(timestamp, x, y, 'Button.left', (i // 500) % 2 == 0)
+        elif i % 700 == 0:
+            buffer.append_key(timestamp, 'a', (i // 700) % 2 == 0)
+        else:
+            x = min(1919, max(0, x + random.randint(-4, 4)))
+            y = min(1079, max(0, y + random.randint(-4, 4)))
+            buffer.append_move(timestamp, x, y)
+    return buffer
+
+
+def save_json(path, buffer):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(buffer.to_list(), f)
+
+
+def read_all(path):
+    """Открывает запись и проходит все строки, как при подготовке воспроизведения"""
+    actions = clkformat.load(path)
+    try:
+        count = 0
+        for _row in actions.iter_rows():
+            count += 1
+        return count
+    finally:
+        actions.close()
+
+
+def first_row_from(path, timestamp):
+    actions = clkformat.load(path)
+    try:
+        if hasattr(actions, 'iter_rows_from'):
+            return next(actions.iter_rows_from(timestamp))
+        return next(row for row in actions.iter_rows() if row[0] >= timestamp)
+    finally:
+        actions.close()
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('count', type=int, nargs='?', default=1_000_000)
+    parser.add_argument('--json-limit', type=int, default=1_000_000,
+                        help="JSON файлы больше этого числа событий не генерируются")
+    args = parser.parse_args()
+
+    buffer = make_session(args.count)
+    middle = buffer.max_timestamp / 2
+    formats = []
+    if args.count <= args.json_limit:
+        formats.append(('JSON (v1)', save_json))
+    formats.append(('v2', clkformat.save))
+    codecs = ['none', 'zlib'] + (['zstd'] if clkblocks._zstd() else [])
+    for codec in codecs:
+        formats.append((f'v3 {codec}', lambda path, actions, codec=codec: clkblocks.save(path, actions, codec=codec)))
+
+    print(f"Событий: {args.count}" + ("" if 'zstd' in codecs else " (zstandard не установлен, zstd пропущен)"))
+    print(f"{'Формат':<10} {'Размер, МБ':>11} {'Байт/соб':>9} {'Запись, соб/с':>14} "
+          f"{'Чтение, соб/с':>14} {'С середины, мс':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, save in formats:
+            path = os.path.join(tmp, name.replace(' ', '_') + '.clk')
+            encode_time, _ = measure(save, path, buffer)
+            size = os.path.getsize(path) / 2**20
+            decode_time, count = measure(read_all, path)
+            assert count == len(buffer)
+            seek_time, _ = measure(first_row_from, path, middle)
+            print(f"{name:<10} {size:11.2f} {size * 2**20 / count:9.1f} {count / encode_time:14.0f} "
+                  f"{count / decode_time:14.0f} {seek_time * 1000:15.1f}")
+
+
+if __name__ == "__main__":
+    main()
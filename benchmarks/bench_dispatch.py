@@ -0,0 +1,157 @@
+"""
+Бенчмарк диспетчеризации событий без ожидания (события/с).
+
+Сравнивает три способа превратить запись в вызовы бэкенда:
+
+    legacy   - как старый Player: словари действий, ветвление по строке type,
+               таблицы клавиш и кнопок строятся заново на каждое событие;
+    rows     - строки колонок с целыми кодами, но разрешение клавиш бэкендом
+               и ветвление по коду на каждое событие;
+    compiled - program.CompiledRecording: компиляция один раз (первый проход,
+               время указано отдельно), затем цикл по готовым пачкам.
+
+Бэкенд - CaptureBackend(keep=False), то есть измеряется только сам путь
+диспетчеризации, без системных вызовов. Прогоняются две записи: в основном
+движения мыши (bench_playback.make_recording) и набор текста (только клавиши).
+Скомпилированная форма проверяется при x1 (пачки почти всегда по одному
+событию) и при x1000, где пачки заполняются до max_batch.
+
+Запуск: python benchmarks/bench_dispatch.py [--events 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import (ActionBuffer, KIND_MOUSE_MOVE, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE, KIND_MOUSE_SCROLL,
+                     KIND_KEY_PRESS, KIND_KEY_RELEASE)
+from backends import CaptureBackend, SPECIAL_KEYS
+from bench_playback import make_recording
+from program import CompiledRecording
+
+
+def make_typing(count, rate):
+    buffer = ActionBuffer()
+    keys = ['a', 'b', 'Key.space', 'Key.shift', 'c', 'Key.enter']
+    for i in range(count):
+        buffer.append_key(i / rate, keys[(i // 2) % len(keys)], i % 2 == 0)
+    return buffer
+
+
+def legacy_parse_mouse_button(button_str):
+    button_map = {
+        'Button.left': 'Button.left',
+        'Button.right': 'Button.right',
+        'Button.middle': 'Button.middle',
+    }
+    return button_map.get(button_str, 'Button.left')
+
+
+def legacy_parse_key(key_str):
+    # Старый Player строил словарь из 45 клавиш на каждое нажатие
+    special_keys = {f'Key.{name}': f'Key.{name}' for name in SPECIAL_KEYS}
+    if key_str in special_keys:
+        return special_keys[key_str]
+    elif len(key_str) == 1:
+        return key_str
+    return None
+
+
+def run_legacy(actions, backend):
+    for action in actions:
+        action_type = action['type']
+        if action_type == 'mouse_move':
+            backend.move(action['x'], action['y'])
+        elif action_type == 'mouse_click':
+            button = legacy_parse_mouse_button(action['button'])
+            if action['pressed']:
+                backend.press_button(button, action['x'], action['y'])
+            else:
+                backend.release_button(button, action['x'], action['y'])
+        elif action_type == 'mouse_scroll':
+            backend.scroll(action['x'], action['y'], action['dx'], action['dy'])
+        elif action_type in ('key_press', 'key_release'):
+            key = legacy_parse_key(action['key'])
+            if key:
+                if action_type == 'key_press':
+                    backend.press_key(key)
+                else:
+                    backend.release_key(key)
+
+
+def run_rows(recording, backend):
+    names = recording.names
+    for _timestamp, kind, x, y, dx, dy, code in recording.iter_rows():
+        if kind == KIND_MOUSE_MOVE:
+            backend.move(x, y)
+        elif kind == KIND_MOUSE_PRESS:
+            backend.press_button(backend.resolve_button(names[code]), x, y)
+        elif kind == KIND_MOUSE_RELEASE:
+            backend.release_button(backend.resolve_button(names[code]), x, y)
+        elif kind == KIND_MOUSE_SCROLL:
+            backend.scroll(x, y, dx, dy)
+        elif kind in (KIND_KEY_PRESS, KIND_KEY_RELEASE):
+            key = backend.resolve_key(names[code])
+            if key is None:
+                continue
+            if kind == KIND_KEY_PRESS:
+                backend.press_key(key)
+            else:
+                backend.release_key(key)
+
+
+def run_compiled(compiled, backend):
+    send_batch = backend.send_batch
+    for program in compiled.programs():
+        ops = program.ops
+        begin = 0
+        for end in program.bounds:
+            send_batch(ops[begin:end])
+            begin = end
+
+
+def report(name, backend, elapsed, extra=""):
+    print(f"{name:>9}: {backend.count / elapsed:12,.0f} событий/с ({elapsed * 1000:7.1f} мс){extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="Частота событий в записи, Гц")
+    args = parser.parse_args()
+
+    recordings = (
+        ('мышь', make_recording(args.events, args.rate)),
+        ('клавиатура', make_typing(args.events, args.rate)),
+    )
+    for title, recording in recordings:
+        print(f"Запись: {title}, {len(recording)} событий")
+        actions = recording.to_list()
+
+        backend = CaptureBackend(keep=False)
+        started = time.perf_counter()
+        run_legacy(actions, backend)
+        report('legacy', backend, time.perf_counter() - started)
+
+        backend = CaptureBackend(keep=False)
+        started = time.perf_counter()
+        run_rows(recording, backend)
+        report('rows', backend, time.perf_counter() - started)
+
+        for speed_factor in (1.0, 1000.0):
+            backend = CaptureBackend(keep=False)
+            started = time.perf_counter()
+            compiled = CompiledRecording(recording, backend, speed_factor)
+            for _program in compiled.programs():
+                pass
+            compiled_at = time.perf_counter()
+            run_compiled(compiled, backend)
+            finished = time.perf_counter()
+            report('compiled', backend, finished - compiled_at,
+                   f", x{speed_factor:g}: {backend.batches} пачек, компиляция {(compiled_at - started) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
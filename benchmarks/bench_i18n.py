@@ -0,0 +1,77 @@
+"""
+Бенчмарк загрузки переводов: все таблицы литералом в исходнике против каталогов locales/.
+
+Раньше все 11 таблиц были литералом в main.py. main.py запускается как
+скрипт, а для скрипта .pyc не кэшируется, поэтому литерал компилировался
+и выполнялся при каждом запуске. Бенчмарк собирает такой же исходник из
+каталогов (полные таблицы всех языков) и сравнивает его компиляцию и
+выполнение с i18n.load() одного языка: время и память (tracemalloc).
+
+Запуск: python benchmarks/bench_i18n.py [--lang ru] [--rounds 50]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import i18n
+
+
+def monolithic_source():
+    """Исходник в старом виде: словарь TRANSLATIONS с полными таблицами всех языков"""
+    english = i18n.load_catalog('en')
+    parts = ['TRANSLATIONS = {\n']
+    for code in i18n.LANGUAGES:
+        table = dict(english, **i18n.load_catalog(code))
+        parts.append(f'    {code!r}: {{\n')
+        for key, value in table.items():
+            parts.append(f'        {key!r}: {value!r},\n')
+        parts.append('    },\n')
+    parts.append('}\n')
+    return ''.join(parts)
+
+
+def load_monolithic(source):
+    # Как в старом main.py: в памяти остаются таблицы всех языков
+    namespace = {}
+    exec(compile(source, 'translations_literal', 'exec'), namespace)
+    return namespace['TRANSLATIONS']
+
+
+def load_catalog(lang):
+    i18n._cache.clear()
+    i18n.load(lang)
+    return i18n._cache
+
+
+def measure(name, func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = (time.perf_counter() - started) / rounds
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>12}: {elapsed * 1000:7.3f} мс, удерживается {current / 1024:7.1f} КБ, "
+          f"пик {peak / 1024:7.1f} КБ, языков в памяти: {len(result)}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lang', default='ru', choices=sorted(i18n.LANGUAGES))
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    source = monolithic_source()
+    literal = measure('литерал', lambda: load_monolithic(source), args.rounds)
+    catalog = measure('каталог', lambda: load_catalog(args.lang), args.rounds)
+    print(f"Экономия при запуске: {(literal - catalog) * 1000:.2f} мс ({literal / catalog:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
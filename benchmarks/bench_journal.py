@@ -0,0 +1,91 @@
+"""
+Бенчмарк журнала записи: память и скорость записи с журналом и без.
+
+События подаются в Recorder так же, как их отдает поток-потребитель
+(пачками, как из кольцевых буферов), без pynput. Без журнала память
+растет с длиной записи, с журналом - ограничена блоком. Отдельно
+замеряется сборка файла .clk из журнала после остановки.
+
+Запуск: python benchmarks/bench_journal.py [количество_событий] [--block 4096]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import journal
+from actions import KIND_MOUSE_MOVE, KIND_MOUSE_PRESS
+from recorder import Recorder
+
+# Размер пачки: сколько событий поток-потребитель забирает за один проход
+DRAIN_BATCH = 64
+
+
+def synthetic_batches(count):
+    batch = []
+    for i in range(count):
+        timestamp = i / 1000.0
+        if i % 500 == 0:
+            batch.append((timestamp, KIND_MOUSE_PRESS, i % 1920, i % 1080, 0, 0, 'Button.left'))
+        else:
+            batch.append((timestamp, KIND_MOUSE_MOVE, i % 1920, i % 1080, 0, 0, None))
+        if len(batch) == DRAIN_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def record(count, journal_dir, block_size):
+    """Прогоняет события через Recorder; возвращает (секунды, пик памяти, рекордер)"""
+    recorder = Recorder(journal_dir=journal_dir, block_size=block_size)
+    # Слушатели и поток-потребитель не нужны: пачки подаются напрямую, как из _consume
+    recorder.start_mouse_listener = recorder.start_keyboard_listener = lambda: None
+    recorder.start_recording()
+    recorder._stop_event.set()
+    recorder._consumer.join()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for batch in synthetic_batches(count):
+        recorder._store(batch)
+        if recorder.journal is not None and len(recorder.actions) >= recorder.block_size:
+            recorder._flush_block()
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('count', type=int, nargs='?', default=1_000_000)
+    parser.add_argument('--block', type=int, default=journal.DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    elapsed, peak, recorder = record(args.count, None, args.block)
+    print(f"{'в памяти':>10}: {elapsed:6.2f} с, {args.count / elapsed:10.0f} событий/с, "
+          f"пик памяти {peak / 1024 / 1024:7.2f} МБ")
+
+    directory = tempfile.mkdtemp(prefix='clk-journal-')
+    try:
+        elapsed, peak, recorder = record(args.count, directory, args.block)
+        writer = recorder.journal
+        print(f"{'журнал':>10}: {elapsed:6.2f} с, {args.count / elapsed:10.0f} событий/с, "
+              f"пик памяти {peak / 1024 / 1024:7.2f} МБ, блоков {writer.blocks}, fsync {writer.fsyncs}, "
+              f"{os.path.getsize(writer.path) / 1024 / 1024:.1f} МБ на диске")
+        started = time.perf_counter()
+        recorder.recording = False
+        recorder.stop_recording()
+        print(f"{'сборка':>10}: {time.perf_counter() - started:6.2f} с, действий {len(recorder.actions)}")
+        recorder.actions.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Бенчмарк загрузки записей: JSON (v1) против отображаемого в память формата v2.
+
+Каждая загрузка выполняется в отдельном процессе, чтобы пиковый RSS
+относился только к ней. Время включает проход по всем меткам времени
+(как при подготовке воспроизведения), чтобы mmap не выигрывал "даром".
+
+Запуск: python benchmarks/bench_load.py [--sizes 10000,1000000,10000000] [--json-limit N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import clkformat
+from actions import ActionBuffer, KIND_MOUSE_MOVE
+
+CHILD = r"""
+import sys, time
+sys.path.insert(0, {root!r})
+import clkformat
+started = time.perf_counter()
+actions = clkformat.load({path!r})
+opened = time.perf_counter() - started
+total = 0.0
+for ts in actions.timestamps:
+    total += ts
+scanned = time.perf_counter() - started
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss / 1024.0 if sys.platform != 'darwin' else rss / 2**20  # МБ
+except ImportError:
+    try:
+        import psutil
+        rss = psutil.Process().memory_info().peak_wset / 2**20
+    except Exception:
+        rss = float('nan')
+print(opened, scanned, rss, len(actions))
+"""
+
+
+def make_buffer(count):
+    """Строит буфер движений мыши напрямую по колонкам (быстрее, чем append)"""
+    buffer = ActionBuffer()
+    buffer.timestamps = array('d', (i / 1000.0 for i in range(count)))
+    buffer.kinds = array('B', [KIND_MOUSE_MOVE]) * count
+    buffer.xs = array('i', (i % 1920 for i in range(count)))
+    buffer.ys = array('i', (i % 1080 for i in range(count)))
+    buffer.dxs = array('i', [0]) * count
+    buffer.dys = array('i', [0]) * count
+    buffer.codes = array('i', [-1]) * count
+    buffer.max_timestamp = buffer.timestamps[-1] if count else 0.0
+    return buffer
+
+
+def run_child(path):
+    output = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, path=path)],
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), float(output[1]), float(output[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,1000000,10000000')
+    parser.add_argument('--json-limit', type=int, default=1_000_000,
+                        help="JSON файлы больше этого числа событий не генерируются (они занимают гигабайты)")
+    args = parser.parse_args()
+
+    print(f"{'События':>10} {'Формат':<6} {'Размер, МБ':>11} {'Открытие, с':>12} {'С проходом, с':>14} {'RSS, МБ':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (int(s) for s in args.sizes.split(',')):
+            buffer = make_buffer(count)
+            v2_path = os.path.join(tmp, f'{count}_v2.clk')
+            clkformat.save(v2_path, buffer)
+            paths = [('v2', v2_path)]
+            if count <= args.json_limit:
+                json_path = os.path.join(tmp, f'{count}_v1.clk')
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    buffer.dump_json(f)
+                paths.insert(0, ('json', json_path))
+            del buffer
+
+            for fmt, path in paths:
+                opened, scanned, rss = run_child(path)
+                size_mb = os.path.getsize(path) / 2**20
+                print(f"{count:>10} {fmt:<6} {size_mb:>11.1f} {opened:>12.4f} {scanned:>14.4f} {rss:>9.1f}")
+                os.remove(path)
+            if count > args.json_limit:
+                print(f"{count:>10} {'json':<6} {'пропущено (--json-limit)':>48}")
+
+
+if __name__ == "__main__":
+    main()
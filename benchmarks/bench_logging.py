@@ -0,0 +1,82 @@
+"""
+Бенчмарк цены журнала (applog.py) в цикле воспроизведения Player на CaptureBackend.
+
+Сравнивает темп (событий в секунду) при выключенном журнале, пороге info
+(несколько сообщений на прогон) и пороге debug, где цикл пишет строку
+трассировки на каждую пачку - в /dev/null и в файл. С --max-batch 1
+каждое событие - отдельная пачка, то есть и отдельное сообщение. Для
+сравнения тот же цикл с синхронным print() на каждую пачку (как писал
+плеер до applog) - через обертку бэкенда.
+
+Запуск: python benchmarks/bench_logging.py [--events 200000] [--speed 1000000] [--max-batch 1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import applog
+from backends import CaptureBackend
+from player import Player
+from bench_playback import make_recording
+
+
+class PrintingBackend(CaptureBackend):
+    """CaptureBackend, который печатает каждую пачку синхронно, как прежний print() плеера"""
+
+    def send_batch(self, ops):
+        print(f"[Player] Пачка: {len(ops)} действий")
+        super().send_batch(ops)
+
+
+def run(recording, backend, speed, max_batch):
+    player = Player(backend=backend, max_batch=max_batch)
+    started = time.perf_counter()
+    player.play(recording, 1, speed)
+    player.play_thread.join()
+    elapsed = time.perf_counter() - started
+    flush_started = time.perf_counter()
+    applog.flush(timeout=60.0)
+    return elapsed, time.perf_counter() - flush_started, player.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--rate', type=float, default=100.0, help="Частота событий в записи, Гц")
+    parser.add_argument('--speed', type=float, default=1000000.0, help="Скорость воспроизведения")
+    parser.add_argument('--max-batch', type=int, default=1, help="Наибольшая пачка (1 - сообщение на событие)")
+    args = parser.parse_args()
+
+    recording = make_recording(args.events, args.rate)
+    log_path = os.path.join(tempfile.mkdtemp(), 'bench.log')
+    modes = [
+        ("выключен (error)", applog.ERROR, None, CaptureBackend),
+        ("info", applog.INFO, None, CaptureBackend),
+        ("debug, /dev/null", applog.DEBUG, None, CaptureBackend),
+        ("debug, файл", applog.DEBUG, log_path, CaptureBackend),
+        ("print() на пачку", applog.ERROR, None, PrintingBackend),
+    ]
+    print(f"Событий: {args.events}, скорость x{args.speed:g}, пачка до {args.max_batch}")
+    print(f"{'Журнал':<20} {'Время, с':>9} {'Событий/с':>12} {'Сообщений':>10} {'Вытеснено':>10} {'Дозапись, с':>12}")
+    for name, level, path, backend_class in modes:
+        writer = applog.writer
+        emitted, dropped = writer.emitted, writer.dropped
+        applog.configure(level=level, path=path or '')
+        # Вывод в консоль не нужен: печатаем только итог
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            elapsed, flushed, stats = run(recording, backend_class(keep=False), args.speed, args.max_batch)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(f"{name:<20} {elapsed:9.2f} {stats.get('events_per_second', 0):12,.0f} "
+              f"{writer.emitted - emitted:10} {writer.dropped - dropped:10} {flushed:12.2f}")
+    applog.configure(level=applog.INFO, path='')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Бенчмарк памяти: список словарей (старый формат Recorder) против ActionBuffer.
+
+Запуск: python benchmarks/bench_memory.py [количество_событий]
+По умолчанию моделируется час движения мыши с частотой 1 кГц.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import ActionBuffer
+
+
+def synthetic_events(count):
+    """Генерирует поток событий как у Recorder: в основном движения, изредка клики и клавиши"""
+    for i in range(count):
+        timestamp = i / 1000.0
+        if i % 500 == 0:
+            yield ('click', timestamp, i % 1920, i % 1080, 'Button.left', (i // 500) % 2 == 0)
+        elif i % 700 == 0:
+            yield ('key', timestamp, 'a', (i // 700) % 2 == 0)
+        else:
+            yield ('move', timestamp, i % 1920, i % 1080)
+
+
+def build_dicts(count):
+    actions = []
+    for event in synthetic_events(count):
+        if event[0] == 'move':
+            actions.append({'type': 'mouse_move', 'timestamp': event[1], 'x': event[2], 'y': event[3]})
+        elif event[0] == 'click':
+            actions.append({'type': 'mouse_click', 'timestamp': event[1], 'x': event[2], 'y': event[3],
+                            'button': event[4], 'pressed': event[5]})
+        else:
+            actions.append({'type': 'key_press' if event[3] else 'key_release',
+                            'timestamp': event[1], 'key': event[2]})
+    return actions
+
+
+def build_buffer(count):
+    buffer = ActionBuffer()
+    for event in synthetic_events(count):
+        if event[0] == 'move':
+            buffer.append_move(event[1], event[2], event[3])
+        elif event[0] == 'click':
+            buffer.append_click(event[1], event[2], event[3], event[4], event[5])
+        else:
+            buffer.append_key(event[1], event[2], event[3])
+    return buffer
+
+
+def measure(builder, count):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = builder(count)
+    elapsed = time.perf_counter() - started
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3_600_000
+    print(f"Событий: {count}")
+    dict_bytes, dict_time = measure(build_dicts, count)
+    buffer_bytes, buffer_time = measure(build_buffer, count)
+    print(f"{'Представление':<16}{'Память, МБ':>12}{'Байт/событие':>15}{'Время, с':>10}")
+    for name, size, elapsed in (("list[dict]", dict_bytes, dict_time),
+                                ("ActionBuffer", buffer_bytes, buffer_time)):
+        print(f"{name:<16}{size / 2**20:>12.1f}{size / count:>15.1f}{elapsed:>10.2f}")
+    print(f"Экономия: {dict_bytes / max(buffer_bytes, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Бенчмарк полного пути воспроизведения Player на CaptureBackend (без графической среды).
+
+Измеряет пропускную способность (скорость x1000, события почти без ожидания)
+и точность (скорость x1: опоздание каждого события относительно расписания).
+
+Запуск: python benchmarks/bench_playback.py [--events 20000] [--rate 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import ActionBuffer
+from backends import CaptureBackend
+from player import Player
+
+
+def make_recording(count, rate):
+    buffer = ActionBuffer()
+    for i in range(count):
+        timestamp = i / rate
+        if i % 100 == 50:
+            buffer.append_click(timestamp, i % 1920, i % 1080, 'Button.left', (i // 100) % 2 == 0)
+        elif i % 100 == 75:
+            buffer.append_key(timestamp, 'a', (i // 100) % 2 == 0)
+        else:
+            buffer.append_move(timestamp, i % 1920, i % 1080)
+    return buffer
+
+
+def play(player, recording, speed_factor):
+    started = time.perf_counter()
+    player.play(recording, 1, speed_factor)
+    player.play_thread.join()
+    return time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="Частота событий в записи, Гц")
+    args = parser.parse_args()
+
+    recording = make_recording(args.events, args.rate)
+
+    backend = CaptureBackend(keep=False)
+    elapsed = play(Player(backend=backend), recording, 1000.0)
+    print(f"Пропускная способность: {backend.count / elapsed:,.0f} событий/с ({backend.count} за {elapsed:.2f} с)")
+
+    backend = CaptureBackend()
+    play(Player(backend=backend), recording, 1.0)
+    offsets = [sent - ts for (sent, _op, _args), ts in zip(backend.events, recording.timestamps)]
+    # Момент начала внутри потока плеера не виден, поэтому за ноль берется самое раннее событие
+    start = min(offsets)
+    lateness = sorted(offset - start for offset in offsets)
+    print(f"Опоздание при x1: p50 {percentile(lateness, 0.5) * 1e6:.0f} мкс, "
+          f"p99 {percentile(lateness, 0.99) * 1e6:.0f} мкс, max {lateness[-1] * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Бенчмарк стоимости обработчика хука при записи.
+
+Поток "мыши" шлет движения с максимальной скоростью, поток "клавиатуры" -
+нажатия, а поток GUI каждые 100 мс вызывает len() на буфере. Сравнивается
+время одного вызова обработчика внутри хука:
+
+    direct - обработчик сам пишет в ActionBuffer (под общей блокировкой);
+    ring   - обработчик кладет кортеж в SPSCRing, в буфер пишет поток-потребитель.
+
+Печатаются перцентили времени обработчика, число записанных событий
+и счетчики колец (overflowed / dropped).
+
+Запуск: python benchmarks/bench_ring.py [--events 200000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import ActionBuffer, KIND_MOUSE_MOVE, KIND_KEY_PRESS
+from ringbuf import SPSCRing
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(mode, events):
+    buffer = ActionBuffer()
+    rings = (SPSCRing(), SPSCRing())
+    done = threading.Event()
+    durations = []
+
+    if mode == 'direct':
+        def on_move(t, x, y):
+            buffer.append_move(t, x, y)
+
+        def on_key(t, key):
+            buffer.append_key(t, key, True)
+    else:
+        mouse_push = rings[0].push
+        key_push = rings[1].push
+
+        def on_move(t, x, y):
+            mouse_push((t, KIND_MOUSE_MOVE, x, y, 0, 0, None))
+
+        def on_key(t, key):
+            key_push((t, KIND_KEY_PRESS, 0, 0, 0, 0, key))
+
+    def consumer():
+        while True:
+            stopping = done.wait(0.005)
+            for ring in rings:
+                for t, kind, x, y, dx, dy, name in ring.drain():
+                    if kind == KIND_MOUSE_MOVE:
+                        buffer.append_move(t, x, y)
+                    else:
+                        buffer.append_key(t, name, True)
+            if stopping:
+                return
+
+    def mouse_thread():
+        perf_counter = time.perf_counter
+        for i in range(events):
+            started = perf_counter()
+            on_move(started, i % 1920, i % 1080)
+            durations.append(perf_counter() - started)
+
+    def keyboard_thread():
+        for i in range(events // 100):
+            on_key(time.perf_counter(), 'a')
+            time.sleep(0.0001)
+
+    def gui_thread():
+        while not done.wait(0.1):
+            len(buffer)
+
+    threads = [threading.Thread(target=f) for f in (mouse_thread, keyboard_thread)]
+    helpers = [threading.Thread(target=gui_thread)]
+    if mode == 'ring':
+        helpers.append(threading.Thread(target=consumer))
+    for thread in threads + helpers:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    for thread in helpers:
+        thread.join()
+
+    print(f"{mode:>6}: обработчик p50={percentile(durations, 0.5) * 1e6:6.2f} мкс "
+          f"p99={percentile(durations, 0.99) * 1e6:7.2f} мкс max={max(durations) * 1e3:6.2f} мс, "
+          f"записано {len(buffer)}")
+    if mode == 'ring':
+        for name, ring in zip(('mouse', 'keyboard'), rings):
+            print(f"        {name}: {ring.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    args = parser.parse_args()
+    for mode in ('direct', 'ring'):
+        run(mode, args.events)
+
+
+if __name__ == "__main__":
+    main()
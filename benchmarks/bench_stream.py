@@ -0,0 +1,53 @@
+"""
+Бенчмарк потокового чтения записи: пиковая память и скорость конвейера строк,
+который использует Player (ordered_rows поверх источника), для разных длин записи.
+
+Запуск: python benchmarks/bench_stream.py [--sizes 10000,100000,1000000] [--repeats 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clkformat
+from actions import ordered_rows
+from bench_load import make_buffer
+
+
+def consume(source, repeats):
+    count = 0
+    for _ in range(repeats):
+        for _row in ordered_rows(source):
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'События':>10} {'Источник':<10} {'Пик памяти, КБ':>15} {'Событий/с':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (int(s) for s in args.sizes.split(',')):
+            path = os.path.join(tmp, f'{count}.clk')
+            clkformat.save(path, make_buffer(count))
+            for label, stream in (('mmap', False), ('stream', True)):
+                source = clkformat.load(path, stream=stream)
+                tracemalloc.start()
+                started = time.perf_counter()
+                consumed = consume(source, args.repeats)
+                elapsed = time.perf_counter() - started
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                source.close()
+                print(f"{count:>10} {label:<10} {peak / 1024:>15.1f} {consumed / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
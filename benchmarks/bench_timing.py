@@ -0,0 +1,91 @@
+"""
+Бенчмарк точности ожидания: опоздание каждого действия относительно расписания.
+
+Плотная траектория мыши (по умолчанию 1 кГц) "воспроизводится" через
+CaptureBackend, который только запоминает момент вызова. Для каждой
+стратегии ожидания печатаются p50/p99/max опоздания и дрейф начала
+последнего повторения.
+
+Запуск: python benchmarks/bench_timing.py [--events 2000] [--rate 1000] [--repeats 3]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import CaptureBackend
+from timing import HybridTimer, SleepTimer
+
+
+class LegacySleepTimer:
+    """Прежнее поведение Player: time.sleep порциями по 50 мс, остаток меньше 1 мс не ждем"""
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def wait_until(self, deadline, stop_event):
+        remaining = deadline - time.perf_counter()
+        while remaining > 0.001 and not stop_event.is_set():
+            sleep_time = min(0.05, remaining)
+            time.sleep(sleep_time)
+            remaining -= sleep_time
+        return not stop_event.is_set()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run(timer, offsets, repeats, pause):
+    """Цикл того же вида, что Player._replay_actions: повторения привязаны к расписанию"""
+    backend = CaptureBackend()
+    stop_event = threading.Event()
+    scheduled = []
+    timer.start()
+    run_start = time.perf_counter()
+    first_start = run_start
+    for _ in range(repeats):
+        for offset in offsets:
+            deadline = run_start + offset
+            if deadline > time.perf_counter():
+                timer.wait_until(deadline, stop_event)
+            backend.move(0, 0)
+            scheduled.append(deadline)
+        run_start = run_start + offsets[-1] + pause
+        stop_event.wait(max(0, run_start - time.perf_counter()))
+    timer.stop()
+    sent = [event[0] for event in backend.events]
+    lateness = sorted(actual - target for actual, target in zip(sent, scheduled))
+    # Дрейф: насколько фактическое начало последнего повтора отстало от идеального
+    ideal_last = first_start + (repeats - 1) * (offsets[-1] + pause)
+    drift = sent[-len(offsets)] - ideal_last
+    return lateness, drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="Частота событий, Гц")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--pause', type=float, default=0.05)
+    args = parser.parse_args()
+
+    offsets = [i / args.rate for i in range(args.events)]
+    print(f"{'Стратегия':<10} {'p50, мкс':>10} {'p99, мкс':>10} {'max, мкс':>10} {'Дрейф, мкс':>11}")
+    for name, timer in (('legacy', LegacySleepTimer()), ('sleep', SleepTimer()), ('hybrid', HybridTimer())):
+        lateness, drift = run(timer, offsets, args.repeats, args.pause)
+        print(f"{name:<10} {percentile(lateness, 0.5) * 1e6:>10.0f} {percentile(lateness, 0.99) * 1e6:>10.0f} "
+              f"{lateness[-1] * 1e6:>10.0f} {drift * 1e6:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
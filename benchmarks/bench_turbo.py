@@ -0,0 +1,61 @@
+"""
+Бенчмарк турбо-режима Player на CaptureBackend (нулевой бэкенд, ничего не отправляет).
+
+Сравнивает темп (событий в секунду) обычного воспроизведения на большой
+скорости и турбо-режимов: без шага, с минимальным шагом между событиями
+и с ожиданием обработки каждой пачки (на нулевом бэкенде ожидание
+мгновенное, поэтому видна только цена самого вызова wait_idle).
+
+Запуск: python benchmarks/bench_turbo.py [--events 200000] [--min-gap 0.0001]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import CaptureBackend
+from player import Player, TURBO_DRAIN, TURBO_GAP
+from bench_playback import make_recording
+
+
+def run(recording, **options):
+    backend = CaptureBackend(keep=False)
+    player = Player(backend=backend)
+    started = time.perf_counter()
+    player.play(recording, 1, **options)
+    player.play_thread.join()
+    return time.perf_counter() - started, backend, player.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--rate', type=float, default=100.0, help="Частота событий в записи, Гц")
+    parser.add_argument('--min-gap', type=float, default=0.0001, help="Шаг для режима с минимальным шагом, секунд")
+    args = parser.parse_args()
+
+    recording = make_recording(args.events, args.rate)
+    modes = [
+        ("x1000 по записи", dict(speed_factor=1000.0)),
+        ("турбо, шаг 0", dict(turbo=TURBO_GAP)),
+        (f"турбо, шаг {args.min_gap:g} с", dict(turbo=TURBO_GAP, min_gap=args.min_gap)),
+        ("турбо, drain", dict(turbo=TURBO_DRAIN)),
+    ]
+    print(f"Событий: {args.events}, запись длится {recording.max_timestamp:.0f} с")
+    print(f"{'Режим':<22} {'Время, с':>9} {'Событий/с':>12} {'Пачек':>8} {'Ожиданий':>9}")
+    for name, options in modes:
+        # Журнал плеера в stdout не нужен: печатаем только итог
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            elapsed, backend, stats = run(recording, **options)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(f"{name:<22} {elapsed:9.2f} {stats.get('events_per_second', 0):12,.0f} "
+              f"{backend.batches:8} {backend.idle_waits:9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import locale
 from pathlib import Path
 
 APP_NAME = "ClickerRecord"  # Fixed name
+CLI_NAME = "clickerrecord-cli"  # Console runner (cli.py); a different name, since Windows file names ignore case
 
 def clean_previous_builds():
     """Clean up artifacts from previous builds."""
@@ -13,10 +14,11 @@ def clean_previous_builds():
     
     folders_to_clean = ["dist", "build", "__pycache__"]
     spec_file = f"{APP_NAME}.spec"
+    cli_spec_file = f"{CLI_NAME}.spec"
     old_spec_files = ["clicker.spec", "clicker_v2.spec", "clicker_v2.1.spec", 
                       "clicker_v2.3.spec", "clicker_v2.4.spec", "clicker_v2.5.spec"]
     
-    files_to_clean = [spec_file] + old_spec_files
+    files_to_clean = [spec_file, cli_spec_file] + old_spec_files
     
     for folder in folders_to_clean:
         if os.path.exists(folder):
@@ -34,8 +36,8 @@ def clean_previous_builds():
             except Exception as e:
                 print(f"  Warning: Failed to remove {file}: {str(e)}")
 
-def build_exe():
-    """Build the EXE file."""
+def build_exe(name=APP_NAME, script="main.py", console=False):
+    """Build the EXE file (GUI by default, console runner with console=True)."""
     try:
         import PyInstaller
         print(f"Found PyInstaller version {PyInstaller.__version__}")
@@ -45,26 +47,31 @@ def build_exe():
     
     print("\nStarting EXE build process...")
     
+    if console:
+        # The console runner never imports Qt, so keep it out of the bundle
+        window_flags = ["--console", "--exclude-module=PyQt5"]
+    else:
+        window_flags = ["--windowed", "--noconsole"]
     cmd = [
         "pyinstaller",
-        f"--name={APP_NAME}",
+        f"--name={name}",
         "--onefile",
-        "--windowed",
+        *window_flags,
         "--clean",
         "--icon=icon.ico",
         "--noconfirm",
         "--noupx",
-        "--noconsole",
         "--log-level=WARN",
         f"--add-data={os.path.abspath('icon.ico')};.",
-        "main.py"
+        f"--add-data={os.path.abspath('locales')};locales",
+        script
     ]
     
     print(f"\nBuild command: {' '.join(cmd)}\n")
     result = subprocess.run(cmd, capture_output=True, text=True, encoding=locale.getpreferredencoding(False), errors='ignore')
     
-    exe_path_in_dist = os.path.abspath(os.path.join("dist", f"{APP_NAME}.exe"))
-    final_exe_path = os.path.abspath(f"{APP_NAME}.exe")
+    exe_path_in_dist = os.path.abspath(os.path.join("dist", f"{name}.exe"))
+    final_exe_path = os.path.abspath(f"{name}.exe")
     
     if result.returncode == 0 and os.path.exists(exe_path_in_dist):
         print(f"\nBuild successful: {exe_path_in_dist}")
@@ -78,7 +85,7 @@ def build_exe():
             print(f"File size: {size_mb:.2f} MB")
             return True
         except Exception as e:
-            print(f"Error moving {APP_NAME}.exe: {e}")
+            print(f"Error moving {name}.exe: {e}")
             return False
     else:
         print("Build failed!")
@@ -93,7 +100,7 @@ def cleanup_build_files():
     """Clean up temporary build files after moving the EXE."""
     print("\nCleaning up temporary build files...")
     folders_to_clean = ["dist", "build"]
-    spec_file = f"{APP_NAME}.spec"
+    spec_files = [f"{APP_NAME}.spec", f"{CLI_NAME}.spec"]
 
     for folder in folders_to_clean:
         if os.path.exists(folder):
@@ -103,12 +110,13 @@ def cleanup_build_files():
             except Exception as e:
                 print(f"  Warning: Failed to remove folder {folder}: {e}")
 
-    if os.path.exists(spec_file):
-        try:
-            os.remove(spec_file)
-            print(f"  Removed file {spec_file}")
-        except Exception as e:
-            print(f"  Warning: Failed to remove file {spec_file}: {e}")
+    for spec_file in spec_files:
+        if os.path.exists(spec_file):
+            try:
+                os.remove(spec_file)
+                print(f"  Removed file {spec_file}")
+            except Exception as e:
+                print(f"  Warning: Failed to remove file {spec_file}: {e}")
 
 def main():
     print("=" * 60)
@@ -117,10 +125,10 @@ def main():
     
     clean_previous_builds()
     
-    if build_exe():
+    if build_exe() and build_exe(CLI_NAME, "cli.py", console=True):
         cleanup_build_files()
         print("\nAll operations completed successfully!")
-        print(f"File {APP_NAME}.exe created in the current directory.")
+        print(f"Files {APP_NAME}.exe and {CLI_NAME}.exe created in the current directory.")
     else:
         print("\nEXE build failed! Temporary files might remain!")
     
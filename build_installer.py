@@ -57,6 +57,7 @@ def build_exe():
         "--noconsole",
         "--log-level=WARN",
         f"--add-data={os.path.abspath('icon.ico')};.",
+        f"--add-data={os.path.abspath('locales')};locales",
         "main.py"
     ]
     
@@ -0,0 +1,263 @@
+"""
+Консольный запуск записей без графического интерфейса (Qt не импортируется).
+
+    python cli.py play file.clk [--repeat N] [--speed X] [--backend pynput|win32|capture]
+                                [--start T0] [--end T1] [--loop] [--max-gap S [--skip-idle]]
+                                [--turbo [--min-gap S] [--drain]] [--report run.json]
+    python cli.py batch file.clk dir/ jobs.json [--state queue.json] [--prefetch N]
+    python cli.py batch --state queue.json         (продолжить прерванную очередь)
+
+Коды возврата (для планировщиков задач):
+
+    0   - воспроизведение завершено (для batch - все задания)
+    1   - ошибка во время воспроизведения (для batch - хотя бы в одном задании)
+    2   - неверные аргументы командной строки
+    3   - файл не найден или не является записью .clk
+    4   - бэкенд ввода недоступен (нет pynput, не Windows для win32)
+    130 - прервано пользователем (Ctrl+C)
+"""
+import argparse
+import os
+import sys
+import time
+
+import applog
+import clkformat
+import latency
+import timeline
+from backends import BACKENDS, create_backend
+from player import Player, TURBO_DRAIN, TURBO_GAP
+from timing import make_timer
+
+EXIT_OK = 0
+EXIT_PLAYBACK_ERROR = 1
+EXIT_USAGE = 2
+EXIT_BAD_FILE = 3
+EXIT_BACKEND = 4
+EXIT_INTERRUPTED = 130
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("должно быть не меньше 1")
+    return number
+
+
+def _positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("должно быть больше 0")
+    return number
+
+
+def _non_negative_float(value):
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("должно быть не меньше 0")
+    return number
+
+
+def _max_gap(value):
+    number = float(value)
+    if number < timeline.MIN_GAP:
+        raise argparse.ArgumentTypeError(f"должно быть не меньше {timeline.MIN_GAP}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='clickerrecord', description="Воспроизведение записей ClickerRecord без GUI")
+    sub = parser.add_subparsers(dest='command', required=True)
+    play_parser = sub.add_parser('play', help="Воспроизвести запись .clk")
+    play_parser.add_argument('path', help="Файл записи (.clk, v1 JSON или v2)")
+    play_parser.add_argument('--repeat', type=_positive_int, default=1, help="Количество повторений (по умолчанию 1)")
+    play_parser.add_argument('--speed', type=_positive_float, default=1.0, help="Коэффициент скорости (по умолчанию 1.0)")
+    play_parser.add_argument('--backend', choices=sorted(BACKENDS), default='pynput', help="Бэкенд ввода")
+    play_parser.add_argument('--timer', choices=('hybrid', 'sleep'), default='hybrid', help="Стратегия ожидания")
+    play_parser.add_argument('--start', type=_non_negative_float, help="Начать с этой секунды записи")
+    play_parser.add_argument('--end', type=_non_negative_float, help="Закончить на этой секунде записи")
+    play_parser.add_argument('--loop', action='store_true', help="Повторять фрагмент до Ctrl+C (--repeat не учитывается)")
+    play_parser.add_argument('--max-gap', type=_max_gap, help="Сокращать паузы длиннее S секунд до S")
+    play_parser.add_argument('--skip-idle', action='store_true', help="С --max-gap: удалять такие паузы целиком")
+    play_parser.add_argument('--turbo', action='store_true',
+                             help="Как можно быстрее: без записанных пауз (--speed и --max-gap не учитываются)")
+    play_parser.add_argument('--min-gap', type=_non_negative_float, default=0.0,
+                             help="С --turbo: минимальный шаг между событиями, секунд (по умолчанию 0)")
+    play_parser.add_argument('--drain', action='store_true',
+                             help="С --turbo: после каждой пачки ждать, пока активное окно обработает ввод")
+    play_parser.add_argument('--report', help="Записать отчет о прогоне (опоздание действий, перегрузки) в JSON")
+    play_parser.add_argument('--stream', action='store_true', help="Читать запись с диска порциями (мало памяти)")
+    play_parser.add_argument('--quiet', '-q', action='store_true', help="Не печатать журнал плеера")
+    play_parser.add_argument('--log-level', choices=sorted(applog.LEVELS, key=applog.LEVELS.get),
+                             default='info', help="Порог журнала (debug - с трассировкой каждой пачки)")
+
+    batch_parser = sub.add_parser('batch', help="Воспроизвести очередь записей подряд")
+    batch_parser.add_argument('paths', nargs='*',
+                              help="Файлы .clk, каталоги с записями и файлы заданий .json")
+    batch_parser.add_argument('--repeat', type=_positive_int, default=1, help="Повторений для заданий без своего значения")
+    batch_parser.add_argument('--speed', type=_positive_float, default=1.0, help="Скорость для заданий без своего значения")
+    batch_parser.add_argument('--state', help="Файл состояния очереди: прерванная очередь продолжается с него")
+    batch_parser.add_argument('--prefetch', type=_positive_int,
+                              help="Сколько следующих заданий готовить заранее (по умолчанию 2)")
+    batch_parser.add_argument('--workers', type=_positive_int, help="Процессов подготовки (по умолчанию --prefetch)")
+    batch_parser.add_argument('--backend', choices=sorted(BACKENDS), default='pynput', help="Бэкенд ввода")
+    batch_parser.add_argument('--timer', choices=('hybrid', 'sleep'), default='hybrid', help="Стратегия ожидания")
+    batch_parser.add_argument('--quiet', '-q', action='store_true', help="Не печатать журнал плеера")
+    batch_parser.add_argument('--log-level', choices=sorted(applog.LEVELS, key=applog.LEVELS.get),
+                              default='info', help="Порог журнала")
+    return parser
+
+
+def play(args):
+    if args.start is not None and args.end is not None and args.end < args.start:
+        print("--end не может быть раньше --start", file=sys.stderr)
+        return EXIT_USAGE
+    if args.skip_idle and args.max_gap is None:
+        print("--skip-idle задается вместе с --max-gap", file=sys.stderr)
+        return EXIT_USAGE
+    if (args.drain or args.min_gap) and not args.turbo:
+        print("--min-gap и --drain задаются вместе с --turbo", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        actions = clkformat.load(args.path, stream=args.stream)
+    except FileNotFoundError:
+        print(f"Файл не найден: {args.path}", file=sys.stderr)
+        return EXIT_BAD_FILE
+    except (ValueError, OSError) as e: # FormatError, JSONDecodeError, ошибки чтения
+        print(f"Не удалось открыть запись {args.path}: {e}", file=sys.stderr)
+        return EXIT_BAD_FILE
+
+    try:
+        try:
+            backend = create_backend(args.backend)
+        except (ImportError, OSError) as e:
+            print(f"Бэкенд ввода '{args.backend}' недоступен: {e}", file=sys.stderr)
+            return EXIT_BACKEND
+
+        errors = []
+        finished = []
+        player = Player(backend=backend, timer=make_timer(args.timer),
+                        on_finished=lambda: finished.append(True), on_error=errors.append)
+        started = time.perf_counter()
+        gap_mode = timeline.GAP_REMOVE if args.skip_idle else timeline.GAP_CAP
+        turbo = (TURBO_DRAIN if args.drain else TURBO_GAP) if args.turbo else None
+        player.play(actions, args.repeat, args.speed, args.start, args.end, args.loop,
+                    args.max_gap, gap_mode, turbo, args.min_gap)
+        try:
+            # join с таймаутом, чтобы Ctrl+C доходил до главного потока
+            while player.play_thread.is_alive():
+                player.play_thread.join(0.1)
+        except KeyboardInterrupt:
+            player.stop()
+            player.play_thread.join()
+            print("Прервано пользователем", file=sys.stderr)
+            return EXIT_INTERRUPTED
+        elapsed = time.perf_counter() - started
+        applog.flush() # Журнал прогона - до итоговых строк
+
+        if errors:
+            print(errors[0], file=sys.stderr)
+            return EXIT_PLAYBACK_ERROR
+        if not finished:
+            print("Воспроизведение остановлено до завершения", file=sys.stderr)
+            return EXIT_PLAYBACK_ERROR
+        events = player.stats.get('batched_events', 0)
+        speed = "турбо" if args.turbo else f"x{args.speed:g}"
+        print(f"Воспроизведено событий: {events} за {elapsed:.2f} с "
+              f"({os.path.basename(args.path)}, повторов: {args.repeat}, скорость: {speed})")
+        if args.turbo:
+            print(f"Темп: {player.stats.get('events_per_second', 0):.0f} событий/с")
+        else:
+            lateness = player.report['lateness']
+            print(f"Опоздание действий: p50 {lateness['p50_ms']} мс, p90 {lateness['p90_ms']} мс, "
+                  f"p99 {lateness['p99_ms']} мс, макс. {lateness['max_ms']} мс; "
+                  f"перегрузок: {player.report['overruns']}")
+        if args.report:
+            try:
+                latency.write_report(args.report, player.report)
+            except OSError as e:
+                print(f"Не удалось записать отчет {args.report}: {e}", file=sys.stderr)
+        return EXIT_OK
+    finally:
+        actions.close()
+
+
+def run_batch(args):
+    import batch # Только здесь: пул и его зависимости не нужны play
+
+    if args.prefetch is None:
+        args.prefetch = batch.DEFAULT_PREFETCH
+    if args.paths:
+        try:
+            jobs = batch.load_jobs(args.paths, repeat=args.repeat, speed=args.speed)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Не удалось прочитать список заданий: {e}", file=sys.stderr)
+            return EXIT_BAD_FILE
+    elif args.state and os.path.exists(args.state):
+        try:
+            jobs, _results = batch.load_state(args.state)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Не удалось прочитать файл состояния {args.state}: {e}", file=sys.stderr)
+            return EXIT_BAD_FILE
+    else:
+        print("Укажите записи или существующий файл состояния (--state)", file=sys.stderr)
+        return EXIT_USAGE
+    if not jobs:
+        print("Очередь пуста", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        backend = create_backend(args.backend)
+    except (ImportError, OSError) as e:
+        print(f"Бэкенд ввода '{args.backend}' недоступен: {e}", file=sys.stderr)
+        return EXIT_BACKEND
+
+    def report(index, job, result):
+        applog.flush()
+        line = f"[{index + 1}/{len(jobs)}] {os.path.basename(job.path)}: {result['status']}"
+        if 'play_s' in result:
+            line += (f", {result['play_s']:.2f} с, событий {result['events']} "
+                     f"({result['events_per_second']:.0f}/с), ожидание подготовки {result['wait_s'] * 1000:.0f} мс, "
+                     f"подготовка {result['prepare_s'] * 1000:.0f} мс, открытие {result['open_s'] * 1000:.1f} мс")
+        if result.get('error'):
+            line += f": {result['error']}"
+        applog.flush() # Журнал задания - до его итоговой строки
+        print(line)
+
+    player = Player(backend=backend, timer=make_timer(args.timer))
+    runner = batch.BatchRunner(jobs, player, state_path=args.state, prefetch=args.prefetch,
+                               workers=args.workers, on_job=report)
+    try:
+        results = runner.run()
+    except KeyboardInterrupt:
+        print("Прервано пользователем" + (f", состояние в {args.state}" if args.state else ""), file=sys.stderr)
+        return EXIT_INTERRUPTED
+    failed = [result for result in results if not result or result['status'] != batch.STATUS_DONE]
+    print(f"Выполнено заданий: {len(results) - len(failed)} из {len(results)}")
+    return EXIT_PLAYBACK_ERROR if failed else EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        # argparse завершает работу сам: --help - код 0, ошибка аргументов - 2
+        return e.code if e.code is not None else EXIT_OK
+    # Журнал плеера пишет фоновый поток (applog.py); --quiet выключает его вывод в консоль
+    applog.configure(level=args.log_level, stream=not args.quiet)
+    try:
+        if args.command == 'play':
+            return play(args)
+        if args.command == 'batch':
+            return run_batch(args)
+        return EXIT_USAGE
+    finally:
+        applog.flush()
+
+
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support() # Пул подготовки batch в собранном exe
+    sys.exit(main())
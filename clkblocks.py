@@ -0,0 +1,323 @@
+"""
+Формат .clk версии 3: сжатые блоки с индексом.
+
+Записи длинных сессий состоят в основном из мелких приращений координат,
+поэтому колонки хранятся не целиком, а блоками по BLOCK_ROWS строк:
+
+    заголовок (HEADER, 80 байт)
+    таблица строк и метаданные (как в v2)
+    блоки: каждая колонка блока - разности соседних значений в zigzag
+           и varint (LEB128), затем весь блок сжимается zstd (если установлен
+           пакет zstandard) или zlib
+    индекс блоков (INDEX_ENTRY на блок): смещение, размер, первая строка,
+           число строк, первая метка времени и максимум меток с начала записи
+
+Блоки независимы (разности считаются от нуля в начале блока), поэтому
+воспроизведение можно начать с любой метки времени: нужный блок находится
+двоичным поиском по индексу, предыдущие блоки не распаковываются.
+Метки времени хранятся в целых микросекундах.
+"""
+import bisect
+import json
+import os
+import struct
+import zlib
+from itertools import accumulate
+
+import clkformat
+from actions import ActionBuffer, ActionColumns, COLUMNS
+
+MAGIC = b'CLK3'
+VERSION = 3
+
+# magic, version, flags, codec, count, max_timestamp,
+# names_offset, names_size, meta_offset, meta_size, index_offset, block_count
+HEADER = struct.Struct('<4sHBBQdQQQQQQ')
+HEADER_SIZE = 80
+
+# смещение, сжатый размер, первая строка, строк,
+# первая метка времени блока, максимум меток с начала записи до конца блока
+INDEX_ENTRY = struct.Struct('<QIQIdd')
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {'none': CODEC_NONE, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+
+# Строк в блоке: шаг, с которым можно начать воспроизведение с середины
+BLOCK_ROWS = 8192
+
+# Режим колонки в блоке: все значения меньше 128 (varint совпадает с байтами) или общий varint
+MODE_BYTES = 0
+MODE_VARINT = 1
+
+TIME_SCALE = 1_000_000 # Метки времени - целые микросекунды
+
+_zstd_module = None
+
+
+def _zstd():
+    """Пакет zstandard (необязательная зависимость) или None"""
+    global _zstd_module
+    if _zstd_module is None:
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = False
+        _zstd_module = zstandard
+    return _zstd_module or None
+
+
+def default_codec():
+    return CODEC_ZSTD if _zstd() else CODEC_ZLIB
+
+
+def _compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return _zstd().ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompressor(codec):
+    if codec == CODEC_ZSTD:
+        zstd = _zstd()
+        if zstd is None:
+            raise clkformat.FormatError("Запись сжата zstd: установите пакет zstandard")
+        return zstd.ZstdDecompressor().decompress
+    if codec == CODEC_ZLIB:
+        return zlib.decompress
+    if codec == CODEC_NONE:
+        return bytes
+    raise clkformat.FormatError(f"Неизвестный метод сжатия: {codec}")
+
+
+# --- Кодирование колонок ---
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+# Готовые varint для частых значений (разности до 2^14 - два байта)
+_VARINT_TABLE = [_varint(value) for value in range(1 << 14)]
+
+
+def encode_column(values):
+    """Разности соседних значений -> zigzag -> varint; первый байт - режим"""
+    previous = 0
+    zigzag = []
+    append = zigzag.append
+    for value in values:
+        delta = value - previous
+        previous = value
+        append(delta << 1 if delta >= 0 else (-delta << 1) - 1)
+    if not zigzag or max(zigzag) < 0x80:
+        # Все значения в одном байте: varint совпадает с самими байтами
+        return bytes((MODE_BYTES,)) + bytes(zigzag)
+    table = _VARINT_TABLE
+    limit = len(table)
+    return bytes((MODE_VARINT,)) + b''.join(
+        [table[value] if value < limit else _varint(value) for value in zigzag])
+
+
+def decode_column(data, offset, count):
+    """Обратное encode_column: возвращает (значения, смещение за колонкой)"""
+    mode = data[offset]
+    offset += 1
+    if mode == MODE_BYTES:
+        zigzag = data[offset:offset + count]
+        offset += count
+    elif mode == MODE_VARINT:
+        zigzag = []
+        append = zigzag.append
+        value = shift = 0
+        while len(zigzag) < count:
+            byte = data[offset]
+            offset += 1
+            if byte < 0x80:
+                append(value | (byte << shift))
+                value = shift = 0
+            else:
+                value |= (byte & 0x7F) << shift
+                shift += 7
+    else:
+        raise clkformat.FormatError(f"Неизвестный режим колонки: {mode}")
+    values = list(accumulate((value >> 1) ^ -(value & 1) for value in zigzag))
+    return values, offset
+
+
+def _encode_block(columns):
+    """columns - последовательности в порядке COLUMNS; метки времени уже в микросекундах"""
+    return b''.join(encode_column(column) for column in columns)
+
+
+def _decode_block(data, count):
+    columns = []
+    offset = 0
+    for _name in COLUMNS:
+        values, offset = decode_column(data, offset, count)
+        columns.append(values)
+    columns[0] = [value / TIME_SCALE for value in columns[0]]
+    return columns
+
+
+# --- Запись ---
+
+def save(path, actions, meta=None, codec=None, block_rows=BLOCK_ROWS, progress=None, cancelled=None):
+    """
+    Сохраняет действия в формате v3 (сжатые блоки).
+
+    codec - 'zstd', 'zlib', 'none' или None (zstd, если установлен, иначе zlib).
+    Как и clkformat.save, пишет во временный файл и атомарно переименовывает;
+    progress(строк записано, всего) и cancelled() проверяются между блоками.
+    """
+    codec = default_codec() if codec is None else CODEC_NAMES[codec]
+    if codec == CODEC_ZSTD and _zstd() is None:
+        raise ImportError("Для сжатия zstd нужен пакет zstandard")
+    actions = ActionBuffer.coerce(actions)
+    if not isinstance(actions, ActionColumns):
+        actions = ActionBuffer.from_source(actions)
+    count = len(actions)
+    names_data = clkformat.encode_names(actions.names)
+    meta_data = json.dumps(dict(actions.meta, **(meta or {})), ensure_ascii=False).encode('utf-8')
+    names_offset = HEADER_SIZE
+    meta_offset = names_offset + len(names_data)
+    blocks_offset = meta_offset + len(meta_data)
+
+    columns = [getattr(actions, name) for name in COLUMNS]
+    index = []
+    running_max = 0.0
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * HEADER_SIZE) # Заголовок пишется последним, когда известен индекс
+            f.write(names_data)
+            f.write(meta_data)
+            offset = blocks_offset
+            for start in range(0, count, block_rows):
+                clkformat.check_cancelled(cancelled)
+                end = min(start + block_rows, count)
+                timestamps = columns[0][start:end]
+                block = [[round(timestamp * TIME_SCALE) for timestamp in timestamps]]
+                block.extend(column[start:end] for column in columns[1:])
+                data = _compress(codec, _encode_block(block))
+                f.write(data)
+                running_max = max(running_max, max(timestamps))
+                index.append(INDEX_ENTRY.pack(offset, len(data), start, end - start,
+                                              timestamps[0], running_max))
+                offset += len(data)
+                if progress is not None:
+                    progress(end, count)
+            f.write(b''.join(index))
+            flags = clkformat.FLAG_SORTED if actions.is_sorted else 0
+            header = HEADER.pack(MAGIC, VERSION, flags, codec, count, float(actions.max_timestamp),
+                                 names_offset, len(names_data), meta_offset, len(meta_data),
+                                 offset, len(index))
+            f.seek(0)
+            f.write(header + b'\0' * (HEADER_SIZE - len(header)))
+            clkformat.check_cancelled(cancelled)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if progress is not None:
+        progress(count, count)
+
+
+# --- Чтение ---
+
+def is_compressed(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class CompressedActions:
+    """
+    Запись v3, читаемая с диска по блокам.
+
+    В памяти держатся заголовок, индекс и один распакованный блок. Как и
+    StreamedActions, каждый вызов iter_rows() заново проходит файл, а
+    iter_rows_from(timestamp) начинает с блока, где встречается эта метка.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_SIZE)
+            if len(head) < HEADER_SIZE:
+                raise clkformat.FormatError("Файл слишком короткий для заголовка .clk")
+            (magic, version, flags, codec, count, max_timestamp, names_offset, names_size,
+             meta_offset, meta_size, index_offset, block_count) = HEADER.unpack_from(head, 0)
+            if magic != MAGIC:
+                raise clkformat.FormatError("Неизвестный формат файла (нет сигнатуры CLK3)")
+            if version != VERSION:
+                raise clkformat.FormatError(f"Неподдерживаемая версия формата: {version}")
+            f.seek(names_offset)
+            self.names = clkformat.decode_names(f.read(names_size))
+            f.seek(meta_offset)
+            self.meta = json.loads(f.read(meta_size).decode('utf-8')) if meta_size else {}
+            f.seek(index_offset)
+            index_data = f.read(INDEX_ENTRY.size * block_count)
+        if len(index_data) < INDEX_ENTRY.size * block_count:
+            raise clkformat.FormatError("Файл обрезан: индекс блоков неполный")
+        self.index = [INDEX_ENTRY.unpack_from(index_data, i * INDEX_ENTRY.size) for i in range(block_count)]
+        # Максимум меток с начала записи не убывает - по нему ищется блок для любой записи
+        self._block_maxima = [entry[5] for entry in self.index]
+        self._decompress = _decompressor(codec)
+        self.codec = next(name for name, number in CODEC_NAMES.items() if number == codec)
+        self._count = count
+        self.max_timestamp = max_timestamp
+        self.is_sorted = bool(flags & clkformat.FLAG_SORTED)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def block_for(self, timestamp):
+        """Номер первого блока, в котором есть строка с меткой не меньше timestamp"""
+        return bisect.bisect_left(self._block_maxima, timestamp)
+
+    def read_block(self, number, f=None):
+        """Распаковывает блок: колонки в порядке COLUMNS (метки времени - в секундах)"""
+        offset, size, _start, rows, _first, _max = self.index[number]
+        if f is None:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(size)
+        else:
+            f.seek(offset)
+            data = f.read(size)
+        return _decode_block(self._decompress(data), rows)
+
+    def iter_rows(self, chunk_size=None):
+        return self._iter_blocks(0)
+
+    def iter_rows_from(self, timestamp):
+        """Строки с меткой не меньше timestamp; блоки до нужного не читаются и не распаковываются"""
+        for row in self._iter_blocks(self.block_for(timestamp)):
+            if row[0] >= timestamp:
+                yield row
+
+    def _iter_blocks(self, first):
+        with open(self.path, 'rb') as f:
+            for number in range(first, len(self.index)):
+                timestamps, xs, ys, dxs, dys, codes, kinds = self.read_block(number, f)
+                yield from zip(timestamps, kinds, xs, ys, dxs, dys, codes)
+
+    def to_buffer(self):
+        """Распаковывает запись целиком в ActionBuffer (например, перед заменой её файла)"""
+        return ActionBuffer.from_source(self)
+
+    def close(self):
+        pass
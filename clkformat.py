@@ -0,0 +1,504 @@
+"""
+Формат файлов записей .clk.
+
+Версия 1 (старая) - JSON список словарей действий.
+Версия 2 - бинарный контейнер, который можно отобразить в память (mmap)
+и воспроизводить прямо из отображения, не разбирая события в объекты:
+
+    заголовок (HEADER, 64 байта)
+    таблица строк (имена клавиш и кнопок)
+    метаданные (JSON)
+    колонки фиксированной ширины, каждая выровнена на 8 байт,
+    в порядке actions.COLUMNS, little-endian
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from actions import ActionBuffer, ActionColumns, CHUNK_SIZE, COLUMNS, COLUMN_TYPES
+
+MAGIC = b'CLK2'
+VERSION = 2
+
+# magic, version, flags, count, max_timestamp,
+# names_offset, names_size, meta_offset, meta_size, data_offset
+HEADER = struct.Struct('<4sHHQdQQQQQ')
+HEADER_SIZE = 64
+
+FLAG_SORTED = 0x1
+
+# Размер элемента каждой колонки в байтах
+ITEM_SIZES = {name: array(typecode).itemsize for name, typecode in COLUMN_TYPES.items()}
+
+# Длина строки-маркера для None (например, key.char у мертвых клавиш)
+NONE_NAME = 0xFFFFFFFF
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+# Размер порции при чтении/записи с отчетом о прогрессе, байт
+IO_CHUNK = 1 << 20
+
+
+class FormatError(ValueError):
+    """Файл не является корректной записью .clk"""
+
+
+class Cancelled(Exception):
+    """Операция с файлом отменена (cancelled() вернул True)"""
+
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise Cancelled()
+
+
+def _read_chunked(f, size, progress=None, cancelled=None, done=0, total=None):
+    """
+    Читает size байт порциями IO_CHUNK, между порциями сообщает прогресс
+    progress(done + прочитано, total) и проверяет отмену.
+    """
+    total = size if total is None else total
+    data = bytearray()
+    while len(data) < size:
+        check_cancelled(cancelled)
+        chunk = f.read(min(IO_CHUNK, size - len(data)))
+        if not chunk:
+            break
+        data += chunk
+        if progress is not None:
+            progress(done + len(data), total)
+    return data
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _column_layout(data_offset, count):
+    """Возвращает смещения колонок в файле: {имя: (смещение, размер в байтах)}"""
+    layout = {}
+    offset = data_offset
+    for name in COLUMNS:
+        size = ITEM_SIZES[name] * count
+        layout[name] = (offset, size)
+        offset = _align(offset + size)
+    return layout
+
+
+def encode_names(names):
+    parts = [struct.pack('<I', len(names))]
+    for name in names:
+        if name is None:
+            parts.append(struct.pack('<I', NONE_NAME))
+        else:
+            data = name.encode('utf-8')
+            parts.append(struct.pack('<I', len(data)))
+            parts.append(data)
+    return b''.join(parts)
+
+
+def decode_names(data):
+    (count,) = struct.unpack_from('<I', data, 0)
+    offset = 4
+    names = []
+    for _ in range(count):
+        (length,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        if length == NONE_NAME:
+            names.append(None)
+            continue
+        names.append(bytes(data[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return names
+
+
+def column_bytes(column, typecode):
+    """Байты колонки в little-endian (на big-endian машинах через копию)"""
+    if _LITTLE_ENDIAN:
+        return memoryview(column).cast('B')
+    swapped = array(typecode, column)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def is_legacy_json(path):
+    """Проверяет, что файл - старая JSON запись (версия 1)"""
+    with open(path, 'rb') as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b'[') or (head.startswith(b'\xef\xbb\xbf') and head[3:].lstrip().startswith(b'['))
+
+
+def save(path, actions, meta=None, progress=None, cancelled=None):
+    """
+    Сохраняет действия в формате v2.
+
+    Запись идет во временный файл рядом с целевым и затем атомарно
+    переименовывается, поэтому недописанный файл никогда не заменит старый.
+    Колонки пишутся порциями: между ними вызывается progress(записано, всего)
+    в байтах и проверяется cancelled(); при отмене временный файл удаляется
+    и выбрасывается Cancelled.
+    """
+    actions = ActionBuffer.coerce(actions)
+    if not isinstance(actions, ActionColumns):
+        actions = ActionBuffer.from_source(actions)
+    count = len(actions)
+    columns = [memoryview(getattr(actions, name)) for name in COLUMNS]
+    # Порция - IO_CHUNK байт самой широкой (8-байтной) колонки
+    rows = IO_CHUNK // 8
+    chunks = ((start, [column[start:start + rows] for column in columns])
+              for start in range(0, count, rows))
+    save_chunks(path, count, actions.names, dict(actions.meta, **(meta or {})),
+                actions.max_timestamp, actions.is_sorted, chunks, progress, cancelled)
+
+
+def save_chunks(path, count, names, meta, max_timestamp, is_sorted, chunks, progress=None, cancelled=None):
+    """
+    Пишет файл v2 из последовательных порций строк, не собирая колонки в памяти.
+
+    chunks - итерируемый набор (номер первой строки, колонки в порядке COLUMNS);
+    каждая порция записывается на свое место в каждой колонке файла.
+    Так save() пишет буфер из памяти, а journal.finalize() - блоки журнала.
+    """
+    names_data = encode_names(names)
+    meta_data = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+
+    names_offset = HEADER_SIZE
+    meta_offset = names_offset + len(names_data)
+    data_offset = _align(meta_offset + len(meta_data))
+    flags = FLAG_SORTED if is_sorted else 0
+
+    header = HEADER.pack(MAGIC, VERSION, flags, count, float(max_timestamp),
+                         names_offset, len(names_data), meta_offset, len(meta_data), data_offset)
+    header += b'\0' * (HEADER_SIZE - len(header))
+
+    layout = _column_layout(data_offset, count)
+    total = max(offset + size for offset, size in layout.values()) if count else data_offset
+
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(names_data)
+            f.write(meta_data)
+            # Выравнивание между колонками - нули; колонки заполняются порциями ниже
+            f.truncate(total)
+            written = data_offset
+            for start, columns in chunks:
+                check_cancelled(cancelled)
+                for name, column in zip(COLUMNS, columns):
+                    typecode = COLUMN_TYPES[name]
+                    data = column_bytes(column, typecode)
+                    f.seek(layout[name][0] + start * ITEM_SIZES[name])
+                    f.write(data)
+                    written += len(data)
+                if progress is not None:
+                    progress(written, total)
+            check_cancelled(cancelled)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Отмена или ошибка записи: недописанный временный файл не оставляем
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if progress is not None:
+        progress(total, total)
+
+
+def _unpack_header(data):
+    if len(data) < HEADER_SIZE:
+        raise FormatError("Файл слишком короткий для заголовка .clk")
+    fields = HEADER.unpack_from(data, 0)
+    if fields[0] != MAGIC:
+        raise FormatError("Неизвестный формат файла (нет сигнатуры CLK2)")
+    if fields[1] != VERSION:
+        raise FormatError(f"Неподдерживаемая версия формата: {fields[1]}")
+    return fields
+
+
+def _read_header(data, file_size=None):
+    """
+    Разбирает заголовок, таблицу строк и метаданные.
+
+    data должен содержать как минимум все байты до начала колонок;
+    file_size - полный размер файла, если data содержит не весь файл.
+    """
+    (_magic, _version, flags, count, max_timestamp, names_offset, names_size,
+     meta_offset, meta_size, data_offset) = _unpack_header(data)
+    layout = _column_layout(data_offset, count)
+    offset, size = layout[COLUMNS[-1]]
+    if offset + size > (len(data) if file_size is None else file_size):
+        raise FormatError("Файл обрезан: колонки выходят за его границы")
+    names = decode_names(data[names_offset:names_offset + names_size])
+    meta = json.loads(bytes(data[meta_offset:meta_offset + meta_size]).decode('utf-8')) if meta_size else {}
+    return {
+        'flags': flags,
+        'count': count,
+        'max_timestamp': max_timestamp,
+        'names': names,
+        'meta': meta,
+        'layout': layout,
+    }
+
+
+class MappedActions(ActionColumns):
+    """
+    Запись v2, отображенная в память.
+
+    Колонки - это memoryview прямо поверх mmap, поэтому загрузка не зависит
+    от числа событий, а страницы подгружаются ОС по мере воспроизведения.
+    Файл остается открытым до вызова close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить
+            self._file.close()
+            raise FormatError("Файл пуст")
+        self._view = memoryview(self._mmap)
+        self._columns = []
+        try:
+            header = _read_header(self._view)
+            for name, (offset, size) in header['layout'].items():
+                column = self._view[offset:offset + size].cast(COLUMN_TYPES[name])
+                self._columns.append(column)
+                setattr(self, name, column)
+        except Exception:
+            self.close()
+            raise
+        self.names = header['names']
+        self.meta = header['meta']
+        self.max_timestamp = header['max_timestamp']
+        self.is_sorted = bool(header['flags'] & FLAG_SORTED)
+
+    def close(self):
+        """Отпускает отображение и файл"""
+        for column in self._columns:
+            column.release()
+        self._columns = []
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StreamedActions:
+    """
+    Запись v2, читаемая с диска порциями без mmap.
+
+    В памяти держится только заголовок и одна порция колонок, поэтому
+    потребление памяти не зависит от длины записи. Каждый вызов iter_rows()
+    заново проходит файл, так что объект можно воспроизводить многократно.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        with open(path, 'rb') as f:
+            data_offset = _unpack_header(f.read(HEADER_SIZE))[-1]
+            f.seek(0)
+            header = _read_header(f.read(data_offset), os.fstat(f.fileno()).st_size)
+        self._count = header['count']
+        self._layout = header['layout']
+        self.names = header['names']
+        self.meta = header['meta']
+        self.max_timestamp = header['max_timestamp']
+        self.is_sorted = bool(header['flags'] & FLAG_SORTED)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def iter_rows(self, chunk_size=None, start=0):
+        chunk_size = chunk_size or self.chunk_size
+        with open(self.path, 'rb') as f:
+            for start in range(start, self._count, chunk_size):
+                end = min(start + chunk_size, self._count)
+                columns = []
+                for name in COLUMNS:
+                    column = array(COLUMN_TYPES[name])
+                    offset = self._layout[name][0] + start * column.itemsize
+                    f.seek(offset)
+                    column.frombytes(f.read((end - start) * column.itemsize))
+                    if not _LITTLE_ENDIAN:
+                        column.byteswap()
+                    columns.append(column)
+                timestamps, xs, ys, dxs, dys, codes, kinds = columns
+                yield from zip(timestamps, kinds, xs, ys, dxs, dys, codes)
+
+    def index_at(self, timestamp):
+        """Индекс первой строки с меткой не меньше timestamp: двоичный поиск, метки читаются из файла по одной"""
+        offset = self._layout['timestamps'][0]
+        low, high = 0, self._count
+        with open(self.path, 'rb') as f:
+            while low < high:
+                middle = (low + high) // 2
+                f.seek(offset + middle * 8)
+                (value,) = struct.unpack('<d', f.read(8))
+                if value < timestamp:
+                    low = middle + 1
+                else:
+                    high = middle
+        return low
+
+    def to_buffer(self):
+        """Читает запись целиком в ActionBuffer (например, перед заменой её файла)"""
+        return ActionBuffer.from_source(self)
+
+    def close(self):
+        pass
+
+
+def read_buffer(path, progress=None, cancelled=None):
+    """Читает запись v2 целиком в ActionBuffer (без mmap, с учетом порядка байт)"""
+    with open(path, 'rb') as f:
+        data = _read_chunked(f, os.fstat(f.fileno()).st_size, progress, cancelled)
+    header = _read_header(data)
+    buffer = ActionBuffer()
+    for name, (offset, size) in header['layout'].items():
+        column = getattr(buffer, name)
+        column.frombytes(data[offset:offset + size])
+        if not _LITTLE_ENDIAN:
+            column.byteswap()
+    for name in header['names']:
+        buffer.intern(name)
+    buffer.meta = header['meta']
+    buffer.max_timestamp = header['max_timestamp']
+    buffer.is_sorted = bool(header['flags'] & FLAG_SORTED)
+    return buffer
+
+
+def load_legacy_json(path, progress=None, cancelled=None):
+    """
+    Загружает старую JSON запись в ActionBuffer.
+
+    Прогресс считается в байтах файла: первая половина - чтение,
+    вторая - перенос действий в буфер порциями по CHUNK_SIZE.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        data = _read_chunked(f, size, progress, cancelled, total=size * 2)
+    actions = json.loads(data.decode('utf-8-sig'))
+    if not isinstance(actions, list): # Простая проверка, что это похоже на список действий
+        raise FormatError("Файл не содержит корректный список действий")
+    buffer = ActionBuffer()
+    for start in range(0, len(actions), CHUNK_SIZE):
+        check_cancelled(cancelled)
+        buffer.extend(actions[start:start + CHUNK_SIZE])
+        if progress is not None:
+            progress(size + size * min(start + CHUNK_SIZE, len(actions)) // len(actions), size * 2)
+    buffer.sort() # Старые записи могли сохраняться неупорядоченными
+    return buffer
+
+
+def load(path, use_mmap=True, stream=False, progress=None, cancelled=None):
+    """
+    Открывает запись любой версии.
+
+    Для v2 по умолчанию возвращает MappedActions (нужно закрыть через close()),
+    со stream=True - StreamedActions (чтение с диска порциями),
+    для сжатого v3 - CompressedActions (clkblocks.py), для старого JSON - ActionBuffer.
+
+    progress(сделано, всего) и cancelled() нужны для фоновой загрузки
+    (см. fileio.py): файл читается порциями, между ними сообщается прогресс
+    и проверяется отмена. Отображение и потоковое чтение открываются
+    без чтения колонок, для них прогресс сразу 100%.
+    """
+    if is_legacy_json(path):
+        return load_legacy_json(path, progress, cancelled)
+    import clkblocks # clkblocks сам импортирует этот модуль
+    if clkblocks.is_compressed(path):
+        actions = clkblocks.CompressedActions(path)
+    elif stream:
+        actions = StreamedActions(path)
+    elif use_mmap and _LITTLE_ENDIAN:
+        actions = MappedActions(path)
+    else:
+        return read_buffer(path, progress, cancelled)
+    if progress is not None:
+        progress(1, 1)
+    return actions
+
+
+def convert_legacy(src_path, dst_path=None):
+    """Конвертирует JSON запись в v2 (по умолчанию на месте)"""
+    buffer = load_legacy_json(src_path)
+    save(dst_path or src_path, buffer)
+    return len(buffer)
+
+
+def main(argv=None):
+    import argparse
+    import clkblocks
+    parser = argparse.ArgumentParser(description="Утилиты для файлов записей .clk")
+    sub = parser.add_subparsers(dest='command', required=True)
+    convert_parser = sub.add_parser('convert', help="Конвертировать JSON запись в формат v2")
+    convert_parser.add_argument('src')
+    convert_parser.add_argument('dst', nargs='?')
+    compress_parser = sub.add_parser('compress', help="Сжать запись (формат v3, блоки с индексом)")
+    compress_parser.add_argument('src')
+    compress_parser.add_argument('dst', nargs='?')
+    compress_parser.add_argument('--codec', choices=('zstd', 'zlib', 'none'), help="По умолчанию zstd, если установлен, иначе zlib")
+    info_parser = sub.add_parser('info', help="Показать сведения о записи")
+    info_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        count = convert_legacy(args.src, args.dst)
+        print(f"Сконвертировано действий: {count} -> {args.dst or args.src}")
+    elif args.command == 'compress':
+        dst = args.dst or args.src
+        src_size = os.path.getsize(args.src)
+        actions = load(args.src)
+        try:
+            # dst может заменить исходный файл, поэтому сначала копируем запись в память
+            if isinstance(actions, ActionColumns):
+                buffer = actions.to_buffer()
+            else:
+                buffer = ActionBuffer.from_source(actions)
+        finally:
+            actions.close()
+        clkblocks.save(dst, buffer, codec=args.codec)
+        print(f"Сжато действий: {len(buffer)}, {src_size} -> {os.path.getsize(dst)} байт")
+    elif args.command == 'info':
+        actions = load(args.path)
+        try:
+            if is_legacy_json(args.path):
+                version = 1
+            elif isinstance(actions, clkblocks.CompressedActions):
+                version = clkblocks.VERSION
+            else:
+                version = VERSION
+            print(f"Версия: {version}")
+            if version == clkblocks.VERSION:
+                print(f"Блоков: {len(actions.index)}, сжатие: {actions.codec}")
+            print(f"Действий: {len(actions)}")
+            print(f"Длительность: {actions.max_timestamp:.3f} сек")
+            print(f"Упорядочено: {actions.is_sorted}")
+            print(f"Метаданные: {actions.meta}")
+        finally:
+            actions.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
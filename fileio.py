@@ -0,0 +1,180 @@
+"""
+Загрузка и сохранение записей в фоновом потоке.
+
+FileTask выполняет clkformat.load/save в рабочем потоке, чтобы интерфейс
+не замирал на больших файлах. Файл читается и пишется порциями: между ними
+прогресс публикуется в ProgressChannel (GUI читает его через snapshot()),
+а отмена через cancel() срабатывает на границе ближайшей порции.
+Результат передается функциям обратного вызова из рабочего потока;
+GUI превращает их в сигналы (см. FileTaskSignals в main.py).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import applog
+import clkblocks
+import clkformat
+import journal
+from progress import ProgressChannel
+
+log = applog.get_logger('FileIO')
+
+# Сколько сохранение файла, отображенного в память, ждет, пока владелец отпустит отображение, секунд
+COPY_RELEASE_TIMEOUT = 5.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Один рабочий поток на все операции: файлы читаются и пишутся по очереди"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='FileIO')
+        return _executor
+
+
+class FileTask:
+    """
+    Фоновая операция с файлом записи.
+
+    Функции обратного вызова первым аргументом получают саму задачу.
+
+    :param kind: 'load', 'save' или 'recover'
+    :param on_done: on_done(task, result) - загруженная запись или путь сохраненного файла
+    :param on_error: on_error(task, exception)
+    :param on_cancelled: on_cancelled(task) - операция отменена, результат отброшен
+    :param on_progress: on_progress(task) - прогресс изменился (прорежено ProgressChannel)
+    """
+
+    def __init__(self, kind, path, on_done=None, on_error=None, on_cancelled=None, on_progress=None):
+        self.kind = kind
+        self.path = path
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.on_progress = on_progress
+        self.progress = ProgressChannel(notify=self._notify_progress if on_progress else None)
+        self.future = None
+        self._cancel = threading.Event()
+        self._source_released = threading.Event()
+
+    def start(self, operation):
+        """Запускает operation(progress=..., cancelled=...) в рабочем потоке"""
+        self.future = _get_executor().submit(self._run, operation)
+        return self
+
+    def cancel(self):
+        """Просит остановить операцию; ответ придет через on_cancelled"""
+        self._cancel.set()
+        self._source_released.set() # Сохранению незачем дальше ждать владельца
+
+    def release_source(self):
+        """Владелец отпустил исходную запись (см. save с on_copied)"""
+        self._source_released.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def _run(self, operation):
+        if self.cancelled: # Отменили, пока задача ждала в очереди
+            self._call(self.on_cancelled)
+            return
+        try:
+            result = operation(progress=self.progress.publish, cancelled=self._cancel.is_set)
+        except clkformat.Cancelled:
+            self._call(self.on_cancelled)
+            return
+        except Exception as e:
+            self._call(self.on_error, e)
+            return
+        if self.cancelled and self.kind != 'save':
+            # Отмена пришла после последней порции - загруженное никому не нужно
+            result.close()
+            self._call(self.on_cancelled)
+            return
+        self._call(self.on_done, result)
+
+    def _notify_progress(self, current_ms, total_ms):
+        self._call(self.on_progress)
+
+    def _call(self, callback, *args):
+        """Вызывает функцию обратного вызова, не давая её ошибке уронить рабочий поток"""
+        if callback is None:
+            return
+        try:
+            callback(self, *args)
+        except Exception as callback_e:
+            log.error("Ошибка в функции обратного вызова {}: {}", callback, callback_e)
+
+
+def load(path, **callbacks):
+    """Открывает запись в фоне (см. clkformat.load); результат - в on_done"""
+    task = FileTask('load', path, **callbacks)
+    return task.start(lambda **kwargs: clkformat.load(path, **kwargs))
+
+
+def same_file(path, other):
+    """Указывают ли пути на один файл (False, если какого-то из них нет)"""
+    if not path or not other:
+        return False
+    try:
+        return os.path.samefile(path, other)
+    except OSError:
+        return False
+
+
+def save(path, actions, compress=False, on_copied=None, **callbacks):
+    """
+    Сохраняет запись в фоне (см. clkformat.save); on_done получает путь.
+
+    compress=True - сжатый формат v3 (clkblocks.save): файл в разы меньше,
+    но читается блоками с распаковкой, а не отображается в память.
+
+    actions не должен меняться до завершения задачи. Запись, которая читается
+    из того же файла (MappedActions, StreamedActions, CompressedActions),
+    после замены файла читала бы уже новое содержимое, а отображенный файл
+    Windows и вовсе не даст заменить. Поэтому рабочий поток сначала копирует
+    её в память и передает копию в on_copied(task, buffer) - владелец
+    подменяет ею запись, закрывает старую и вызывает task.release_source().
+    Сохранение ждет этого не дольше COPY_RELEASE_TIMEOUT.
+    """
+    task = FileTask('save', path, **callbacks)
+
+    def operation(progress, cancelled):
+        source = actions
+        if hasattr(actions, 'to_buffer') and same_file(path, getattr(actions, 'path', None)):
+            source = actions.to_buffer()
+            if on_copied is not None:
+                task._call(on_copied, source)
+                task._source_released.wait(COPY_RELEASE_TIMEOUT)
+            if cancelled():
+                raise clkformat.Cancelled()
+        if compress:
+            clkblocks.save(path, source, progress=progress, cancelled=cancelled)
+        else:
+            clkformat.save(path, source, progress=progress, cancelled=cancelled)
+        return path
+    return task.start(operation)
+
+
+def recover(journal_path, clk_path, **callbacks):
+    """
+    Собирает запись из журнала прерванной записи (journal.finalize) и открывает её.
+
+    Журнал удаляется только после успешной сборки; при ошибке или отмене
+    он остается, и восстановление можно повторить при следующем запуске.
+    """
+    task = FileTask('recover', clk_path, **callbacks)
+
+    def operation(**kwargs):
+        journal.finalize(journal_path, clk_path, **kwargs)
+        os.remove(journal_path)
+        return clkformat.load(clk_path)
+    return task.start(operation)
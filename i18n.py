@@ -0,0 +1,64 @@
+"""
+Каталоги переводов интерфейса.
+
+Каждый язык - отдельный файл locales/<код>.json, в котором хранятся только
+строки, отличающиеся от английских. Загружается только активный язык:
+цепочка запасных языков (язык -> английский) сливается в один словарь
+один раз при загрузке, поэтому в интерфейсе достаточно translations[key]
+без запасных значений на каждом вызове.
+"""
+import json
+import os
+import sys
+
+LANGUAGES = {
+    'en': 'English',
+    'ru': 'Русский',
+    'de': 'Deutsch',
+    'fr': 'Français',
+    'es': 'Español',
+    'it': 'Italiano',
+    'zh': '中文',
+    'ja': '日本語',
+    'tr': 'Türkçe',
+    'pl': 'Polski',
+    'he': 'עברית',
+}
+
+# Язык, в котором есть все ключи; им заканчивается любая цепочка
+FALLBACK_LANGUAGE = 'en'
+
+_cache = {}
+
+
+def locales_dir():
+    """Каталог с файлами переводов (в собранном PyInstaller .exe - во временной папке сборки)"""
+    base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, 'locales')
+
+
+def fallback_chain(lang_code):
+    """Языки, из которых берутся строки, от самого приоритетного"""
+    chain = [lang_code]
+    if lang_code != FALLBACK_LANGUAGE:
+        chain.append(FALLBACK_LANGUAGE)
+    return chain
+
+
+def load_catalog(lang_code):
+    """Читает один файл каталога без запасных языков"""
+    with open(os.path.join(locales_dir(), f'{lang_code}.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load(lang_code):
+    """Возвращает полный словарь переводов языка (с учетом запасных языков)"""
+    translations = _cache.get(lang_code)
+    if translations is None:
+        if lang_code not in LANGUAGES:
+            raise KeyError(f"Unknown language code: {lang_code}")
+        translations = {}
+        for code in reversed(fallback_chain(lang_code)):
+            translations.update(load_catalog(code))
+        _cache[lang_code] = translations
+    return translations
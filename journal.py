@@ -0,0 +1,252 @@
+"""
+Журнал записи: события попадают на диск во время записи, а не по кнопке Save.
+
+Recorder копит действия в блоке (ActionBuffer) и, когда блок заполнен или
+прошло flush_interval секунд, дописывает его в конец журнала и вызывает
+fsync. В памяти держится только текущий блок, а при падении программы
+теряется не больше одного блока. После остановки записи (или при следующем
+запуске, если программа упала) журнал переписывается в обычный файл .clk
+(finalize): недописанный последний блок отбрасывается по контрольной сумме.
+
+Формат журнала (little-endian):
+
+    FILE_HEADER: сигнатура CLKJ, версия
+    записи: RECORD (тип, размер данных, crc32 данных) и данные
+        RECORD_META  - JSON метаданных (следующие записи дополняют предыдущие)
+        RECORD_BLOCK - BLOCK_HEADER, таблица новых имен (как в .clk),
+                       колонки блока в порядке actions.COLUMNS
+"""
+import glob
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+import clkformat
+from actions import COLUMNS, COLUMN_TYPES
+
+JOURNAL_MAGIC = b'CLKJ'
+JOURNAL_VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHxx')
+# тип, размер данных, crc32 данных
+RECORD = struct.Struct('<BxxxII')
+# строк в блоке, флаги, размер таблицы новых имен,
+# первая и последняя метки времени, максимальная метка
+BLOCK_HEADER = struct.Struct('<IIIddd')
+
+RECORD_META = 1
+RECORD_BLOCK = 2
+
+BLOCK_SORTED = 0x1
+
+# Действий в блоке (около 150 КБ колонок) и период записи неполного блока, секунды
+DEFAULT_BLOCK_SIZE = 4096
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+JOURNAL_NAME = 'recording.journal'
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def journal_path(directory):
+    """Файл журнала текущей (или прерванной) записи"""
+    return os.path.join(directory, JOURNAL_NAME)
+
+
+def recording_path(directory):
+    """
+    Новое имя для собранной из журнала записи.
+
+    Имена не повторяются: предыдущая запись может быть еще отображена
+    в память (Windows не даст её перезаписать).
+    """
+    base = os.path.join(directory, time.strftime('recording-%Y%m%d-%H%M%S'))
+    path = base + '.clk'
+    suffix = 1
+    while os.path.exists(path):
+        path = f"{base}-{suffix}.clk"
+        suffix += 1
+    return path
+
+
+def remove_recordings(directory):
+    """Удаляет собранные ранее записи; занятые (отображенные) файлы остаются до следующего раза"""
+    for path in glob.glob(os.path.join(directory, 'recording-*.clk')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class JournalWriter:
+    """Дописывает блоки действий в журнал; каждая запись сразу сбрасывается на диск (fsync)"""
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.rows = 0
+        self.blocks = 0
+        self.fsyncs = 0
+        self._names_written = 0
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+        self.write_meta(meta or {})
+
+    def write_meta(self, meta):
+        self._write_record(RECORD_META, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def append_block(self, block):
+        """
+        Дописывает строки блока.
+
+        Таблица имен общая для всех блоков записи (коды в колонках сквозные),
+        поэтому в журнал попадают только имена, добавленные после прошлого блока.
+        """
+        count = len(block)
+        if not count:
+            return
+        timestamps = block.timestamps
+        flags = BLOCK_SORTED if block.is_sorted else 0
+        names_data = clkformat.encode_names(block.names[self._names_written:])
+        parts = [BLOCK_HEADER.pack(count, flags, len(names_data), timestamps[0], timestamps[-1],
+                                   block.max_timestamp),
+                 names_data]
+        for name in COLUMNS:
+            parts.append(clkformat.column_bytes(getattr(block, name), COLUMN_TYPES[name]))
+        self._write_record(RECORD_BLOCK, b''.join(parts))
+        self._names_written = len(block.names)
+        self.rows += count
+        self.blocks += 1
+
+    def _write_record(self, kind, payload):
+        self._file.write(RECORD.pack(kind, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_records(path):
+    """
+    Перебирает целые записи журнала: (тип, данные).
+
+    Чтение останавливается на первой обрезанной или поврежденной записи -
+    это хвост, который не успел дописаться до падения.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(FILE_HEADER.size)
+        if len(head) < FILE_HEADER.size:
+            return
+        magic, version = FILE_HEADER.unpack(head)
+        if magic != JOURNAL_MAGIC:
+            raise clkformat.FormatError("Неизвестный формат журнала (нет сигнатуры CLKJ)")
+        if version != JOURNAL_VERSION:
+            raise clkformat.FormatError(f"Неподдерживаемая версия журнала: {version}")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            kind, size, crc = RECORD.unpack(head)
+            payload = f.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return
+            yield kind, payload
+
+
+def _decode_block(payload):
+    """Возвращает (заголовок блока, новые имена, колонки в порядке COLUMNS)"""
+    header = BLOCK_HEADER.unpack_from(payload, 0)
+    count, _flags, names_size = header[:3]
+    offset = BLOCK_HEADER.size + names_size
+    names = clkformat.decode_names(payload[BLOCK_HEADER.size:offset])
+    columns = []
+    for name in COLUMNS:
+        column = array(COLUMN_TYPES[name])
+        size = clkformat.ITEM_SIZES[name] * count
+        column.frombytes(payload[offset:offset + size])
+        if not _LITTLE_ENDIAN:
+            column.byteswap()
+        columns.append(column)
+        offset += size
+    return header, names, columns
+
+
+def pending_count(path):
+    """
+    Число действий в журнале по заголовкам блоков.
+
+    Данные блоков пропускаются без проверки crc, поэтому это быстрая оценка
+    (для вопроса о восстановлении); точное число дает scan().
+    """
+    count = 0
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(FILE_HEADER.size)
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            kind, payload_size, _crc = RECORD.unpack(head)
+            payload_start = f.tell()
+            if payload_start + payload_size > size:
+                break
+            if kind == RECORD_BLOCK:
+                count += BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))[0]
+            f.seek(payload_start + payload_size)
+    return count
+
+
+def scan(path):
+    """
+    Сводка журнала: (число действий, имена, метаданные, max метка времени, упорядочен ли).
+
+    Для каждого блока читается весь блок (проверка crc), но в памяти
+    одновременно держится только один.
+    """
+    count = 0
+    names = []
+    meta = {}
+    max_timestamp = 0.0
+    is_sorted = True
+    last_timestamp = None
+    for kind, payload in read_records(path):
+        if kind == RECORD_META:
+            meta.update(json.loads(payload.decode('utf-8')))
+        elif kind == RECORD_BLOCK:
+            (rows, flags, _names_size, first, last, block_max), block_names, _columns = _decode_block(payload)
+            names.extend(block_names)
+            count += rows
+            max_timestamp = max(max_timestamp, block_max)
+            # Слушатели в разных потоках: соседние блоки могут чуть перекрываться по времени
+            if not flags & BLOCK_SORTED or (last_timestamp is not None and first < last_timestamp):
+                is_sorted = False
+            last_timestamp = last
+    return count, names, meta, max_timestamp, is_sorted
+
+
+def finalize(path, clk_path, progress=None, cancelled=None):
+    """
+    Переписывает журнал в файл .clk v2 и возвращает число действий.
+
+    Два прохода по журналу: сводка (число строк и имена нужны для заголовка),
+    затем колонки блоков по одному на свои места в файле (clkformat.save_chunks).
+    """
+    count, names, meta, max_timestamp, is_sorted = scan(path)
+
+    def chunks():
+        start = 0
+        for kind, payload in read_records(path):
+            if kind == RECORD_BLOCK:
+                header, _names, columns = _decode_block(payload)
+                yield start, columns
+                start += header[0]
+
+    clkformat.save_chunks(clk_path, count, names, meta, max_timestamp, is_sorted,
+                          chunks(), progress, cancelled)
+    return count
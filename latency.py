@@ -0,0 +1,183 @@
+"""
+Опоздание действий при воспроизведении и отчет о прогоне.
+
+Player сравнивает для каждого действия запланированный момент отправки
+(начало прогона + смещение из program.Program) с фактическим моментом
+вызова send_batch и кладет разницу в гистограмму своего типа действия.
+
+LatencyHistogram устроена как HDR Histogram: значения в микросекундах,
+до 2 * 2**SUB_BITS - точно, дальше каждая степень двойки делится на
+2**SUB_BITS корзин, то есть относительная погрешность не больше
+1 / 2**SUB_BITS (около 3%) во всем диапазоне до HIGHEST. Память
+фиксированная (несколько килобайт на гистограмму) и не растет с длиной
+записи; запись значения - несколько целочисленных операций.
+
+Отправленные раньше срока действия (пачка собирается в окне batch_window)
+попадают в нулевую корзину, а самое раннее отдельно хранится в min.
+
+В конце прогона run_report собирает отчет: события, длительность,
+p50/p90/p99/max опоздания по типам и в целом, число перегрузок (пачек,
+срок которых прошел раньше, чем цикл до них дошел). write_report пишет
+его в JSON атомарно (временный файл и переименование).
+"""
+import json
+import os
+from array import array
+from datetime import datetime
+
+from actions import (KIND_MOUSE_MOVE, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE, KIND_MOUSE_SCROLL,
+                     KIND_KEY_PRESS, KIND_KEY_RELEASE)
+
+# Точность: 2**SUB_BITS корзин на каждую степень двойки
+SUB_BITS = 5
+
+# Самое большое различимое значение, секунд (больше - в последнюю корзину, max точный)
+HIGHEST = 3600.0
+
+# Единица хранения - микросекунда
+SCALE = 1000000
+
+PERCENTILES = (50, 90, 99)
+
+# Имена типов действий в отчете (KIND_NAMES склеивает нажатие и отпускание кнопки)
+KIND_LABELS = {
+    KIND_MOUSE_MOVE: 'mouse_move',
+    KIND_MOUSE_PRESS: 'mouse_press',
+    KIND_MOUSE_RELEASE: 'mouse_release',
+    KIND_MOUSE_SCROLL: 'mouse_scroll',
+    KIND_KEY_PRESS: 'key_press',
+    KIND_KEY_RELEASE: 'key_release',
+}
+
+# Насколько (секунд) цикл может опоздать к пачке, чтобы это еще не считалось перегрузкой
+OVERRUN_MARGIN = 0.001
+
+# Сколько последних отчетов хранится в каталоге отчетов
+REPORT_KEEP = 100
+
+
+class LatencyHistogram:
+    """Гистограмма опозданий с фиксированной памятью и относительной точностью 1 / 2**SUB_BITS"""
+
+    def __init__(self, highest=HIGHEST):
+        self._linear = 2 << SUB_BITS # Значения меньше хранятся точно
+        self._size = self._index(int(highest * SCALE)) + 1
+        self.counts = array('Q', bytes(8 * self._size))
+        self.total = 0
+        self.max = 0
+        self.min = 0 # Самое раннее (отрицательное) значение, микросекунд
+
+    def _index(self, value):
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - SUB_BITS - 1
+        return (shift << SUB_BITS) + (value >> shift)
+
+    def _bucket_top(self, index):
+        """Наибольшее значение, попадающее в корзину"""
+        if index < self._linear:
+            return index
+        shift = (index >> SUB_BITS) - 1
+        mantissa = index - (shift << SUB_BITS)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = int(seconds * SCALE)
+        if value <= 0:
+            if value < self.min:
+                self.min = value
+            index = 0
+        elif value < self._linear:
+            index = value
+        else:
+            shift = value.bit_length() - SUB_BITS - 1
+            index = (shift << SUB_BITS) + (value >> shift)
+            if index >= self._size:
+                index = self._size - 1
+        self.counts[index] += 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.min = min(self.min, other.min)
+
+    def value_at(self, percentile):
+        """Опоздание (секунд), не больше которого у percentile процентов действий"""
+        if not self.total:
+            return 0.0
+        rank = max(1, -(-self.total * percentile // 100)) # Округление вверх
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._bucket_top(index), self.max) / SCALE
+        return self.max / SCALE
+
+    def summary(self):
+        """Сводка для отчета: число действий и опоздания в миллисекундах"""
+        result = {'count': self.total}
+        for percentile in PERCENTILES:
+            result[f'p{percentile}_ms'] = round(self.value_at(percentile) * 1000, 3)
+        result['max_ms'] = round(self.max / SCALE * 1000, 3)
+        result['earliest_ms'] = round(self.min / SCALE * 1000, 3)
+        return result
+
+
+def kind_histograms():
+    """Гистограммы по типам действий: список, индекс - код типа (actions.KIND_*)"""
+    return [LatencyHistogram() for _kind in range(max(KIND_LABELS) + 1)]
+
+
+def run_report(histograms, events, duration, overruns, **details):
+    """
+    Отчет о прогоне.
+
+    :param histograms: kind_histograms() после прогона
+    :param events: Отправлено действий
+    :param duration: Длительность прогона, секунд
+    :param overruns: Пачек, срок которых прошел до того, как цикл до них дошел
+    :param details: Параметры прогона (запись, повторы, скорость, ...)
+    """
+    overall = LatencyHistogram()
+    kinds = {}
+    for kind, histogram in enumerate(histograms):
+        if histogram.total:
+            overall.merge(histogram)
+            kinds[KIND_LABELS[kind]] = histogram.summary()
+    report = {
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'events': events,
+        'duration_s': round(duration, 3),
+        'overruns': overruns,
+        'lateness': overall.summary(),
+        'lateness_by_kind': kinds,
+    }
+    report.update(details)
+    return report
+
+
+def write_report(path, report):
+    """Пишет отчет в JSON атомарно (временный файл и переименование)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def report_path(report_dir):
+    """Имя нового отчета в каталоге отчетов; самые старые сверх REPORT_KEEP удаляются"""
+    os.makedirs(report_dir, exist_ok=True)
+    reports = sorted(name for name in os.listdir(report_dir)
+                     if name.startswith('run-') and name.endswith('.json'))
+    for name in reports[:max(0, len(reports) - REPORT_KEEP + 1)]:
+        try:
+            os.remove(os.path.join(report_dir, name))
+        except OSError:
+            pass # Отчет могли удалить или открыть в другой программе
+    return os.path.join(report_dir, f"run-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.json")
@@ -1,19 +1,38 @@
+from startup import PROFILE as STARTUP # Первым: замер времени запуска (--profile-startup)
 import sys
 import json
 import time
 import os
+from collections import Counter
 from datetime import datetime, timedelta
+STARTUP.mark("import stdlib")
 from PyQt5.QtCore import Qt, QTimer, QTime, QObject, pyqtSignal, QSettings
 from PyQt5.QtGui import QIcon, QFont, QKeySequence
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QSpinBox, 
                             QRadioButton, QSlider, QFileDialog, QStatusBar, QWidget, 
                             QVBoxLayout, QHBoxLayout, QTimeEdit, QButtonGroup, QLineEdit,
                             QShortcut, QMessageBox, QGridLayout, QFrame, QDialog, QListWidget, 
-                            QListWidgetItem, QCheckBox)
+                            QListWidgetItem, QCheckBox, QComboBox, QDoubleSpinBox)
+STARTUP.mark("import PyQt5")
+# pynput и бэкенды ввода загружаются при первой записи/воспроизведении, а не здесь
 from recorder import Recorder
-from player import Player
+from qtplayer import QtPlayer
+from player import Player, TURBO_DRAIN, TURBO_GAP
+from actions import ActionBuffer
+import clkformat
+import fileio
+import journal
+import timeline
+from scheduler import (Scheduler, ScheduledJob, KIND_CRON, KIND_INTERVAL, DEFAULT_QUEUE_DEPTH,
+                       OVERLAP_COALESCE, OVERLAP_QUEUE, OVERLAP_SKIP)
+import applog
+import i18n
+from i18n import LANGUAGES
 import locale
 import threading # <-- Добавлено
+STARTUP.mark("import app modules")
+
+log = applog.get_logger('MainWindow')
 
 # All comments below this line are in English
 # Button styles for different states
@@ -29,541 +48,19 @@ STYLE_SAVE_LOAD_DISABLED = "background-color: #F5F5F5; color: #BDBDBD; border: 1
 STYLE_HELP_NORMAL = "background-color: #F0F0F0; border: 1px solid #CCCCCC; border-radius: 5px; padding: 3px;"
 STYLE_HELP_PRESSED = "background-color: #D0D0D0; border: 1px solid #BDBDBD; border-radius: 5px; padding: 3px;"
 
-# --- Мультиязычность ---
-LANGUAGES = {
-    'en': 'English',
-    'ru': 'Русский',
-    'de': 'Deutsch',
-    'fr': 'Français',
-    'es': 'Español',
-    'it': 'Italiano',
-    'zh': '中文',
-    'ja': '日本語',
-    'tr': 'Türkçe',
-    'pl': 'Polski',
-    'he': 'עברית',
-}
+# Режимы пауз в списке настроек и ключи их названий в переводах
+GAP_KEEP = 'keep'
+GAP_MODE_KEYS = {GAP_KEEP: 'pauses_keep', timeline.GAP_CAP: 'pauses_cap', timeline.GAP_REMOVE: 'pauses_remove'}
 
-# Базовый английский словарь с полным набором ключей
-BASE_TRANSLATIONS = {
-    'app_title': 'ClickerRecord',
-        'start_record': 'Start Recording',
-        'stop_record': 'Stop Recording',
-        'play': 'Play',
-        'stop_play': 'Stop Playback',
-        'repeat': 'Repeat Last',
-        'save': 'Save Recording',
-        'load': 'Load Recording',
-        'help': 'Help',
-        'settings': 'Settings',
-        'language': 'Language',
-        'actions_recorded': 'Actions recorded:',
-        'file': 'File:',
-        'ready': 'Ready',
-        'recording': 'Recording...',
-        'infinite_repeats': 'Infinite Repeats', # 
-        'playing': 'Playing...',
-        'no_actions': 'No actions recorded to play.',
-        'error': 'Error',
-        'repeat_count': 'Repeat count:',
-        'schedule': 'Schedule:',
-        'once': 'Run once',
-        'interval': 'Run every',
-        'minutes': 'minutes',
-        'seconds': 'seconds', # 
-        'at_time': 'Run at',
-        'speed': 'Playback speed:',
-    'help_title': 'Help - ClickerRecord',
-    'help_text': 'ClickerRecord - Help\n\nMain features:\n- Record mouse and keyboard actions.\n- Playback recorded actions.\n- Set repeat count, speed, and schedule.\n- Save and load recordings.\n\nHotkeys:\nF6: Start/Stop recording\nF7: Play\nF8: Repeat last\nEsc: Stop playback\nCtrl+S: Save\nCtrl+O: Load',
-        'no_actions_warning': 'No recorded actions to play.',
-        'no_actions_to_repeat': 'No recorded actions to repeat.',
-        'recording_error_title': 'Recording Error',
-        'recording_error_text': 'Failed to start recording: {error}',
-        'playback_error_title': 'Playback Error',
-        'playback_error_text': 'Failed to start playback: {error}',
-        'playback_type_error': 'Argument mismatch when calling Player.play:\n{error}\n\nInterface and player may be out of sync.',
-        'playback_stop_error': 'Error while stopping playback.',
-        'playback_stopped': 'Playback stopped...',
-        'save_error': 'Error saving:',
-        'load_error': 'Error loading:',
-        'load_file_error': 'Failed to load file:\n{error}',
-        'file_not_valid': 'File does not contain a valid list of actions.',
-    'help_dialog_title': 'Help - ClickerRecord',
-        'close_confirm': 'Are you sure you want to exit?',
-        'status_ready': 'Ready',
-        'status_recording': 'Recording... ({count})',
-        'status_playing': 'Playing... ({progress}%)',
-        'status_playing_simple': 'Playing...',
-        'status_no_actions': 'No actions recorded',
-        'status_saved': 'Recording saved:',
-        'status_loaded': 'Recording loaded:',
-        'status_error': 'Error:',
-        'status_stopped': 'Stopped',
-        'status_file': 'File:',
-        'status_actions': 'Actions:',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'Cancel',
-        'dialog_yes': 'Yes',
-        'dialog_no': 'No',
-        'repeat_last': 'Repeat last',
-        'repeat_last_warning': 'Cannot repeat: no actions.',
-        'repeat_last_busy': 'Cannot repeat: recording or playback in progress.',
-        'save_success': 'Recording saved successfully.',
-        'load_success': 'Recording loaded successfully.',
-        'file_dialog_save': 'Save recording',
-        'file_dialog_load': 'Load recording',
-        'file_dialog_filter': 'Clicker files (*.clk);;All files (*)',
-        'exit': 'Exit',
-        'settings_title': 'Settings',
-        'about': 'About',
-    'about_text': 'ClickerRecord\nMulti-language mouse and keyboard recorder.\n© 2025',
-}
+# Задание планировщика для режимов окна "Run every" и "Run at" (не сохраняется в schedule.json)
+UI_JOB = 'ui'
+# Политики перекрытия "Run every" (scheduler.py) и их подписи
+OVERLAP_KEYS = {OVERLAP_SKIP: 'overlap_skip', OVERLAP_QUEUE: 'overlap_queue', OVERLAP_COALESCE: 'overlap_coalesce'}
+# Самое долгое ожидание таймера расписания, мс
+SCHEDULER_MAX_SLEEP_MS = 60 * 1000
 
-TRANSLATIONS = {
-    'en': BASE_TRANSLATIONS,
-    'ru': {
-        'app_title': 'ClickerRecord',
-        'start_record': 'Начать запись',
-        'stop_record': 'Остановить запись',
-        'play': 'Воспроизвести',
-        'stop_play': 'Остановить воспроизведение',
-        'repeat': 'Повторить последнее',
-        'save': 'Сохранить запись',
-        'load': 'Загрузить запись',
-        'help': 'Справка',
-        'settings': 'Настройки',
-        'language': 'Язык',
-        'actions_recorded': 'Записано действий:',
-        'file': 'Файл:',
-        'ready': 'Готово',
-        'recording': 'Запись...',
-        'infinite_repeats': 'Бесконечные повторы', # <-- Добавлен перевод
-        'playing': 'Воспроизведение...',
-        'no_actions': 'Нет записанных действий для воспроизведения.',
-        'error': 'Ошибка',
-        'repeat_count': 'Количество повторений:',
-        'schedule': 'Расписание:',
-        'once': 'Запустить один раз',
-        'interval': 'Запускать каждые',
-        'minutes': 'минут',
-        'seconds': 'секунд', # <-- Добавлен перевод
-        'at_time': 'Запускать в',
-        'speed': 'Скорость воспроизведения:',
-        'help_title': 'Справка - ClickerRecord',
-        'help_text': 'ClickerRecord - Справка\n\nОсновные функции:\n- Запись действий мыши и клавиатуры.\n- Воспроизведение записанных действий.\n- Настройка количества повторений, скорости и расписания.\n- Сохранение и загрузка записей.\n\nГорячие клавиши:\nF6: Начать/Остановить запись\nF7: Воспроизвести\nF8: Повторить последнее\nEsc: Остановить воспроизведение\nCtrl+S: Сохранить\nCtrl+O: Загрузить',
-        'no_actions_warning': 'Нет записанных действий для воспроизведения.',
-        'no_actions_to_repeat': 'Нет записанных действий для повтора.',
-        'recording_error_title': 'Ошибка записи',
-        'recording_error_text': 'Не удалось начать запись: {error}',
-        'playback_error_title': 'Ошибка воспроизведения',
-        'playback_error_text': 'Не удалось начать воспроизведение: {error}',
-        'playback_type_error': 'Несоответствие аргументов при вызове Player.play:\n{error}\n\nИнтерфейс и плеер могут быть рассинхронизированы.',
-        'playback_stop_error': 'Ошибка при остановке воспроизведения.',
-        'playback_stopped': 'Воспроизведение остановлено...',
-        'save_error': 'Ошибка сохранения:',
-        'load_error': 'Ошибка загрузки:',
-        'load_file_error': 'Не удалось загрузить файл:\n{error}',
-        'file_not_valid': 'Файл не содержит корректный список действий.',
-        'help_dialog_title': 'Справка - ClickerRecord',
-        'close_confirm': 'Вы уверены, что хотите выйти?',
-        'status_ready': 'Готово',
-        'status_recording': 'Запись... ({count})',
-        'status_playing': 'Воспроизведение... ({progress}%)',
-        'status_playing_simple': 'Воспроизведение...',
-        'status_no_actions': 'Нет записанных действий',
-        'status_saved': 'Запись сохранена:',
-        'status_loaded': 'Запись загружена:',
-        'status_error': 'Ошибка:',
-        'status_stopped': 'Остановлено',
-        'status_file': 'Файл:',
-        'status_actions': 'Действия:',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'Отмена',
-        'dialog_yes': 'Да',
-        'dialog_no': 'Нет',
-        'repeat_last': 'Повторить последнее',
-        'repeat_last_warning': 'Невозможно повторить: нет действий.',
-        'repeat_last_busy': 'Невозможно повторить: идет запись или воспроизведение.',
-        'save_success': 'Запись успешно сохранена.',
-        'load_success': 'Запись успешно загружена.',
-        'file_dialog_save': 'Сохранить запись',
-        'file_dialog_load': 'Загрузить запись',
-        'file_dialog_filter': 'Файлы кликера (*.clk);;Все файлы (*)',
-        'exit': 'Выход',
-        'settings_title': 'Настройки',
-        'about': 'О программе',
-        'about_text': 'ClickerRecord\\nМногоязычный регистратор действий мыши и клавиатуры.\\n© 2025',
-    },
-    'zh': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': '开始录制',
-        'stop_record': '停止录制',
-        'play': '播放',
-        'stop_play': '停止播放',
-        'repeat': '重复上一次',
-        'save': '保存录制',
-        'load': '加载录制',
-        'help': '帮助',
-        'language': '语言',
-    }),
-    'es': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Iniciar grabación',
-        'stop_record': 'Detener grabación',
-        'play': 'Reproducir',
-        'stop_play': 'Detener reproducción',
-        'repeat': 'Repetir último',
-        'save': 'Guardar grabación',
-        'load': 'Cargar grabación',
-        'help': 'Ayuda',
-        'language': 'Idioma',
-    }),
-    'fr': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Démarrer l\'enregistrement',
-        'stop_record': 'Arrêter l\'enregistrement',
-        'play': 'Lire',
-        'stop_play': 'Arrêter la lecture',
-        'repeat': 'Répéter le dernier',
-        'save': 'Enregistrer',
-        'load': 'Charger',
-        'help': 'Aide',
-        'language': 'Langue',
-    }),
-    'de': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Aufnahme starten',
-        'stop_record': 'Aufnahme stoppen',
-        'play': 'Abspielen',
-        'stop_play': 'Wiedergabe stoppen',
-        'repeat': 'Letztes wiederholen',
-        'save': 'Aufnahme speichern',
-        'load': 'Aufnahme laden',
-        'help': 'Hilfe',
-        'settings': 'Einstellungen',
-        'language': 'Sprache',
-        'actions_recorded': 'Aktionen aufgezeichnet:',
-        'file': 'Datei:',
-        'ready': 'Bereit',
-        'recording': 'Aufnahme...',
-        'infinite_repeats': 'Unendliche Wiederholungen', # <-- Добавлен перевод
-        'playing': 'Wiedergabe...',
-        'no_actions': 'Keine Aktionen zum Abspielen aufgezeichnet.',
-        'error': 'Fehler',
-        'repeat_count': 'Wiederholungen:',
-        'schedule': 'Zeitplan:',
-        'once': 'Einmal ausführen',
-        'interval': 'Alle',
-        'minutes': 'Minuten ausführen',
-        'seconds': 'Sekunden ausführen', # <-- Добавлен перевод
-        'at_time': 'Ausführen um',
-        'speed': 'Wiedergabegeschwindigkeit:',
-        'help_title': 'Hilfe - ClickerRecord',
-        'help_text': 'ClickerRecord - Hilfe\n\nHauptfunktionen:\n- Maus- und Tastaturaktionen aufzeichnen.\n- Aufgezeichnete Aktionen abspielen.\n- Wiederholungen, Geschwindigkeit und Zeitplan einstellen.\n- Aufnahmen speichern und laden.\n\nTastenkombinationen:\nF6: Aufnahme starten/stoppen\nF7: Abspielen\nF8: Letztes wiederholen\nEsc: Wiedergabe stoppen\nStrg+S: Speichern\nStrg+O: Laden',
-        'no_actions_warning': 'Keine Aktionen zum Abspielen.',
-        'no_actions_to_repeat': 'Keine Aktionen zum Wiederholen.',
-        'recording_error_title': 'Aufnahmefehler',
-        'recording_error_text': 'Aufnahme konnte nicht gestartet werden: {error}',
-        'playback_error_title': 'Wiedergabefehler',
-        'playback_error_text': 'Wiedergabe konnte nicht gestartet werden: {error}',
-        'save_error': 'Fehler beim Speichern:',
-        'load_error': 'Fehler beim Laden:',
-        'close_confirm': 'Möchten Sie wirklich beenden?',
-        'status_ready': 'Bereit',
-        'status_recording': 'Aufnahme... ({count})',
-        'status_playing': 'Wiedergabe... ({progress}%)',
-        'status_playing_simple': 'Wiedergabe...',
-        'status_no_actions': 'Keine Aktionen aufgezeichnet',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'Abbrechen',
-        'dialog_yes': 'Ja',
-        'dialog_no': 'Nein',
-        'exit': 'Beenden',
-        'about': 'Über',
-        'about_text': 'ClickerRecord\\nMehrsprachiger Maus- und Tastaturrekorder.\\n© 2025'
-    }),
-    'it': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Avvia registrazione',
-        'stop_record': 'Ferma registrazione',
-        'play': 'Riproduci',
-        'stop_play': 'Ferma riproduzione',
-        'repeat': 'Ripeti ultimo',
-        'save': 'Salva registrazione',
-        'load': 'Carica registrazione',
-        'help': 'Aiuto',
-        'settings': 'Impostazioni',
-        'language': 'Lingua',
-        'actions_recorded': 'Azioni registrate:',
-        'file': 'File:',
-        'ready': 'Pronto',
-        'recording': 'Registrazione...',
-        'infinite_repeats': 'Ripetizioni infinite', # <-- Добавлен перевод
-        'playing': 'Riproduzione...',
-        'no_actions': 'Nessuna azione registrata da riprodurre.',
-        'error': 'Errore',
-        'repeat_count': 'Numero di ripetizioni:',
-        'schedule': 'Programmazione:',
-        'once': 'Esegui una volta',
-        'interval': 'Esegui ogni',
-        'minutes': 'minuti',
-        'seconds': 'secondi', # <-- Добавлен перевод
-        'at_time': 'Esegui alle',
-        'speed': 'Velocità di riproduzione:',
-        'help_title': 'Aiuto - ClickerRecord',
-        'help_text': 'ClickerRecord - Aiuto\n\nFunzionalità principali:\n- Registra azioni del mouse e della tastiera.\n- Riproduci azioni registrate.\n- Imposta ripetizioni, velocità e programmazione.\n- Salva e carica registrazioni.\n\nScorciatoie:\nF6: Avvia/Ferma registrazione\nF7: Riproduci\nF8: Ripeti ultimo\nEsc: Ferma riproduzione\nCtrl+S: Salva\nCtrl+O: Carica',
-        'no_actions_warning': 'Nessuna azione da riprodurre.',
-        'no_actions_to_repeat': 'Nessuna azione da ripetere.',
-        'recording_error_title': 'Errore di registrazione',
-        'recording_error_text': 'Impossibile avviare la registrazione: {error}',
-        'playback_error_title': 'Errore di riproduzione',
-        'playback_error_text': 'Impossibile avviare la riproduzione: {error}',
-        'save_error': 'Errore di salvataggio:',
-        'load_error': 'Errore di caricamento:',
-        'close_confirm': 'Sei sicuro di voler uscire?',
-        'status_ready': 'Pronto',
-        'status_recording': 'Registrazione... ({count})',
-        'status_playing': 'Riproduzione... ({progress}%)',
-        'status_playing_simple': 'Riproduzione...',
-        'status_no_actions': 'Nessuna azione registrata',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'Annulla',
-        'dialog_yes': 'Sì',
-        'dialog_no': 'No',
-        'exit': 'Esci',
-        'about': 'Informazioni',
-        'about_text': 'ClickerRecord\\nRegistratore mouse e tastiera multilingua.\\n© 2025'
-    }),
-    'ja': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': '記録開始',
-        'stop_record': '記録停止',
-        'play': '再生',
-        'stop_play': '再生停止',
-        'repeat': '最後を繰り返す',
-        'save': '記録を保存',
-        'load': '記録を読込',
-        'help': 'ヘルプ',
-        'settings': '設定',
-        'language': '言語',
-        'actions_recorded': '記録されたアクション：',
-        'file': 'ファイル：',
-        'ready': '準備完了',
-        'recording': '記録中...',
-        'infinite_repeats': '無限繰り返し', # <-- Добавлен перевод
-        'playing': '再生中...',
-        'no_actions': '再生する記録がありません。',
-        'error': 'エラー',
-        'repeat_count': '繰り返し回数：',
-        'schedule': 'スケジュール：',
-        'once': '1回実行',
-        'interval': '毎',
-        'minutes': '分実行',
-        'seconds': '秒実行', # <-- Добавлен перевод
-        'at_time': '指定時刻に実行',
-        'speed': '再生速度：',
-        'help_title': 'ヘルプ - ClickerRecord',
-        'help_text': 'ClickerRecord - ヘルプ\n\n主な機能：\n- マウスとキーボードの操作を記録。\n- 記録した操作を再生。\n- 繰り返し回数、速度、スケジュールを設定。\n- 記録の保存と読込。\n\nホットキー：\nF6：記録開始/停止\nF7：再生\nF8：最後を繰り返す\nEsc：再生停止\nCtrl+S：保存\nCtrl+O：読込',
-        'no_actions_warning': '再生する操作がありません。',
-        'no_actions_to_repeat': '繰り返す操作がありません。',
-        'recording_error_title': '記録エラー',
-        'recording_error_text': '記録を開始できません：{error}',
-        'playback_error_title': '再生エラー',
-        'playback_error_text': '再生を開始できません：{error}',
-        'save_error': '保存エラー：',
-        'load_error': '読込エラー：',
-        'close_confirm': '終了してもよろしいですか？',
-        'status_ready': '準備完了',
-        'status_recording': '記録中... ({count})',
-        'status_playing': '再生中... ({progress}%)',
-        'status_playing_simple': '再生中...',
-        'status_no_actions': '記録された操作はありません',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'キャンセル',
-        'dialog_yes': 'はい',
-        'dialog_no': 'いいえ',
-        'exit': '終了',
-        'about': 'バージョン情報',
-        'about_text': 'ClickerRecord\\n多言語対応マウス・キーボード記録ツール。\n© 2025'
-    }),
-    'tr': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Kayıt Başlat',
-        'stop_record': 'Kaydı Durdur',
-        'play': 'Oynat',
-        'stop_play': 'Oynatmayı Durdur',
-        'repeat': 'Son İşlemi Tekrarla',
-        'save': 'Kaydı Kaydet',
-        'load': 'Kayıt Yükle',
-        'help': 'Yardım',
-        'settings': 'Ayarlar',
-        'language': 'Dil',
-        'actions_recorded': 'Kaydedilen işlemler:',
-        'file': 'Dosya:',
-        'ready': 'Hazır',
-        'recording': 'Kaydediyor...',
-        'infinite_repeats': 'Sonsuz Tekrar', # <-- Добавлен перевод
-        'playing': 'Oynatılıyor...',
-        'no_actions': 'Oynatılacak kayıtlı işlem yok.',
-        'error': 'Hata',
-        'repeat_count': 'Tekrar sayısı:',
-        'schedule': 'Zamanlama:',
-        'once': 'Bir kez çalıştır',
-        'interval': 'Her',
-        'minutes': 'dakikada bir çalıştır',
-        'seconds': 'sekund', # <-- Добавлен перевод
-        'at_time': 'Uruchom o',
-        'speed': 'Prędkość odtwarzania:',
-        'help_title': 'Yardım - ClickerRecord',
-        'help_text': 'ClickerRecord - Yardım\n\nTemel özellikler:\n- Fare ve klavye işlemlerini kaydet.\n- Kaydedilen işlemleri oynat.\n- Tekrar sayısı, hız ve zamanlama ayarla.\n- Kayıtları kaydet ve yükle.\n\nKısayollar:\nF6: Kaydı başlat/durdur\nF7: Oynat\nF8: Son işlemi tekrarla\nEsc: Oynatmayı durdur\nCtrl+S: Kaydet\nCtrl+O: Yükle',
-        'no_actions_warning': 'Oynatılacak işlem yok.',
-        'no_actions_to_repeat': 'Tekrarlanacak işlem yok.',
-        'recording_error_title': 'Kayıt Hatası',
-        'recording_error_text': 'Kayıt başlatılamadı: {error}',
-        'playback_error_title': 'Oynatma Hatası',
-        'playback_error_text': 'Oynatma başlatılamadı: {error}',
-        'save_error': 'Kaydetme hatası:',
-        'load_error': 'Yükleme hatası:',
-        'close_confirm': 'Çıkmak istediğinizden emin misiniz?',
-        'status_ready': 'Hazır',
-        'status_recording': 'Kaydediyor... ({count})',
-        'status_playing': 'Oynatılıyor... ({progress}%)',
-        'status_playing_simple': 'Oynatılıyor...',
-        'status_no_actions': 'Kayıtlı işlem yok',
-        'dialog_ok': 'Tamam',
-        'dialog_cancel': 'İptal',
-        'dialog_yes': 'Evet',
-        'dialog_no': 'Hayır',
-        'exit': 'Çıkış',
-        'about': 'Hakkında',
-        'about_text': 'ClickerRecord\\nÇok dilli fare ve klavye kaydedici.\\n© 2025'
-    }),
-    'pl': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'Rozpocznij nagrywanie',
-        'stop_record': 'Zatrzymaj nagrywanie',
-        'play': 'Odtwórz',
-        'stop_play': 'Zatrzymaj odtwarzanie',
-        'repeat': 'Powtórz ostatnie',
-        'save': 'Zapisz nagranie',
-        'load': 'Wczytaj nagranie',
-        'help': 'Pomoc',
-        'settings': 'Ustawienia',
-        'language': 'Język',
-        'actions_recorded': 'Zarejestrowane akcje:',
-        'file': 'Plik:',
-        'ready': 'Gotowy',
-        'recording': 'Nagrywanie...',
-        'infinite_repeats': 'Nieskończone powtórzenia', # <-- Добавлен перевод
-        'playing': 'Odtwarzanie...',
-        'no_actions': 'Brak nagranych akcji do odtworzenia.',
-        'error': 'Błąd',
-        'repeat_count': 'Liczba powtórzeń:',
-        'schedule': 'Harmonogram:',
-        'once': 'Uruchom raz',
-        'interval': 'Uruchamiaj co',
-        'minutes': 'minut',
-        'seconds': 'sekund', # <-- Добавлен перевод
-        'at_time': 'Uruchom o',
-        'speed': 'Prędkość odtwarzania:',
-        'help_title': 'Pomoc - ClickerRecord',
-        'help_text': 'ClickerRecord - Pomoc\n\nGłówne funkcje:\n- Nagrywanie akcji myszy i klawiatury.\n- Odtwarzanie nagranych akcji.\n- Ustawianie powtórzeń, prędkości i harmonogramu.\n- Zapisywanie i wczytywanie nagrań.\n\nSkróty klawiszowe:\nF6: Rozpocznij/Zatrzymaj nagrywanie\nF7: Odtwórz\nF8: Powtórz ostatnie\nEsc: Zatrzymaj odtwarzanie\nCtrl+S: Zapisz\nCtrl+O: Wczytaj',
-        'no_actions_warning': 'Brak akcji do odtworzenia.',
-        'no_actions_to_repeat': 'Brak akcji do powtórzenia.',
-        'recording_error_title': 'Błąd nagrywania',
-        'recording_error_text': 'Nie można rozpocząć nagrywania: {error}',
-        'playback_error_title': 'Błąd odtwarzania',
-        'playback_error_text': 'Nie można rozpocząć odtwarzania: {error}',
-        'save_error': 'Błąd zapisu:',
-        'load_error': 'Błąd wczytywania:',
-        'close_confirm': 'Czy na pewno chcesz wyjść?',
-        'status_ready': 'Gotowy',
-        'status_recording': 'Nagrywanie... ({count})',
-        'status_playing': 'Odtwarzanie... ({progress}%)',
-        'status_playing_simple': 'Odtwarzanie...',
-        'status_no_actions': 'Brak nagranych akcji',
-        'dialog_ok': 'OK',
-        'dialog_cancel': 'Anuluj',
-        'dialog_yes': 'Tak',
-        'dialog_no': 'Nie',
-        'exit': 'Wyjście',
-        'about': 'O programie',
-        'about_text': 'ClickerRecord\\nWielojęzyczny rejestrator myszy i klawiatury.\\n© 2025'
-    }),
-    'he': dict(BASE_TRANSLATIONS, **{
-        'app_title': 'ClickerRecord',
-        'start_record': 'התחל הקלטה',
-        'stop_record': 'עצור הקלטה',
-        'play': 'הפעל',
-        'stop_play': 'עצור הפעלה',
-        'repeat': 'חזור על אחרון',
-        'save': 'שמור הקלטה',
-        'load': 'טען הקלטה',
-        'help': 'עזרה',
-        'settings': 'הגדרות',
-        'language': 'שפה',
-        'actions_recorded': 'פעולות שהוקלטו:',
-        'file': 'קובץ:',
-        'ready': 'מוכן',
-        'recording': 'מקליט...',
-        'infinite_repeats': 'חזרות אינסופיות', # <-- Добавлен перевод
-        'playing': 'מפעיל...',
-        'no_actions': 'אין פעולות מוקלטות להפעלה.',
-        'error': 'שגיאה',
-        'repeat_count': 'מספר חזרות:',
-        'schedule': 'תזמון:',
-        'once': 'הפעל פעם אחת',
-        'interval': 'הפעל כל',
-        'minutes': 'דקות',
-        'seconds': 'שניות', # <-- Добавлен перевод
-        'at_time': 'הפעל בשעה',
-        'speed': 'מהירות הפעלה:',
-        'help_title': 'עזרה - ClickerRecord',
-        'help_text': 'ClickerRecord - עזרה\n\nתכונות עיקריות:\n- הקלטת פעולות עכבר ומקלדת.\n- הפעלת פעולות מוקלטות.\n- הגדרת מספר חזרות, מהירות ותזמון.\n- שמירה וטעינה של הקלטות.\n\nקיצורי מקשים:\nF6: התחל/עצור הקלטה\nF7: הפעל\nF8: חזור על אחרון\nEsc: עצור הפעלה\nCtrl+S: שמור\nCtrl+O: טען',
-        'no_actions_warning': 'אין פעולות מוקלטות להפעלה.',
-        'no_actions_to_repeat': 'אין פעולות מוקלטות לחזרה.',
-        'recording_error_title': 'שגיאת הקלטה',
-        'recording_error_text': 'כשל בהתחלת ההקלטה: {error}',
-        'playback_error_title': 'שגיאת הפעלה',
-        'playback_error_text': 'כשל בהתחלת ההפעלה: {error}',
-        'playback_type_error': 'חוסר התאמה בארגומנטים בקריאה ל-Player.play:\n{error}\n\nהממשק והנגן עלולים לא להיות מסונכרנים.',
-        'playback_stop_error': 'שגיאה בעצירת ההפעלה.',
-        'playback_stopped': 'ההפעלה הופסקה...',
-        'save_error': 'שגיאה בשמירה:',
-        'load_error': 'שגיאה בטעינה:',
-        'load_file_error': 'כשל בטעינת הקובץ:\n{error}',
-        'file_not_valid': 'הקובץ אינו מכיל רשימת פעולות תקינה.',
-        'help_dialog_title': 'עזרה - ClickerRecord',
-        'close_confirm': 'האם אתה בטוח שברצונך לצאת?',
-        'status_ready': 'מוכן',
-        'status_recording': 'מקליט... ({count})',
-        'status_playing': 'מפעיל... ({progress}%)',
-        'status_playing_simple': 'מפעיל...',
-        'status_no_actions': 'אין פעולות מוקלטות',
-        'status_saved': 'ההקלטה נשמרה:',
-        'status_loaded': 'ההקלטה נטענה:',
-        'status_error': 'שגיאה:',
-        'status_stopped': 'נעצר',
-        'status_file': 'קובץ:',
-        'status_actions': 'פעולות:',
-        'dialog_ok': 'אישור',
-        'dialog_cancel': 'ביטול',
-        'dialog_yes': 'כן',
-        'dialog_no': 'לא',
-        'repeat_last': 'חזור על אחרון',
-        'repeat_last_warning': 'לא ניתן לחזור: אין פעולות.',
-        'repeat_last_busy': 'לא ניתן לחזור: הקלטה או הפעלה בתהליך.',
-        'save_success': 'ההקלטה נשמרה בהצלחה.',
-        'load_success': 'ההקלטה נטענה בהצלחה.',
-        'file_dialog_save': 'שמור הקלטה',
-        'file_dialog_load': 'טען הקלטה',
-        'file_dialog_filter': 'קבצי קליקר (*.clk);;כל הקבצים (*)',
-        'exit': 'יציאה',
-        'settings_title': 'הגדרות',
-        'about': 'אודות',
-        'about_text': 'ClickerRecord\\nמקליט עכבר ומקלדת רב-לשוני.\\n© 2025'
-    })
-}
+# --- Мультиязычность ---
+# Каталоги переводов лежат в locales/ и загружаются модулем i18n
 
 # Функция определения системного языка
 def detect_system_language():
@@ -581,35 +78,85 @@ if hasattr(Qt, 'AA_EnableHighDpiScaling'):
 if hasattr(Qt, 'AA_UseHighDpiPixmaps'):
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
+class FileTaskSignals(QObject):
+    """Сигналы фоновой загрузки/сохранения (fileio.FileTask вызывает emit из рабочего потока)"""
+    finished = pyqtSignal(object, object) # задача, результат
+    failed = pyqtSignal(object, object)   # задача, исключение
+    cancelled = pyqtSignal(object)        # задача
+    progress = pyqtSignal(object)         # задача
+    copied = pyqtSignal(object, object)   # задача, копия отображенной записи (fileio.save)
+
+class StatusSignals(QObject):
+    """Уведомления об изменении состояния из рабочих потоков (строка состояния обновляется по ним)"""
+    changed = pyqtSignal(str) # источник: 'recorder', ...
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         # Устанавливаем английский по умолчанию
         self.current_language = 'en' 
-        self.translations = TRANSLATIONS['en'] # Загружаем английские переводы
+        self.translations = i18n.load('en') # Загружаем английские переводы
+        STARTUP.mark("MainWindow: translations")
         
-        self.recorder = Recorder()
-        self.player = Player()
+        # Упрощение траектории мыши при записи (0 - выключено, задается в config.json)
+        self.move_tolerance_px = 0
+        self.move_tolerance_s = 0.05
+        # Сохранять записи в сжатом формате v3 (clkblocks.py, задается в config.json)
+        self.compress_recordings = False
+        # Турбо-режим: минимальный шаг между событиями и ожидание обработки ввода (config.json)
+        self.turbo_min_gap = 0.0
+        self.turbo_drain = False
+        self.turbo_rate = None # Событий в секунду в последнем турбо-воспроизведении
+        # Очередь запусков "Run every" при политике queue (config.json)
+        self.overlap_queue_depth = DEFAULT_QUEUE_DEPTH
+        self.last_ui_job = None # Задание последней серии "Run every"/"Run at": статистика запусков
+        # Журнал плеера, расписания и окна (applog.py) пишется фоновым потоком и в clickerrecord.log:
+        # в оконной сборке консоли нет. Порог - log_level в config.json
+        self.log_level = 'info'
+        applog.configure(level=self.log_level, path=self.log_file)
+        # Во время записи события сразу пишутся в журнал (journal.py) рядом с config.json
+        self.recorder = Recorder(journal_dir=self.journal_dir)
+        # Строка состояния обновляется по событиям (рекордер, плеер, файлы, расписание), а не по таймеру:
+        # в простое приложение не просыпается. Счетчики пробуждений - в окне диагностики (F9)
+        self.status_signals = StatusSignals(self)
+        self.recorder.on_activity = lambda: self.status_signals.changed.emit('recorder')
+        self.wakeups = Counter() # 'timer:...' - срабатывания таймеров, 'status:...' - обновления строки состояния
+        self.started_at = time.monotonic()
+        self.last_timer_wakeup = None
+        # Player без Qt, сигналы дает адаптер; отчеты о прогонах (latency.py) - в reports/ рядом с config.json
+        self.player = QtPlayer(Player(report_dir=self.report_dir))
         self.recording = False
         self.playing = False
-        self.recorded_actions = []
+        self.recorded_actions = ActionBuffer()
         self.current_file_path = None  # Путь к текущему файлу записи
+        # Фоновая загрузка/сохранение (не больше одной операции одновременно)
+        self.file_task = None
+        self.file_signals = FileTaskSignals(self)
+        # Запись сохраненного задания расписания тоже читается в фоне: (задача, задание) или None
+        self.job_load = None
+        self.job_file_signals = FileTaskSignals(self)
+        # Замененные записи, которые еще может читать поток воспроизведения
+        self._retired_actions = []
         self.settings = QSettings("ClickerRecord", "UserSettings")
         
-        # Таймеры для расписания
-        self.schedule_timer = QTimer(self)
-        self.schedule_timer.setSingleShot(True) # По умолчанию однократный
-        self.schedule_timer.timeout.connect(self._trigger_scheduled_playback)
-        
-        self.interval_timer = QTimer(self)
-        self.interval_timer.timeout.connect(self._trigger_interval_playback)
-        self.interval_repeats_left = 0 # Счетчик оставшихся повторов для интервального таймера (небесконечного)
+        # Расписание (scheduler.py): задание окна UI_JOB ("Run every"/"Run at") и сохраненные
+        # задания из schedule.json. Один однократный таймер взводится до ближайшего запуска
+        self.scheduler = Scheduler(self._on_schedule_fire, state_path=self.schedule_file)
+        self.scheduler_timer = QTimer(self)
+        self.scheduler_timer.setSingleShot(True)
+        self.scheduler_timer.setTimerType(Qt.PreciseTimer)
+        self.scheduler_timer.timeout.connect(self._poll_scheduler)
+        STARTUP.mark("MainWindow: state")
         
         self.initUI()
+        STARTUP.mark("MainWindow: initUI")
         self.connectSignals()
         self.setupShortcuts()
         self.updateUIState() # Начальное состояние интерфейса
+        STARTUP.mark("MainWindow: signals")
         self.load_settings() # Загружаем сохраненные настройки (язык)
+        STARTUP.mark("MainWindow: settings")
+        self._arm_scheduler()
         
     def initUI(self):
         self.setWindowTitle(self.translations['app_title'])
@@ -765,7 +312,7 @@ class MainWindow(QMainWindow):
         self.repeat_count.setFixedWidth(80)
         repeat_setup_layout.addWidget(self.repeat_label)
         repeat_setup_layout.addStretch()
-        self.infinite_repeat_checkbox = QCheckBox(self.translations.get('infinite_repeats', 'Infinite Repeats'))
+        self.infinite_repeat_checkbox = QCheckBox(self.translations['infinite_repeats'])
         self.infinite_repeat_checkbox.setFont(normal_font)
         self.infinite_repeat_checkbox.setChecked(False)
         repeat_setup_layout.addWidget(self.infinite_repeat_checkbox)
@@ -803,10 +350,17 @@ class MainWindow(QMainWindow):
         interval_layout.addWidget(self.interval_radio)
         interval_layout.addWidget(self.interval_value)
         interval_layout.addWidget(self.interval_label)
+        # Что делать с запуском, если предыдущий еще играет
+        self.overlap_combo = QComboBox()
+        self.overlap_combo.setFont(normal_font)
+        for policy, key in OVERLAP_KEYS.items():
+            self.overlap_combo.addItem(self.translations[key], policy)
+        interval_layout.addWidget(self.overlap_combo)
         interval_layout.addStretch()
         schedule_group_layout.addLayout(interval_layout)
         self.settings_widgets.append(self.interval_radio) # Добавляем RadioButton
         self.settings_widgets.append(self.interval_value) # Добавляем SpinBox
+        self.settings_widgets.append(self.overlap_combo)
         # self.settings_widgets.extend([self.interval_radio, self.interval_value, interval_label]) # Не добавляем Label
         
         time_layout = QHBoxLayout()
@@ -829,9 +383,17 @@ class MainWindow(QMainWindow):
         # self.settings_widgets.extend([self.time_radio, self.time_value])
         
         speed_layout = QVBoxLayout()
+        speed_header_layout = QHBoxLayout()
         self.speed_label = QLabel(self.translations['speed'])
         self.speed_label.setFont(normal_font)
-        speed_layout.addWidget(self.speed_label)
+        speed_header_layout.addWidget(self.speed_label)
+        speed_header_layout.addStretch()
+        # Турбо: записанные паузы не учитываются, события идут так быстро, как их принимает система
+        self.turbo_checkbox = QCheckBox(self.translations['turbo'])
+        self.turbo_checkbox.setFont(normal_font)
+        speed_header_layout.addWidget(self.turbo_checkbox)
+        speed_layout.addLayout(speed_header_layout)
+        self.settings_widgets.append(self.turbo_checkbox)
         # self.settings_widgets.append(speed_label) # Не добавляем Label
         
         speed_slider_layout = QHBoxLayout()
@@ -851,6 +413,37 @@ class MainWindow(QMainWindow):
         self.settings_widgets.append(self.speed_slider) # Добавляем Slider
         # self.settings_widgets.extend([self.speed_slider, self.speed_value]) # Не добавляем Label
         
+        # Паузы в записи: как записано, сократить до N секунд или удалить (timeline.py)
+        gap_layout = QHBoxLayout()
+        self.gap_label = QLabel(self.translations['pauses'])
+        self.gap_label.setFont(normal_font)
+        self.gap_mode_combo = QComboBox()
+        self.gap_mode_combo.setFont(normal_font)
+        for mode in GAP_MODE_KEYS:
+            self.gap_mode_combo.addItem(self.translations[GAP_MODE_KEYS[mode]], mode)
+        self.max_gap_value = QDoubleSpinBox()
+        self.max_gap_value.setFont(normal_font)
+        self.max_gap_value.setRange(timeline.MIN_GAP, 3600)
+        self.max_gap_value.setDecimals(1)
+        self.max_gap_value.setSingleStep(0.5)
+        self.max_gap_value.setValue(1.0)
+        self.max_gap_value.setFixedWidth(70)
+        self.gap_seconds_label = QLabel(self.translations['seconds'])
+        self.gap_seconds_label.setFont(normal_font)
+        gap_layout.addWidget(self.gap_label)
+        gap_layout.addWidget(self.gap_mode_combo)
+        gap_layout.addWidget(self.max_gap_value)
+        gap_layout.addWidget(self.gap_seconds_label)
+        gap_layout.addStretch()
+        main_layout.addLayout(gap_layout)
+        self.settings_widgets.append(self.gap_mode_combo)
+        self.settings_widgets.append(self.max_gap_value)
+        
+        # Предпросмотр общего времени воспроизведения с текущими настройками
+        self.total_time_label = QLabel()
+        self.total_time_label.setFont(normal_font)
+        main_layout.addWidget(self.total_time_label)
+        
         # Создаем статус бар без кнопки Language
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
@@ -860,6 +453,11 @@ class MainWindow(QMainWindow):
         self.action_count.setFont(QFont("Arial", 10))
         self.statusBar.addWidget(self.action_count)
         
+        # Кнопка отмены фоновой загрузки/сохранения (видна только во время операции)
+        self.cancel_file_button = QPushButton(self.translations['cancel'])
+        self.cancel_file_button.hide()
+        self.statusBar.addPermanentWidget(self.cancel_file_button)
+        
         # --- Нижние кнопки --- 
         
         # Кнопки сохранения и загрузки
@@ -922,11 +520,6 @@ class MainWindow(QMainWindow):
         self.statusBar.setFont(status_font)
         self.statusBar.showMessage(self.translations['ready'])
         
-        # Таймер для обновления статус-бара (более частый)
-        self.gui_update_timer = QTimer(self)
-        self.gui_update_timer.timeout.connect(self.update_status)
-        self.gui_update_timer.start(100) # Обновление статуса 10 раз в секунду
-        
         self.updateUITexts()
     
     def connectSignals(self):
@@ -938,14 +531,33 @@ class MainWindow(QMainWindow):
         self.save_button.clicked.connect(self.save_recording)
         self.load_button.clicked.connect(self.load_recording)
         self.help_button.clicked.connect(self.show_help)
+        self.cancel_file_button.clicked.connect(self.cancel_file_task)
         
         self.speed_slider.valueChanged.connect(self.update_speed_label)
         
+        # Предпросмотр общего времени пересчитывается при изменении настроек воспроизведения
+        self.speed_slider.valueChanged.connect(self.update_total_time_preview)
+        self.repeat_count.valueChanged.connect(self.update_total_time_preview)
+        self.interval_radio.toggled.connect(self.updateUIState) # Повторы, "бесконечно" и перекрытие зависят от режима
+        self.gap_mode_combo.currentIndexChanged.connect(self.updateUIState)
+        self.turbo_checkbox.toggled.connect(self.updateUIState)
+        self.max_gap_value.valueChanged.connect(self.update_total_time_preview)
+        
         # Подключение к сигналам плеера
         # Используем Qt.QueuedConnection для потокобезопасности!
         self.player.playbackFinished.connect(self.on_playback_completed, Qt.QueuedConnection)
         self.player.playbackError.connect(self.on_playback_error, Qt.QueuedConnection)
         self.player.playbackProgress.connect(self.update_playback_progress, Qt.QueuedConnection)
+        self.status_signals.changed.connect(self.refresh_status, Qt.QueuedConnection)
+        
+        # Сигналы фоновых операций с файлами - тоже из чужого потока
+        self.file_signals.finished.connect(self.on_file_task_finished, Qt.QueuedConnection)
+        self.file_signals.failed.connect(self.on_file_task_failed, Qt.QueuedConnection)
+        self.file_signals.cancelled.connect(self.on_file_task_cancelled, Qt.QueuedConnection)
+        self.file_signals.progress.connect(self.on_file_task_progress, Qt.QueuedConnection)
+        self.file_signals.copied.connect(self.on_file_task_copied, Qt.QueuedConnection)
+        self.job_file_signals.finished.connect(self.on_job_recording_loaded, Qt.QueuedConnection)
+        self.job_file_signals.failed.connect(self.on_job_recording_failed, Qt.QueuedConnection)
     
     def setupShortcuts(self):
         """Настройка горячих клавиш"""
@@ -972,6 +584,10 @@ class MainWindow(QMainWindow):
         # Ctrl+O - загрузить запись
         self.load_shortcut = QShortcut(QKeySequence("Ctrl+O"), self)
         self.load_shortcut.activated.connect(self.load_recording)
+        
+        # F9 - диагностика (пробуждения, расписание)
+        self.diagnostics_shortcut = QShortcut(QKeySequence("F9"), self)
+        self.diagnostics_shortcut.activated.connect(self.show_diagnostics)
     
     def toggle_recording(self):
         """Переключение между записью и остановкой по горячей клавише F6"""
@@ -984,9 +600,11 @@ class MainWindow(QMainWindow):
         """Начало записи"""
         if self.recording or self.playing: # Не начинаем, если уже записываем или играем
             return
+        if self.file_task is not None: # Результат загрузки заменил бы новую запись
+            return
             
         self.recording = True
-        self.recorded_actions = []
+        self._replace_recording(ActionBuffer())
         self.current_file_path = None
         # action_count обновится через update_status
         
@@ -998,11 +616,13 @@ class MainWindow(QMainWindow):
         
         # Запускаем запись
         try:
-            self.recorder.start_recording(self.on_action_recorded)
-            print("[start_recording] Запись начата.")
+            self.recorder.start_recording()
+            # Рекордер пишет прямо в свой буфер, GUI держит ссылку на него же
+            self._replace_recording(self.recorder.actions)
+            log.info("start_recording: Запись начата.")
             self.updateUIState() # Обновляем интерфейс ПОСЛЕ старта записи
         except Exception as e:
-             print(f"[start_recording] Ошибка старта рекордера: {e}")
+             log.error("start_recording: Ошибка старта рекордера: {}", e)
              QMessageBox.critical(self, "Ошибка записи", f"Не удалось запустить запись: {e}")
              self.recording = False # Сбрасываем флаг, если старт не удался
              self.updateUIState()
@@ -1015,23 +635,24 @@ class MainWindow(QMainWindow):
         try:
             self.recorder.stop()
             self.recording = False
-            print(f"[stop_recording] Остановлено. Состояние: recording={self.recording}, playing={self.playing}, actions={len(self.recorded_actions)}")
+            # С журналом рекордер отдает собранную из него запись, а не буфер в памяти
+            self._replace_recording(self.recorder.actions)
+            log.info("stop_recording: Остановлено. Состояние: recording={}, playing={}, actions={}", self.recording, self.playing, len(self.recorded_actions))
+            ring_stats = self.recorder.ring_stats()
+            log.debug("stop_recording: Кольцевые буферы: {}", ring_stats)
+            if self.recorder.dropped_count():
+                log.warning("stop_recording: Потеряно событий: {}", self.recorder.dropped_count())
         except Exception as e:
-            print(f"[stop_recording] Ошибка остановки рекордера: {e}")
+            log.error("stop_recording: Ошибка остановки рекордера: {}", e)
             self.recording = False # Все равно считаем остановленным
         finally:
             self.updateUIState() # Обновляем интерфейс
             QApplication.processEvents() # Принудительно обрабатываем события
-            print("[stop_recording] Вызван updateUIState и processEvents.")
-    
-    def on_action_recorded(self, action):
-        if self.recording: # Доп. проверка на всякий случай
-             self.recorded_actions.append(action)
-        # Счетчик обновится через update_status
+            log.debug("stop_recording: Вызван updateUIState и processEvents.")
     
     def start_playback(self):
         if not self.recorded_actions:
-            QMessageBox.warning(self, self.translations['playback_error_title'], self.translations.get('no_actions_warning', TRANSLATIONS['en']['no_actions_warning']))
+            QMessageBox.warning(self, self.translations['playback_error_title'], self.translations['no_actions_warning'])
             return
         if self.playing or self.recording:
             return
@@ -1040,193 +661,184 @@ class MainWindow(QMainWindow):
 
         # Определяем режим запуска
         if self.once_radio.isChecked():
+            self.last_ui_job = None
             repeat_count = self.repeat_count.value()
             self._start_direct_playback(repeat_count, speed_factor)
         elif self.interval_radio.isChecked():
             interval_seconds = self.interval_value.value()
-            is_infinite = self.infinite_repeat_checkbox.isChecked()
-
-            if interval_seconds > 0:
-                # Сначала устанавливаем флаги и счетчики
-                if is_infinite:
-                    self.interval_repeats_left = -1 # Флаг бесконечности
-                    print(f"[start_playback] Запуск БЕСКОНЕЧНОГО интервального таймера: каждые {interval_seconds} сек")
-                else:
-                    self.interval_repeats_left = self.repeat_count.value()
-                    if self.interval_repeats_left <= 0:
-                        print("[start_playback] Количество повторов <= 0, запуск не требуется.")
-                        return # Не запускаем, если повторов 0 или меньше
-                    print(f"[start_playback] Запуск интервального таймера: каждые {interval_seconds} сек, повторов: {self.interval_repeats_left}")
-
-                # Ставим self.playing = True и обновляем UI ПЕРЕД первым запуском
-                self.playing = True # Устанавливаем флаг игры
-                self.updateUIState()
-
-                # Запускаем первый раз немедленно
-                self._trigger_interval_playback() # Этот вызов запустит плеер и, если нужно, перезапустит таймер
-
-                # --- УДАЛЕНО: Логика перезапуска таймера теперь полностью в _trigger_interval_playback ---
-                # if self.playing and (is_infinite or self.interval_repeats_left > 0):
-                #      self.interval_timer.start(interval_seconds * 1000)
-                # --- КОНЕЦ УДАЛЕНИЯ ---
-            else:
-                 print("[start_playback] Интервал <= 0, интервальный режим не запущен.")
-                 # Если интервал 0, то играть не начинаем
-                 return
-
-            # --- ПЕРЕМЕЩЕНО ВЫШЕ: Установка playing и updateUIState перед первым запуском ---
-            # self.playing = True # Устанавливаем флаг игры
-            # self.updateUIState()
-            # --- КОНЕЦ ПЕРЕМЕЩЕНИЯ ---
+            if interval_seconds <= 0:
+                log.warning("start_playback: Интервал <= 0, интервальный режим не запущен.")
+                return
+            runs = None if self.infinite_repeat_checkbox.isChecked() else self.repeat_count.value()
+            if runs is not None and runs <= 0:
+                log.warning("start_playback: Количество повторов <= 0, запуск не требуется.")
+                return
+            log.info("start_playback: Интервальный режим: каждые {} сек, повторов: {}", interval_seconds, runs or 'бесконечно')
+            self.playing = True
+            self.updateUIState()
+            # Запуски привязаны к моменту старта (старт + k * интервал), задержки не накапливаются;
+            # первый запуск - сразу
+            job = ScheduledJob(UI_JOB, KIND_INTERVAL, interval=interval_seconds, runs=runs,
+                               overlap=self.overlap_combo.currentData(),
+                               queue_depth=self.overlap_queue_depth, persist=False)
+            self.last_ui_job = job
+            self._schedule_ui_job(job)
         elif self.time_radio.isChecked():
             target_time = self.time_value.time()
-            current_time = QTime.currentTime()
-            msecs_to_target = current_time.msecsTo(target_time)
-
-            if msecs_to_target < 0: # Если время уже прошло сегодня, планируем на завтра
-                msecs_to_target += 24 * 60 * 60 * 1000 
-            
-            print(f"[start_playback] Запуск таймера на время: {target_time.toString('HH:mm')}, через {msecs_to_target / 1000:.1f} сек")
-            self.schedule_timer.setSingleShot(True) # Убедимся, что таймер однократный
-            self.schedule_timer.start(msecs_to_target)
-            self.playing = True # Устанавливаем флаг игры, пока ждем таймер
+            # Ежедневное расписание cron на один запуск: ближайшие HH:MM, сегодня или завтра
+            job = ScheduledJob(UI_JOB, KIND_CRON, cron=f"{target_time.minute()} {target_time.hour()} * * *",
+                               runs=1, persist=False)
+            self.playing = True # Устанавливаем флаг игры, пока ждем запуска
+            self.last_ui_job = job
+            due = self._schedule_ui_job(job)
+            log.info("start_playback: Запуск на время: {}, через {:.1f} сек", target_time.toString('HH:mm'), due - time.time())
             self.updateUIState()
             self.statusBar.showMessage(f"Запланировано на {target_time.toString('HH:mm')}")
 
     def _start_direct_playback(self, repeat_count, speed_factor):
-        """Запускает немедленное воспроизведение заданное число раз."""
-        print(f"[start_playback] Прямой запуск: повторов={repeat_count}, скорость={speed_factor}")
+        """Запускает немедленное воспроизведение заданное число раз; False - не запущено"""
+        log.info("start_playback: Прямой запуск: повторов={}, скорость={}", repeat_count, speed_factor)
         self.playing = True
         try:
-            self.player.play(
+            max_gap, gap_mode = self.playback_gap()
+            turbo, min_gap = self.playback_turbo()
+            started = self.player.play(
                 self.recorded_actions, 
                 repeat_count, 
-                speed_factor
+                speed_factor,
+                max_gap=max_gap,
+                gap_mode=gap_mode,
+                turbo=turbo,
+                min_gap=min_gap
             )
             self.updateUIState()
+            return started
         except TypeError as te:
-            QMessageBox.critical(self, self.translations['playback_error_title'], self.translations.get('playback_type_error', TRANSLATIONS['en']['playback_type_error']).format(error=te))
+            QMessageBox.critical(self, self.translations['playback_error_title'], self.translations['playback_type_error'].format(error=te))
             self.playing = False
             self.updateUIState()
         except Exception as e:
-            QMessageBox.critical(self, self.translations['playback_error_title'], self.translations.get('playback_error_text', TRANSLATIONS['en']['playback_error_text']).format(error=e))
+            QMessageBox.critical(self, self.translations['playback_error_title'], self.translations['playback_error_text'].format(error=e))
             self.playing = False
             self.updateUIState()
+        return False
             
-    def _trigger_scheduled_playback(self):
-        """Срабатывает по таймеру для 'Run at HH:MM'."""
-        print("[schedule_timer] Таймер сработал.")
-        if self.playing: # Проверка, что не остановили вручную
-             repeat_count = self.repeat_count.value()
-             speed_factor = self.speed_slider.value() / 100.0
-             # Запускаем однократно, т.к. таймер был SingleShot
-             # Флаг self.playing уже True, плеер сам его сбросит по завершению/ошибке
-             self._start_direct_playback(repeat_count, speed_factor)
-             # Важно: Не сбрасываем self.playing здесь, ждем сигнал от плеера
-        else:
-             print("[schedule_timer] Воспроизведение было отменено.")
-             # Убедимся, что UI обновлен
-             self.updateUIState()
+    def _schedule_ui_job(self, job):
+        """Ставит задание окна в планировщик; возвращает время первого запуска"""
+        due = self.scheduler.add(job)
+        self._arm_scheduler()
+        return due
 
-    def _trigger_interval_playback(self):
-         """Срабатывает по таймеру для 'Run every X seconds'. Запускает ОДИН цикл воспроизведения."""
-         if self.playing: # Проверяем, что не было остановки
-            is_infinite = (self.interval_repeats_left == -1) # Проверяем флаг бесконечности
-            
-            # Если режим конечный, проверяем, остались ли еще повторы (перед текущим запуском)
-            if not is_infinite and self.interval_repeats_left <= 0:
-                 print("[_trigger_interval_playback] Повторы закончились, но таймер сработал? Остановка.")
-                 # Не вызываем stop_playback(), чтобы не сбросить плеер, если он еще играет последний раз
-                 if self.interval_timer.isActive():
-                     self.interval_timer.stop()
-                 # Состояние playing сбросится в on_playback_completed
-                 return
-                 
+    def _arm_scheduler(self):
+        """Взводит таймер до ближайшего запуска по расписанию"""
+        delay = self.scheduler.next_wakeup()
+        if delay is None:
+            self.scheduler_timer.stop()
+            return
+        # Не дольше SCHEDULER_MAX_SLEEP_MS: сон системы и перевод часов замечаются вовремя
+        self.scheduler_timer.start(min(int(delay * 1000) + 1, SCHEDULER_MAX_SLEEP_MS))
+
+    def _poll_scheduler(self):
+        self.wakeups['timer:scheduler'] += 1
+        self.last_timer_wakeup = time.monotonic()
+        self.scheduler.poll()
+        self._arm_scheduler()
+
+    def _on_schedule_fire(self, job, error):
+        """Запуск по расписанию (из Scheduler.poll); False - запуск не состоялся"""
+        if job.job_id == UI_JOB:
+            if not self.playing:
+                return False
             speed_factor = self.speed_slider.value() / 100.0
-            
-            # Уменьшаем счетчик, если режим не бесконечный (делаем это *после* запуска play)
-            # current_repeat_num_str = "(бесконечно)" # Для логгирования
-            # if not is_infinite:
-            #     remaining_before_play = self.interval_repeats_left
-            #     # self.interval_repeats_left -= 1 # Уменьшаем ПОСЛЕ play
-            #     current_repeat_num_str = f"(осталось {remaining_before_play} до запуска)"
-            
-            print(f"[_trigger_interval_playback] Запуск воспроизведения 1 раз.")
-            
-            # Запускаем плеер на repeat_count раз
-            try:
-                 # Запускаем плеер только на ОДИН раз
-                 self.player.play(self.recorded_actions, 1, speed_factor)
-                 
-                 # Уменьшаем счетчик ПОСЛЕ успешного запуска play, если режим не бесконечный
-                 if not is_infinite:
-                      self.interval_repeats_left -= 1
-                      print(f"[_trigger_interval_playback] Воспроизведение запущено, осталось {self.interval_repeats_left} запусков.")
-                 else:
-                      print(f"[_trigger_interval_playback] Воспроизведение (бесконечное) запущено.")
+            # "Run every" играет запись один раз за запуск, "Run at" - заданное число повторов
+            repeat_count = 1 if job.kind == KIND_INTERVAL else self.repeat_count.value()
+            if self._start_direct_playback(repeat_count, speed_factor):
+                return True
+            if self.playing:
+                return False # Предыдущий запуск еще идет: действует политика перекрытия задания
+            # Запуск не удался (ошибка уже показана) - серия останавливается, как при ошибке плеера
+            self.scheduler.remove(UI_JOB)
+            raise RuntimeError("воспроизведение не запущено")
+        # Сохраненные задания играют свою запись (или текущую), только когда окно свободно
+        if self.playing or self.recording or self.file_task is not None:
+            return False
+        if not job.recording:
+            if not self.recorded_actions:
+                raise ValueError("запись пуста")
+            return self._start_job_playback(job, self.recorded_actions)
+        # Своя запись читается в рабочем потоке fileio; воспроизведение начнется в on_job_recording_loaded.
+        # Пока запись читается, окно занято: следующие запуски подчиняются политике перекрытия
+        log.info("scheduler: {}: загрузка {}", job.job_id, job.recording)
+        self.playing = True
+        self.job_load = (fileio.load(job.recording, on_done=self.job_file_signals.finished.emit,
+                                     on_error=self.job_file_signals.failed.emit), job)
+        self.updateUIState()
+        return True
 
-            except Exception as e:
-                 print(f"[interval_timer] Ошибка при запуске player.play: {e}")
-                 QMessageBox.critical(self, self.translations['playback_error_title'], self.translations.get('playback_error_text', TRANSLATIONS['en']['playback_error_text']).format(error=e))
-                 self.stop_playback() # Останавливаем всю серию при ошибке
-                 return
-                 
-            # Логика перезапуска таймера перенесена сюда (после успешного play)
-            # Если игра все еще активна (не остановили во время play) 
-            # и (режим бесконечный ИЛИ остались повторы > 0)
-            if self.playing and (is_infinite or self.interval_repeats_left > 0):
-                 interval_seconds = self.interval_value.value()
-                 # Запускаем таймер только если интервал положительный
-                 if interval_seconds > 0:
-                      print(f"[_trigger_interval_playback] Планируем следующий запуск через {interval_seconds} сек.")
-                      self.interval_timer.start(interval_seconds * 1000)
-                 else:
-                      print(f"[_trigger_interval_playback] Интервал <= 0, таймер не перезапускается.")
-                      # Если интервал 0, а повторы конечные, останавливаем
-                      if not is_infinite: 
-                           self.stop_playback() 
-            else:
-                 # Если повторы кончились (или остановили вручную)
-                 print("[_trigger_interval_playback] Конечные повторы завершены или остановлено вручную. Таймер не перезапускается.")
-                 # Не меняем self.playing здесь, ждем on_playback_completed/error от последнего play
+    def _start_job_playback(self, job, actions):
+        log.info("scheduler: {}: воспроизведение {}", job.job_id, job.recording or 'текущей записи')
+        self.playing = self.player.play(actions, job.repeat, job.speed)
+        self.updateUIState()
+        return self.playing
 
-         else:
-             print("[_trigger_interval_playback] Воспроизведение было остановлено, таймер не перезапускается.")
-             if self.interval_timer.isActive(): # Доп. проверка
-                 self.interval_timer.stop()
+    def on_job_recording_loaded(self, task, actions):
+        """Слот: запись сохраненного задания прочитана - начинаем воспроизведение"""
+        if self.job_load is None or self.job_load[0] is not task:
+            actions.close() # Запуск отменен остановкой
+            return
+        job = self.job_load[1]
+        self.job_load = None
+        self._retired_actions.append(actions) # Закроется после воспроизведения
+        if not actions:
+            self._job_failed(job, ValueError("запись пуста"))
+        elif not self._start_job_playback(job, actions):
+            self._job_failed(job, RuntimeError("воспроизведение не запущено"))
+
+    def on_job_recording_failed(self, task, error):
+        """Слот: запись сохраненного задания не прочитана (нет файла, неверный формат)"""
+        if self.job_load is None or self.job_load[0] is not task:
+            return
+        job = self.job_load[1]
+        self.job_load = None
+        self._job_failed(job, error)
+
+    def _job_failed(self, job, error):
+        """Запуск сохраненного задания не состоялся: ошибка - в статистику задания, окно свободно"""
+        self.scheduler.report_failure(job.job_id, error)
+        self.playing = False
+        self.updateUIState()
+        self.statusBar.showMessage(f"{self.translations['playback_error_title']}: {job.job_id}: {error}")
+        self._release_retired_actions()
+        self.scheduler.release()
 
     def stop_playback(self):
         """Остановка воспроизведения (прямого или по расписанию)"""
-        print("[stop_playback] Вызван метод остановки.")
+        log.debug("stop_playback: Вызван метод остановки.")
 
-        # Останавливаем таймеры расписания, если они активны
-        was_timer_active = False
-        if self.schedule_timer.isActive():
-            print("[stop_playback] Остановка таймера 'Run at'.")
-            self.schedule_timer.stop()
-            was_timer_active = True
-        if self.interval_timer.isActive():
-            print("[stop_playback] Остановка таймера 'Run every'.")
-            self.interval_timer.stop()
-            was_timer_active = True
-
-        # Сбрасываем счетчик интервальных повторов
-        self.interval_repeats_left = 0
+        # Снимаем задание окна с расписания; сохраненные задания остаются
+        was_timer_active = self.scheduler.remove(UI_JOB) is not None
+        if self.job_load is not None:
+            # Запись задания еще читается: запуск отменяется, загруженное закроется в слоте
+            self.job_load[0].cancel()
+            self.job_load = None
+        if was_timer_active:
+            log.debug("stop_playback: Задание 'Run at'/'Run every' снято с расписания.")
+            self._arm_scheduler()
 
         # Останавливаем плеер, если он активен
         player_was_playing = self.player.is_playing # Проверяем фактическое состояние плеера
         if player_was_playing:
             try:
-                print("[stop_playback] Запрос на остановку плеера.")
+                log.info("stop_playback: Запрос на остановку плеера.")
                 self.player.stop()
                 # Не меняем self.playing здесь, ждем callback
-                self.statusBar.showMessage(self.translations.get('playback_stopped', TRANSLATIONS['en']['playback_stopped']))
+                self.statusBar.showMessage(self.translations['playback_stopped'])
             except Exception as e:
-                print(f"[stop_playback] Ошибка при вызове player.stop(): {e}")
+                log.error("stop_playback: Ошибка при вызове player.stop(): {}", e)
                 # Если ошибка при остановке плеера, всё равно сбрасываем состояние GUI
                 self.playing = False
                 self.updateUIState()
-                self.statusBar.showMessage(self.translations.get('playback_stop_error', TRANSLATIONS['en']['playback_stop_error']))
+                self.statusBar.showMessage(self.translations['playback_stop_error'])
                 return # Выходим, чтобы не сбросить флаг еще раз ниже
 
         # Если был активен таймер, но плеер еще не запущен (ожидание 'Run at' или между интервалами)
@@ -1234,170 +846,272 @@ class MainWindow(QMainWindow):
         # то нужно вручную сбросить флаг playing и обновить UI.
         # Если плеер БЫЛ активен, то сброс флага и обновление UI произойдет в on_playback_completed/error.
         if was_timer_active and not player_was_playing:
-             print("[stop_playback] Таймер был остановлен до запуска плеера. Сброс состояния GUI.")
+             log.debug("stop_playback: Таймер был остановлен до запуска плеера. Сброс состояния GUI.")
              self.playing = False
              self.updateUIState()
         elif not player_was_playing and self.playing: # Если плеер не играет, но GUI думает, что играет
-             print("[stop_playback] Плеер не активен, но флаг GUI был установлен. Сброс состояния GUI.")
+             log.debug("stop_playback: Плеер не активен, но флаг GUI был установлен. Сброс состояния GUI.")
              self.playing = False
              self.updateUIState()
         else:
-             print("[stop_playback] Либо плеер активен (ждем колбек), либо уже все остановлено.")
+             log.debug("stop_playback: Либо плеер активен (ждем колбек), либо уже все остановлено.")
 
          # Убираем ручное управление кнопками - оно теперь в updateUIState
          # self.play_button.setEnabled(True)
 
     def on_playback_completed(self):
         """Слот, вызываемый сигналом playbackFinished из плеера"""
-        print("[on_playback_completed] Слот вызван сигналом.")
-
-        # В режиме интервала:
-        # - Плеер завершил ОДИН цикл (из 1 повтора).
-        # - Флаг self.playing остается True.
-        # - Таймер был перезапущен (или должен быть перезапущен) в _trigger_interval_playback.
-        # - Остановка происходит ТОЛЬКО через stop_playback() или по завершению счетчика в _trigger_interval_playback.
-        # Поэтому здесь не нужно менять self.playing или останавливать таймер.
+        log.debug("on_playback_completed: Слот вызван сигналом.")
+        self._release_retired_actions()
+        if self.turbo_checkbox.isChecked():
+            self.turbo_rate = self.player.stats.get('events_per_second')
 
-        # Если это НЕ интервальный режим (был прямой запуск или 'Run at'):
-        # Проверяем, был ли режим интервальным, посмотрев на радио-кнопку (более надежно, чем timer.isActive())
-        is_interval_radio_checked = self.interval_radio.isChecked()
-
-        if not is_interval_radio_checked:
-             # Это был прямой запуск или 'Run at', и он завершился.
-             if self.playing: # Дополнительная проверка, что мы действительно считали себя играющими
-                 print("[on_playback_completed] Завершение НЕинтервального воспроизведения.")
-                 self.playing = False
-                 self.updateUIState() # Обновляем интерфейс
-                 QApplication.processEvents() # Даем интерфейсу обновиться
-                 print("[on_playback_completed] Состояние обновлено.")
-             else:
-                 print("[on_playback_completed] НЕинтервальное завершение, но self.playing уже был False.")
+        # Запуск, ждавший в очереди расписания (политики queue/coalesce), начинается сразу
+        if self.scheduler.release():
+            return
+        # Пока задание окна ("Run every") есть в расписании, серия продолжается:
+        # следующий запуск сделает планировщик
+        if UI_JOB in self.scheduler.jobs:
+            log.debug("on_playback_completed: Интервальный цикл продолжается.")
+            return
+        if self.playing: # Дополнительная проверка, что мы действительно считали себя играющими
+            log.info("on_playback_completed: Воспроизведение завершено.")
+            self.playing = False
+            self.updateUIState() # Обновляем интерфейс
+            QApplication.processEvents() # Даем интерфейсу обновиться
+            log.debug("on_playback_completed: Состояние обновлено.")
+            # Окно освободилось: может начаться отложенный запуск сохраненного задания
+            self.scheduler.release()
         else:
-             # Это был один из запусков интервального таймера
-             print("[on_playback_completed] Завершение одного интервального цикла.")
-             # Проверяем, был ли это последний запуск (если режим не бесконечный)
-             # Важно: self.interval_repeats_left уже уменьшен в _trigger_interval_playback *перед* этим вызовом
-             is_infinite = (self.interval_repeats_left == -1) # Проверяем флаг бесконечности
-             if not is_infinite and self.interval_repeats_left <= 0:
-                  # Повторы закончились
-                  print("[on_playback_completed] Конечные интервальные повторы завершены. Сброс состояния.")
-                  if self.playing: # Доп. проверка
-                     self.playing = False
-                     self.updateUIState()
-                     QApplication.processEvents()
-                     print("[on_playback_completed] Интервальный режим завершен, состояние обновлено.")
-                  else:
-                     print("[on_playback_completed] Интервальный режим завершен, но self.playing уже был False.")
-             else:
-                 # Либо режим бесконечный, либо еще остались повторы - таймер должен был перезапуститься в _trigger_interval_playback
-                 print("[on_playback_completed] Интервальный цикл продолжается (или бесконечный). Логика продолжения в _trigger_interval_playback.")
-                 # Ничего не делаем здесь, интерфейс остается в состоянии 'Playing...'.
+            log.debug("on_playback_completed: Завершение, но self.playing уже был False.")
 
     def on_playback_error(self, error_message):
          """Слот, вызываемый сигналом playbackError из плеера"""
-         print(f"[on_playback_error] Слот вызван сигналом: {error_message}")
+         log.warning("on_playback_error: Слот вызван сигналом: {}", error_message)
+         self._release_retired_actions()
          
-         # При любой ошибке останавливаем все таймеры и сбрасываем состояние
-         if self.schedule_timer.isActive():
-             self.schedule_timer.stop()
-         if self.interval_timer.isActive():
-             self.interval_timer.stop()
-         # self.interval_repeats_left = 0 # Больше не нужно
+         # При любой ошибке снимаем задание окна с расписания и сбрасываем состояние
+         if self.scheduler.remove(UI_JOB) is not None:
+             self._arm_scheduler()
             
          if self.playing: # Доп. проверка
-              print("[on_playback_error] Ошибка во время воспроизведения. Сброс состояния.")
+              log.debug("on_playback_error: Ошибка во время воспроизведения. Сброс состояния.")
               self.playing = False
               self.updateUIState()
               QApplication.processEvents()
               QMessageBox.warning(self, self.translations['playback_error_title'], str(error_message))
               self.statusBar.showMessage(f"{self.translations['playback_error_title']}: {error_message}")
-              print("[on_playback_error] Состояние обновлено, ошибка показана.")
+              log.debug("on_playback_error: Состояние обновлено, ошибка показана.")
          else:
-              print("[on_playback_error] Состояние playing уже было False.")
+              log.debug("on_playback_error: Состояние playing уже было False.")
 
     def update_playback_progress(self, current_ms, total_ms):
-        """Обновляет статус-бар для отображения прогресса воспроизведения"""
-        if self.playing and total_ms > 0:
-            progress_percent = int((current_ms / total_ms) * 100)
-            # Показываем прогресс только если он валидный
-            if 0 <= progress_percent <= 100:
-                 self.statusBar.showMessage(f"Воспроизведение... ({progress_percent}%)")
-            else: # Если расчет странный, показываем просто статус
-                 self.statusBar.showMessage(f"Воспроизведение...")
-        elif self.playing:
-             self.statusBar.showMessage(f"Воспроизведение... (расчет времени)")
-    
-    def check_schedule(self):
-        # Этот метод больше не нужен, логика в start_playback
-        pass 
+        """Слот прогресса воспроизведения (прорежен ProgressChannel): обновляет строку состояния"""
+        if self.playing:
+            self.refresh_status('player')
     
     def update_speed_label(self, value):
         speed = value / 100.0
         self.speed_value.setText(f"{speed:.2f}x")
+
+    def playback_gap(self):
+        """Ограничение пауз из настроек: (max_gap, режим) для Player.play"""
+        mode = self.gap_mode_combo.currentData()
+        if mode == GAP_KEEP:
+            return None, timeline.GAP_CAP
+        return self.max_gap_value.value(), mode
+
+    def playback_turbo(self):
+        """Турбо-режим из настроек: (режим или None, минимальный шаг) для Player.play"""
+        if not self.turbo_checkbox.isChecked():
+            return None, 0.0
+        return (TURBO_DRAIN if self.turbo_drain else TURBO_GAP), self.turbo_min_gap
+
+    def update_total_time_preview(self):
+        """Показывает, сколько продлится воспроизведение с текущей скоростью, повторами и паузами"""
+        if self.recording or not self.recorded_actions:
+            self.total_time_label.setText("")
+            return
+        # В режиме "Run every" каждый запуск - один проход записи
+        repeat_count = 1 if self.interval_radio.isChecked() else self.repeat_count.value()
+        max_gap, gap_mode = self.playback_gap()
+        turbo, min_gap = self.playback_turbo()
+        if turbo is not None and not min_gap:
+            # Длительность зависит только от того, как быстро система примет ввод
+            self.total_time_label.setText(self.translations['total_time'].format(time=self.translations['turbo']))
+            return
+        total = self.player.calculate_total_time(self.recorded_actions, repeat_count,
+                                                 self.speed_slider.value() / 100.0,
+                                                 max_gap=max_gap, gap_mode=gap_mode,
+                                                 turbo=turbo, min_gap=min_gap)
+        total_time = str(timedelta(seconds=round(total)))
+        self.total_time_label.setText(self.translations['total_time'].format(time=total_time))
     
     def save_recording(self):
+        if self.recording or self.file_task is not None:
+            return
+        if self.playing and getattr(self.recorded_actions, 'path', None) is not None:
+            return # Кнопка недоступна, но Ctrl+S работает и без нее
         if not self.recorded_actions:
-            self.statusBar.showMessage(self.translations.get('status_no_actions', TRANSLATIONS['en']['status_no_actions']))
+            self.statusBar.showMessage(self.translations['status_no_actions'])
             return
         
         file_path, _ = QFileDialog.getSaveFileName(
-            self, self.translations.get('file_dialog_save', TRANSLATIONS['en']['file_dialog_save']), "", self.translations.get('file_dialog_filter', TRANSLATIONS['en']['file_dialog_filter'])
+            self, self.translations['file_dialog_save'], "", self.translations['file_dialog_filter']
         )
         
         if file_path:
-            try:
-                if not file_path.endswith('.clk'):
-                    file_path += '.clk'
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.recorded_actions, f)
-                
-                self.current_file_path = file_path
-                file_name = os.path.basename(file_path)
-                self.action_count.setText(f"{self.translations['file']} {file_name} ({len(self.recorded_actions)} {self.translations['actions_recorded']})")
-                self.statusBar.showMessage(f"{self.translations.get('status_saved', TRANSLATIONS['en']['status_saved'])} {file_path}")
-            except Exception as e:
-                self.statusBar.showMessage(f"{self.translations.get('save_error', TRANSLATIONS['en']['save_error'])} {str(e)}")
+            if not file_path.endswith('.clk'):
+                file_path += '.clk'
+            
+            # Запись сохраняется в фоне; пока идет сохранение, запись новых действий недоступна,
+            # поэтому буфер не меняется до конца задачи. Отображенный в память файл нельзя
+            # перезаписать (Windows): при сохранении поверх него рабочий поток копирует запись
+            # в память и отдает копию в on_file_task_copied
+            self.file_task = fileio.save(file_path, self.recorded_actions, compress=self.compress_recordings,
+                                         on_copied=self.file_signals.copied.emit,
+                                         **self._file_task_callbacks())
+            self.updateUIState()
     
     def load_recording(self):
+        if self.recording or self.file_task is not None:
+            return
         file_path, _ = QFileDialog.getOpenFileName(
-            self, self.translations.get('file_dialog_load', TRANSLATIONS['en']['file_dialog_load']), "", self.translations.get('file_dialog_filter', TRANSLATIONS['en']['file_dialog_filter'])
+            self, self.translations['file_dialog_load'], "", self.translations['file_dialog_filter']
         )
         
         if file_path:
-            # Загрузка происходит синхронно, интерфейс может подвиснуть на больших файлах
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    actions = json.load(f)
-                    if isinstance(actions, list): # Простая проверка, что это похоже на список действий
-                        self.recorded_actions = actions
-                        self.current_file_path = file_path
-                        print(f"[load_recording] Загружено действий: {len(self.recorded_actions)}")
-                        # Обновляем интерфейс ПОСЛЕ успешной загрузки
-                        self.updateUIState()
-                        # self.action_count.setText(...) # Обновится через update_status
-                        # self.statusBar.showMessage(...) # Обновится через update_status
-                    else:
-                         raise ValueError(self.translations.get('file_not_valid', TRANSLATIONS['en']['file_not_valid']))
-            except Exception as e:
-                QMessageBox.warning(self, self.translations['load_error'], self.translations.get('load_file_error', TRANSLATIONS['en']['load_file_error']).format(error=str(e)))
-                self.statusBar.showMessage(f"{self.translations.get('load_error', TRANSLATIONS['en']['load_error'])} {e}")
-                # Сбрасываем состояние, если загрузка не удалась
-                # self.recorded_actions = [] # Не очищаем, если была предыдущая запись
-                # self.current_file_path = None
+            # Файл читается в фоне, текущая запись остается доступной (и воспроизводимой)
+            # до тех пор, пока новая не загрузится целиком
+            self.file_task = fileio.load(file_path, **self._file_task_callbacks())
+            self.updateUIState()
+    
+    def check_journal_recovery(self):
+        """Предлагает восстановить запись, прерванную падением программы (остался журнал)"""
+        path = journal.journal_path(self.journal_dir)
+        if not os.path.exists(path) or self.recording or self.file_task is not None:
+            return
+        try:
+            count = journal.pending_count(path)
+        except OSError as e:
+            log.warning("check_journal_recovery: Не удалось прочитать журнал {}: {}", path, e)
+            return
+        if count:
+            reply = QMessageBox.question(self, self.translations['recover_title'],
+                                         self.translations['recover_question'].format(count=count),
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply == QMessageBox.Yes:
+                # Сборка идет в фоне, как загрузка файла (прогресс и отмена в статус-баре)
+                self.file_task = fileio.recover(path, journal.recording_path(self.journal_dir),
+                                                **self._file_task_callbacks())
                 self.updateUIState()
+                return
+        os.remove(path)
+        log.info("check_journal_recovery: Журнал прерванной записи удален: {}", path)
+    
+    def _file_task_callbacks(self):
+        return {
+            'on_done': self.file_signals.finished.emit,
+            'on_error': self.file_signals.failed.emit,
+            'on_cancelled': self.file_signals.cancelled.emit,
+            'on_progress': self.file_signals.progress.emit,
+        }
+    
+    def cancel_file_task(self):
+        """Отмена фоновой загрузки/сохранения (кнопка в статус-баре)"""
+        if self.file_task is not None:
+            log.info("cancel_file_task: Отмена: {} {}", self.file_task.kind, self.file_task.path)
+            self.file_task.cancel()
+            self.cancel_file_button.setEnabled(False) # Ждем, пока рабочий поток дойдет до границы порции
+    
+    def on_file_task_finished(self, task, result):
+        """Слот: фоновая операция завершена (в главном потоке)"""
+        if task is not self.file_task:
+            return
+        self.file_task = None
+        if task.kind != 'save':
+            # Новая запись подменяется одним присваиванием, старая закрывается,
+            # когда её перестанет читать воспроизведение
+            self._replace_recording(result)
+            # Восстановленная из журнала запись еще не сохранена пользователем
+            self.current_file_path = task.path if task.kind == 'load' else None
+            log.info("load_recording: Загружено действий: {}", len(self.recorded_actions))
+            # self.action_count.setText(...) # Обновится через update_status
+        else:
+            if fileio.same_file(getattr(self.recorded_actions, 'path', None), task.path):
+                # Запись читалась из того же файла блоками, а он теперь заменен новым
+                self._replace_recording(clkformat.load(task.path))
+            self.current_file_path = task.path
+            file_name = os.path.basename(task.path)
+            self.action_count.setText(f"{self.translations['file']} {file_name} ({len(self.recorded_actions)} {self.translations['actions_recorded']})")
+            self.statusBar.showMessage(f"{self.translations['status_saved']} {task.path}")
+        self.updateUIState()
+    
+    def on_file_task_copied(self, task, buffer):
+        """Слот: сохраняемая поверх себя запись скопирована в память - отображение можно отпустить"""
+        if task is self.file_task:
+            self._replace_recording(buffer)
+        task.release_source()
+
+    def on_file_task_progress(self, task):
+        """Слот: прогресс фоновой операции изменился"""
+        if task is self.file_task:
+            self.refresh_status('file')
+
+    def on_file_task_failed(self, task, error):
+        """Слот: фоновая операция завершилась ошибкой"""
+        if task is not self.file_task:
+            return
+        self.file_task = None
+        self.updateUIState()
+        if task.kind != 'save':
+            if isinstance(error, clkformat.FormatError):
+                error = self.translations['file_not_valid']
+            # Предыдущая запись не трогается
+            QMessageBox.warning(self, self.translations['load_error'], self.translations['load_file_error'].format(error=str(error)))
+            self.statusBar.showMessage(f"{self.translations['load_error']} {error}")
+        else:
+            self.statusBar.showMessage(f"{self.translations['save_error']} {str(error)}")
+    
+    def on_file_task_cancelled(self, task):
+        """Слот: фоновая операция отменена, текущая запись не изменилась"""
+        if task is not self.file_task:
+            return
+        self.file_task = None
+        self.updateUIState()
+        key = 'status_save_cancelled' if task.kind == 'save' else 'status_load_cancelled'
+        self.statusBar.showMessage(self.translations[key])
+    
+    def _replace_recording(self, actions):
+        """Подменяет текущую запись; старую закрывает, когда её перестанет читать плеер"""
+        previous = self.recorded_actions
+        self.recorded_actions = actions
+        if previous is not actions:
+            self._retired_actions.append(previous)
+        self._release_retired_actions()
+        self.update_total_time_preview()
+    
+    def _release_retired_actions(self):
+        """Закрывает замененные записи (отпускает mmap), если поток воспроизведения завершился"""
+        if self.player.is_running:
+            return
+        for actions in self._retired_actions:
+            actions.close()
+        self._retired_actions = []
     
     def show_help(self):
-        help_text = f"{self.translations.get('help_dialog_title', TRANSLATIONS['en']['help_dialog_title'])}\n\n{self.translations.get('help_text', TRANSLATIONS['en']['help_text'])}"
-        QMessageBox.information(self, self.translations.get('help_dialog_title', TRANSLATIONS['en']['help_dialog_title']), help_text)
+        help_text = f"{self.translations['help_dialog_title']}\n\n{self.translations['help_text']}"
+        QMessageBox.information(self, self.translations['help_dialog_title'], help_text)
 
     def updateUIState(self):
         """Обновляет состояние кнопок и настроек в зависимости от состояния приложения"""
         is_idle = not self.recording and not self.playing
         can_play = is_idle and bool(self.recorded_actions)
+        # Загрузка и сохранение идут в фоне и не мешают воспроизведению
+        file_busy = self.file_task is not None
         
         # Кнопки записи
-        self.record_button.setEnabled(is_idle)
+        self.record_button.setEnabled(is_idle and not file_busy)
         self.stop_record_button.setEnabled(self.recording)
         
         # Кнопки воспроизведения
@@ -1408,8 +1122,14 @@ class MainWindow(QMainWindow):
         self.repeat_button.setEnabled(True)
         
         # Кнопки сохранения/загрузки
-        self.save_button.setEnabled(is_idle and bool(self.recorded_actions))
-        self.load_button.setEnabled(is_idle)
+        # Запись, которая читается из файла, во время воспроизведения не сохраняется:
+        # сохранение поверх её файла подменило бы данные под идущим воспроизведением
+        file_backed_playing = self.playing and getattr(self.recorded_actions, 'path', None) is not None
+        self.save_button.setEnabled(not self.recording and not file_busy and bool(self.recorded_actions)
+                                    and not file_backed_playing)
+        self.load_button.setEnabled(not self.recording and not file_busy)
+        self.cancel_file_button.setVisible(file_busy)
+        self.cancel_file_button.setEnabled(file_busy)
         
         # Настройки - блокируем только интерактивные виджеты из списка
         for widget in self.settings_widgets:
@@ -1443,6 +1163,7 @@ class MainWindow(QMainWindow):
         # Дополнительная логика для чекбокса и счетчика повторов
         # Чекбокс "Бесконечные" активен только если выбран режим "Run every"
         self.infinite_repeat_checkbox.setEnabled(is_idle and self.interval_radio.isChecked())
+        self.overlap_combo.setEnabled(is_idle and self.interval_radio.isChecked())
         # Если чекбокс не активен, снимаем галку
         if not self.infinite_repeat_checkbox.isEnabled():
             self.infinite_repeat_checkbox.setChecked(False)
@@ -1457,47 +1178,95 @@ class MainWindow(QMainWindow):
         )
         self.repeat_count.setEnabled(repeats_enabled)
         self.repeat_label.setEnabled(repeats_enabled) # Также активируем/деактивируем метку
+        
+        # В турбо-режиме скорость и паузы из записи не учитываются
+        turbo = self.turbo_checkbox.isChecked()
+        self.speed_slider.setEnabled(is_idle and not turbo)
+        self.gap_mode_combo.setEnabled(is_idle and not turbo)
+        # Длина паузы нужна только в режимах "сократить" и "удалить"
+        self.max_gap_value.setEnabled(is_idle and not turbo and self.gap_mode_combo.currentData() != GAP_KEEP)
+        self.update_total_time_preview()
+        self.refresh_status('state')
+
+    def file_task_message(self):
+        """Текст прогресса фоновой загрузки/сохранения для строки состояния"""
+        task = self.file_task
+        key = 'status_saving' if task.kind == 'save' else 'status_loading'
+        return self.translations[key].format(file=os.path.basename(task.path), progress=task.progress.percent())
+
+    def schedule_stats_message(self):
+        """Запуски последней серии по расписанию: стартовало, отброшено, слито, задержка старта"""
+        job = self.last_ui_job
+        return self.translations['status_schedule_stats'].format(
+            started=job.stats['started'], dropped=job.stats['dropped'], coalesced=job.stats['coalesced'],
+            pending=self.scheduler.pending(UI_JOB), mean=job.mean_delay * 1000, max=job.stats['delay_max'] * 1000)
+
+    def refresh_status(self, source):
+        """Обновляет строку состояния по уведомлению источника (учитывается в диагностике)"""
+        self.wakeups['status:' + source] += 1
+        self.update_status()
 
     def update_status(self):
         """Обновляет строку состояния и счетчик действий"""
         if self.recording:
-            self.statusBar.showMessage(f"{self.translations['recording']} ({len(self.recorded_actions)})")
+            count = self.recorder.action_count() # Большая часть записи уже в журнале, а не в памяти
+            self.statusBar.showMessage(f"{self.translations['recording']} ({count})")
             # Обновляем счетчик действий только во время записи
-            self.action_count.setText(f"{self.translations['actions_recorded']} {len(self.recorded_actions)}")
+            self.action_count.setText(f"{self.translations['actions_recorded']} {count}")
         elif self.playing:
-            current_time = self.player.get_current_playback_time()
-            total_time = self.player.get_total_playback_time()
+            # Последний прогресс читается из канала плеера напрямую, без сигналов на каждое событие
+            _current_time, total_time = self.player.progress.snapshot()
             if total_time > 0:
-                 progress = int((current_time / total_time) * 100)
-                 self.statusBar.showMessage(f"{self.translations['playing']} ({progress}%)")
+                 progress = self.player.progress.percent()
+                 message = f"{self.translations['playing']} ({progress}%)"
             else:
-                 self.statusBar.showMessage(self.translations['playing'])
+                 message = self.translations['playing']
+            if self.last_ui_job is not None and self.last_ui_job.kind == KIND_INTERVAL:
+                 message += f" | {self.schedule_stats_message()}"
+            if self.file_task is not None:
+                 message += f" | {self.file_task_message()}"
+            self.statusBar.showMessage(message)
+        elif self.file_task is not None:
+            self.statusBar.showMessage(self.file_task_message())
         else:
-            self.statusBar.showMessage("") # <--- Убрано 'Ready'
+            if self.last_ui_job is not None and self.last_ui_job.stats['fired']:
+                self.statusBar.showMessage(self.schedule_stats_message())
+            elif self.turbo_rate:
+                self.statusBar.showMessage(self.translations['status_turbo_rate'].format(rate=self.turbo_rate))
+            else:
+                self.statusBar.showMessage("") # <--- Убрано 'Ready'
             # Обновляем счетчик действий, если не записываем и не воспроизводим
             file_info = f" ({os.path.basename(self.current_file_path)})" if self.current_file_path else ""
+            ratio = self.recorder.compression_ratio()
+            if ratio and self.recorded_actions is self.recorder.actions:
+                compression = self.translations['status_compression']
+                file_info += f", {compression.format(ratio=ratio)}"
             self.action_count.setText(f"{self.translations['actions_recorded']} {len(self.recorded_actions)}{file_info}")
 
     def closeEvent(self, event):
         self.save_settings() # Сохраняем настройки перед выходом
-        self.gui_update_timer.stop()
-        if self.is_recording:
+        if self.recording:
             self.stop_recording()
-        reply = QMessageBox.question(self, self.translations.get('exit', TRANSLATIONS['en']['exit']), self.translations.get('close_confirm', TRANSLATIONS['en']['close_confirm']), QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        reply = QMessageBox.question(self, self.translations['exit'], self.translations['close_confirm'], QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            # Загрузку прерываем, а сохранение дописывается: рабочий поток завершится до выхода
+            if self.file_task is not None and self.file_task.kind == 'load':
+                self.file_task.cancel()
             event.accept()
         else:
             event.ignore()
 
     def set_language(self, lang_code):
-        if lang_code in TRANSLATIONS:
+        if lang_code == self.current_language:
+            return # Тексты уже на этом языке, обходить виджеты незачем
+        if lang_code in LANGUAGES:
             self.current_language = lang_code
-            self.translations = TRANSLATIONS[self.current_language]
+            self.translations = i18n.load(self.current_language)
             # Обновляем тексты и сохраняем настройки ПОСЛЕ установки языка
             self.updateUITexts()
             self.save_settings() # Сохраняем язык после смены
         else:
-            print(f"Warning: Language code \'{lang_code}\' not found in TRANSLATIONS.")
+            log.warning("Language code '{}' not found in LANGUAGES.", lang_code)
 
     def updateUITexts(self):
         """Обновляет тексты всех виджетов в соответствии с текущим языком"""
@@ -1510,22 +1279,83 @@ class MainWindow(QMainWindow):
         self.save_button.setText(self.translations['save'])
         self.load_button.setText(self.translations['load'])
         self.help_button.setText(self.translations['help'])
+        self.cancel_file_button.setText(self.translations['cancel'])
         self.action_count.setText(f"{self.translations['actions_recorded']} {len(self.recorded_actions)}")
         self.repeat_label.setText(self.translations['repeat_count'])
         self.schedule_label.setText(self.translations['schedule'])
         self.once_radio.setText(self.translations['once'])
         self.interval_radio.setText(self.translations['interval'])
         self.interval_label.setText(self.translations['seconds']) # <-- Обновлено на seconds
+        for index, policy in enumerate(OVERLAP_KEYS):
+            self.overlap_combo.setItemText(index, self.translations[OVERLAP_KEYS[policy]])
         self.time_radio.setText(self.translations['at_time'])
         self.speed_label.setText(self.translations['speed'])
+        self.turbo_checkbox.setText(self.translations['turbo'])
+        self.gap_label.setText(self.translations['pauses'])
+        for index, mode in enumerate(GAP_MODE_KEYS):
+            self.gap_mode_combo.setItemText(index, self.translations[GAP_MODE_KEYS[mode]])
+        self.gap_seconds_label.setText(self.translations['seconds'])
+        self.update_total_time_preview()
         # Обновляем строку состояния, если она не показывает прогресс
         if self.playing:
             self.statusBar.showMessage(f"{self.translations['playing']} ({self.player.get_current_playback_time() // 1000} сек / {self.player.get_total_playback_time() // 1000} сек)")
         else:
             self.statusBar.showMessage("")
         # Обновляем текст чекбокса
-        self.infinite_repeat_checkbox.setText(self.translations.get('infinite_repeats', 'Infinite Repeats'))
+        self.infinite_repeat_checkbox.setText(self.translations['infinite_repeats'])
     
+    def diagnostics_text(self):
+        """Текст окна диагностики: пробуждения таймеров, журнал, обновления строки состояния, задания расписания"""
+        t = self.translations
+        uptime = time.monotonic() - self.started_at
+        timer_wakeups = sum(count for key, count in self.wakeups.items() if key.startswith('timer:'))
+        lines = [t['diag_uptime'].format(time=str(timedelta(seconds=round(uptime)))),
+                 t['diag_timer_wakeups'].format(count=timer_wakeups, per_minute=timer_wakeups * 60 / max(uptime, 1))]
+        if self.last_timer_wakeup is not None:
+            lines.append(t['diag_last_wakeup'].format(seconds=time.monotonic() - self.last_timer_wakeup))
+        delay = self.scheduler.next_wakeup()
+        lines.append(t['diag_next_wakeup'].format(seconds=delay) if delay is not None else t['diag_no_wakeup'])
+        report = self.player.player.report
+        if report is not None and report['lateness']['count']:
+            lateness = report['lateness']
+            lines.append(t['diag_last_run'].format(p50=lateness['p50_ms'], p99=lateness['p99_ms'],
+                                                   max=lateness['max_ms'], overruns=report['overruns']))
+        lines.append(t['diag_log'].format(level=self.log_level, written=applog.writer.written,
+                                          dropped=applog.writer.dropped, wakeups=applog.writer.wakeups))
+        lines.append(t['diag_status_updates'])
+        for key, count in sorted(self.wakeups.items()):
+            if key.startswith('status:'):
+                lines.append(f"  {key[len('status:'):]}: {count}")
+        lines.append(t['diag_jobs'].format(count=len(self.scheduler.jobs), pending=self.scheduler.pending()))
+        for job in self.scheduler.jobs.values():
+            stats = job.stats
+            lines.append(f"  {job.job_id} ({job.kind}): " + t['diag_job_stats'].format(
+                started=stats['started'], dropped=stats['dropped'], coalesced=stats['coalesced'],
+                missed=stats['missed'], error=job.mean_error * 1000, delay=job.mean_delay * 1000,
+                delay_max=stats['delay_max'] * 1000))
+        return "\n".join(lines)
+
+    def show_diagnostics(self):
+        """Окно диагностики; обновляется кнопкой, а не таймером, чтобы само не будило приложение"""
+        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QPlainTextEdit
+        dialog = QDialog(self)
+        dialog.setWindowTitle(self.translations['diag_title'])
+        layout = QVBoxLayout(dialog)
+        text = QPlainTextEdit(self.diagnostics_text())
+        text.setReadOnly(True)
+        text.setMinimumSize(480, 240)
+        layout.addWidget(text)
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton(self.translations['diag_refresh'])
+        refresh_button.clicked.connect(lambda: text.setPlainText(self.diagnostics_text()))
+        close_button = QPushButton(self.translations['dialog_ok'])
+        close_button.clicked.connect(dialog.accept)
+        buttons.addStretch()
+        buttons.addWidget(refresh_button)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+        dialog.exec_()
+
     def show_language_dialog(self):
         from PyQt5.QtWidgets import QDialog, QVBoxLayout, QComboBox, QPushButton, QLabel
         dialog = QDialog(self)
@@ -1551,7 +1381,7 @@ class MainWindow(QMainWindow):
     # --- Сохранение/Загрузка Настроек --- 
     
     @property
-    def config_file(self):
+    def app_dir(self):
         # Определяем базовый путь в зависимости от того, запущено ли как скрипт или .exe
         if getattr(sys, 'frozen', False):
             # Запущено как .exe (PyInstaller)
@@ -1563,50 +1393,132 @@ class MainWindow(QMainWindow):
             except NameError:
                  # Резервный вариант для интерактивных сессий
                  base_path = os.getcwd()
-        return os.path.join(base_path, "config.json")
+        return base_path
+
+    @property
+    def config_file(self):
+        return os.path.join(self.app_dir, "config.json")
+
+    @property
+    def journal_dir(self):
+        return os.path.join(self.app_dir, "journal")
+
+    @property
+    def report_dir(self):
+        return os.path.join(self.app_dir, "reports")
+
+    @property
+    def log_file(self):
+        return os.path.join(self.app_dir, "clickerrecord.log")
+
+    @property
+    def schedule_file(self):
+        return os.path.join(self.app_dir, "schedule.json")
 
     def save_settings(self):
         settings = {
-            'language': self.current_language # Убеждаемся, что используется правильная переменная
+            'language': self.current_language, # Убеждаемся, что используется правильная переменная
+            'move_tolerance_px': self.move_tolerance_px,
+            'move_tolerance_s': self.move_tolerance_s,
+            'compress_recordings': self.compress_recordings,
+            'gap_mode': self.gap_mode_combo.currentData(),
+            'max_gap': self.max_gap_value.value(),
+            'turbo': self.turbo_checkbox.isChecked(),
+            'turbo_min_gap': self.turbo_min_gap,
+            'turbo_drain': self.turbo_drain,
+            'overlap': self.overlap_combo.currentData(),
+            'overlap_queue_depth': self.overlap_queue_depth,
+            'log_level': self.log_level,
         }
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, indent=4)
         except IOError as e:
-            print(f"Error saving settings to {self.config_file}: {e}")
+            log.error("Error saving settings to {}: {}", self.config_file, e)
 
     def load_settings(self):
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     settings = json.load(f)
+                    # Настройки упрощения применяем до языка: set_language сразу сохраняет конфиг
+                    try:
+                        self.move_tolerance_px = max(0.0, float(settings.get('move_tolerance_px', 0)))
+                        self.move_tolerance_s = max(0.0, float(settings.get('move_tolerance_s', 0.05)))
+                    except (TypeError, ValueError):
+                        log.warning("Invalid move tolerance in {}, simplification disabled.", self.config_file)
+                        self.move_tolerance_px = 0
+                    self.recorder.move_tolerance_px = self.move_tolerance_px
+                    self.recorder.move_tolerance_s = self.move_tolerance_s
+                    self.compress_recordings = bool(settings.get('compress_recordings', False))
+                    gap_index = self.gap_mode_combo.findData(settings.get('gap_mode', GAP_KEEP))
+                    if gap_index >= 0:
+                        self.gap_mode_combo.setCurrentIndex(gap_index)
+                    try:
+                        self.max_gap_value.setValue(float(settings.get('max_gap', 1.0)))
+                    except (TypeError, ValueError):
+                        log.warning("Invalid max_gap in {}, using default.", self.config_file)
+                    try:
+                        self.turbo_min_gap = max(0.0, float(settings.get('turbo_min_gap', 0.0)))
+                    except (TypeError, ValueError):
+                        log.warning("Invalid turbo_min_gap in {}, using 0.", self.config_file)
+                        self.turbo_min_gap = 0.0
+                    self.turbo_drain = bool(settings.get('turbo_drain', False))
+                    overlap_index = self.overlap_combo.findData(settings.get('overlap', OVERLAP_SKIP))
+                    if overlap_index >= 0:
+                        self.overlap_combo.setCurrentIndex(overlap_index)
+                    try:
+                        self.overlap_queue_depth = max(1, int(settings.get('overlap_queue_depth', DEFAULT_QUEUE_DEPTH)))
+                    except (TypeError, ValueError):
+                        log.warning("Invalid overlap_queue_depth in {}, using default.", self.config_file)
+                        self.overlap_queue_depth = DEFAULT_QUEUE_DEPTH
+                    log_level = str(settings.get('log_level', 'info')).lower()
+                    if log_level in applog.LEVELS:
+                        self.log_level = log_level
+                        applog.configure(level=log_level)
+                    else:
+                        log.warning("Invalid log_level in {}, using info.", self.config_file)
+                    self.turbo_checkbox.setChecked(bool(settings.get('turbo', False)))
                     lang_code = settings.get('language')
                     if lang_code and lang_code in LANGUAGES:
                         # Просто применяем язык из файла, если он валидный
                         self.set_language(lang_code) 
                     else:
-                         print(f"Warning: Invalid or missing language code in {self.config_file}, using default.")
+                         log.warning("Invalid or missing language code in {}, using default.", self.config_file)
 
             except (IOError, json.JSONDecodeError) as e:
-                print(f"Error loading settings from {self.config_file}: {e}, using default.")
+                log.error("Error loading settings from {}: {}, using default.", self.config_file, e)
         # Если файла нет или он некорректный, остается английский (установлен в __init__)
 
 def main():
-    app = QApplication(sys.argv)
+    # --profile-startup: напечатать время запуска по фазам и выйти после первого прохода цикла событий
+    profile_startup = '--profile-startup' in sys.argv
+    argv = [arg for arg in sys.argv if arg != '--profile-startup']
+    
+    app = QApplication(argv)
     app.setStyle('Fusion')  # Современный стиль интерфейса
     
     # Ускорение загрузки за счет отложенной инициализации
     app.setQuitOnLastWindowClosed(True)
+    STARTUP.mark("QApplication")
     
     # Создаем MainWindow
     window = MainWindow()
     
-    # Хотя плеер наследуется от QObject, его можно переместить в главный поток 
-    # для более явного управления жизненным циклом (опционально, но иногда помогает)
-    # window.player.moveToThread(app.thread()) 
-    
     window.show()
+    STARTUP.mark("window.show")
+    
+    if profile_startup:
+        def report_startup():
+            STARTUP.mark("first event loop")
+            print(STARTUP.report())
+            # Закрываем без диалога подтверждения closeEvent
+            app.exit(0)
+        QTimer.singleShot(0, report_startup)
+    else:
+        # Окно уже видно: вопрос о восстановлении прерванной записи не задерживает запуск
+        QTimer.singleShot(0, window.check_journal_recovery)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,293 +1,419 @@
+import itertools
+import os
 import time
 import threading
-import ctypes
-import win32api
-import win32con
-from pynput.keyboard import Key, Controller as KeyboardController
-from pynput.mouse import Button, Controller as MouseController
-# Импортируем необходимые компоненты Qt для сигналов
-from PyQt5.QtCore import QObject, pyqtSignal
+import applog
+import latency
+from backends import create_backend
+from timing import HybridTimer
+from actions import ActionBuffer
+from program import CompiledRecording
+from timeline import GAP_CAP, check_gap, first_timestamp, gap_profile
+from progress import ProgressChannel
 
-# Класс Player теперь наследует QObject для поддержки сигналов
-class Player(QObject):
-    # Определяем сигналы
-    playbackFinished = pyqtSignal()
-    playbackError = pyqtSignal(str)
-    # Сигнал для обновления прогресса (опционально, но полезно)
-    playbackProgress = pyqtSignal(int, int) # current_time, total_time
+# Турбо-режим: записанные паузы не учитываются
+TURBO_GAP = 'gap'     # темп задает только минимальный шаг между событиями
+TURBO_DRAIN = 'drain' # после каждой пачки - ожидание, пока получатель обработает ввод
+TURBO_MODES = (TURBO_GAP, TURBO_DRAIN)
 
-    def __init__(self):
-        # Важно вызвать конструктор родительского класса QObject
-        super().__init__() 
+# Сколько ждать обработки одной пачки в режиме TURBO_DRAIN, секунд
+DRAIN_TIMEOUT = 1.0
+
+log = applog.get_logger('Player')
+
+class Player:
+    """
+    Воспроизведение записей в отдельном потоке, без зависимости от Qt.
+
+    Обратная связь - через необязательные функции обратного вызова,
+    которые вызываются из потока воспроизведения:
+
+        on_finished()                    - воспроизведение завершено (не остановлено)
+        on_error(message)                - воспроизведение прервано ошибкой
+        on_progress(current_ms, total_ms) - прогресс (с прореживанием, см. progress.py)
+
+    Для GUI сигналы Qt поверх этих функций дает qtplayer.QtPlayer.
+    """
+
+    def __init__(self, backend=None, timer=None, batch_window=0.0005, max_batch=64,
+                 on_finished=None, on_error=None, on_progress=None, report_dir=None):
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.on_progress = on_progress
         
-        self.mouse = MouseController()
-        self.keyboard = KeyboardController()
+        # Бэкенд ввода (см. backends.py): по умолчанию pynput, для тестов - CaptureBackend.
+        # Бэкенд по умолчанию создается при первом воспроизведении, чтобы не грузить pynput при запуске GUI
+        self.backend = backend
         self.play_thread = None
         self.is_playing = False
         self.total_time = 0
         self.current_time = 0
+        # Счетчики воспроизведения: late - события, опоздавшие сильнее окна упорядочивания;
+        # batches/batched_events/max_batch - пачки, отправленные в бэкенд;
+        # skipped - клавиши, которые бэкенд не может воспроизвести;
+        # overruns - пачки, срок которых прошел раньше, чем цикл до них дошел
+        self.stats = {}
+        # Отчет о последнем прогоне (latency.run_report); при report_dir он еще и пишется в файл
+        self.report = None
+        self.report_dir = report_dir
+        self._histograms = None
+        # Стратегия ожидания (см. timing.py) и событие, которое будит её при остановке
+        self.timer = timer or HybridTimer()
+        self._stop_event = threading.Event()
+        # Проверка is_playing и его установка в play() - одно действие: два запуска подряд
+        # (политики перекрытия расписания, batch) не должны оба пройти проверку
+        self._play_lock = threading.Lock()
+        # События ближе batch_window секунд друг к другу уходят в бэкенд одной пачкой (None - по одному)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # Прогресс публикуется на каждую пачку, а on_progress вызывается не чаще 20 раз в секунду
+        self.progress = ProgressChannel(notify=self._emit_progress)
+        self._first_start = 0.0
+        self._drain = False
     
-    def play(self, actions, repeat_count=1, speed_factor=1.0): # Убираем on_complete и on_error
+    def play(self, actions, repeat_count=1, speed_factor=1.0, start=None, end=None, loop=False,
+             max_gap=None, gap_mode=GAP_CAP, turbo=None, min_gap=0.0): # Убираем on_complete и on_error
         """
         Воспроизводит записанные действия.
-        Использует сигналы playbackFinished и playbackError для обратной связи.
+        Использует on_finished и on_error для обратной связи.
         
-        :param actions: Список записанных действий
+        :param actions: Источник строк (ActionBuffer, MappedActions, StreamedActions)
+                        или список словарей старого формата
         :param repeat_count: Количество повторений
         :param speed_factor: Коэффициент скорости воспроизведения
+        :param start: Начало фрагмента в секундах записи (None - с начала)
+        :param end: Конец фрагмента в секундах записи (None - до конца)
+        :param loop: Повторять фрагмент до остановки (repeat_count не учитывается)
+        :param max_gap: Паузы длиннее max_gap секунд записи сокращаются (None - как записано)
+        :param gap_mode: 'cap' - сократить до max_gap, 'remove' - удалить целиком (см. timeline.py)
+        :param turbo: Турбо-режим (записанные паузы и speed_factor не учитываются):
+                      'gap' - события с шагом min_gap, 'drain' - еще и ожидание обработки
+                      каждой пачки получателем (InputBackend.wait_idle); None - по записи
+        :param min_gap: Минимальный шаг между событиями в турбо-режиме, секунд
+        :return: True - поток воспроизведения запущен, False - воспроизведение уже идет
         """
-        if self.is_playing:
-            print("[Player] Воспроизведение уже идет.")
-            return
-            
-        print("[Player] Запуск потока воспроизведения...")
-        # Запуск воспроизведения в отдельном потоке
-        self.play_thread = threading.Thread(
-            target=self._play_thread,
-            args=(actions, repeat_count, speed_factor)
-        )
-        self.play_thread.daemon = True # Поток завершится, если основной поток завершится
-        self.play_thread.start()
+        if start is not None and start < 0:
+            raise ValueError("Начало фрагмента не может быть отрицательным")
+        if start is not None and end is not None and end < start:
+            raise ValueError("Конец фрагмента раньше начала")
+        check_gap(max_gap, gap_mode)
+        if turbo is not None and turbo not in TURBO_MODES:
+            raise ValueError(f"Неизвестный турбо-режим: {turbo}")
+        if min_gap < 0:
+            raise ValueError("Минимальный шаг не может быть отрицательным")
+        with self._play_lock:
+            if self.is_playing:
+                log.warning("Воспроизведение уже идет.")
+                return False
+            # Флаг ставится до старта потока: stop(), вызванный раньше, чем поток
+            # начал работу, сбросит его, и поток сразу завершится
+            self.is_playing = True
+            log.info("Запуск потока воспроизведения...")
+            self._stop_event.clear()
+            # Запуск воспроизведения в отдельном потоке
+            self.play_thread = threading.Thread(
+                target=self._play_thread,
+                args=(actions, repeat_count, speed_factor, start, end, loop, max_gap, gap_mode, turbo, min_gap)
+            )
+            self.play_thread.daemon = True # Поток завершится, если основной поток завершится
+            try:
+                self.play_thread.start()
+            except RuntimeError:
+                self.is_playing = False
+                raise
+        return True
     
-    def _play_thread(self, actions, repeat_count, speed_factor):
-        """Внутренний метод для воспроизведения в отдельном потоке"""
-        self.is_playing = True
+    def _play_thread(self, actions, repeat_count, speed_factor, start=None, end=None, loop=False,
+                     max_gap=None, gap_mode=GAP_CAP, turbo=None, min_gap=0.0):
+        """Внутренний метод для воспроизведения в отдельном потоке (is_playing уже установлен в play)"""
         self.current_time = 0
-        self.total_time = self._calculate_total_time(actions, repeat_count, speed_factor)
+        self.stats = {}
+        self._first_start = 0.0
+        self._drain = turbo == TURBO_DRAIN
+        # Опоздание действий по типам; в турбо-режиме расписания нет - и мерить нечего
+        self._histograms = latency.kind_histograms() if turbo is None else None
+        self.report = None
         error_message = None
+        played_from = None
+        if turbo is not None:
+            speed_factor = 1.0 # Шаг задан в секундах воспроизведения
         
         try:
-            print("[Player] Начало цикла повторений.")
-            for repeat_idx in range(repeat_count):
-                print(f"[Player] Повторение {repeat_idx + 1}/{repeat_count}")
+            # Список словарей конвертируется в колонки один раз, а не на каждом повторе
+            actions = ActionBuffer.coerce(actions)
+            if self.backend is None:
+                self.backend = create_backend()
+            # В режиме цикла прогресс показывает положение внутри одного прохода фрагмента
+            self.total_time = self._calculate_total_time(actions, 1 if loop else repeat_count,
+                                                         speed_factor, start, end, max_gap, gap_mode,
+                                                         turbo, min_gap)
+            self.progress.reset(self.total_time)
+            # Компилируем запись один раз: коды операций, разрешенные клавиши и смещения
+            compiled = CompiledRecording(actions, self.backend, speed_factor,
+                                         self.batch_window, self.max_batch, stats=self.stats,
+                                         start=start, end=end, max_gap=max_gap, gap_mode=gap_mode,
+                                         turbo_gap=min_gap if turbo is not None else None)
+            self.timer.start()
+            # Повторения привязаны к расписанию, а не к моменту окончания предыдущего:
+            # задержки одного повторения не накапливаются в следующих
+            run_start = time.perf_counter()
+            self._first_start = played_from = run_start
+            log.debug("Начало цикла повторений.")
+            repeats = itertools.count() if loop else range(repeat_count)
+            for repeat_idx in repeats:
+                log.debug("Повторение {}/{}", repeat_idx + 1, '∞' if loop else repeat_count)
+                if loop:
+                    # Каждый проход цикла - заново от нуля на шкале прогресса
+                    self._first_start = run_start
                 # Проверяем, не была ли запрошена остановка воспроизведения
                 if not self.is_playing:
-                    print("[Player] Остановка обнаружена в начале повторения.")
+                    log.debug("Остановка обнаружена в начале повторения.")
                     break
                     
                 # Воспроизводим действия для текущего повторения
-                self._replay_actions(actions, speed_factor)
+                run_end = self._replay_actions(compiled, run_start)
                 
                 # Небольшая пауза между повторениями (только если не последний и не остановлено)
-                if repeat_idx < repeat_count - 1 and self.is_playing:
+                if (loop or repeat_idx < repeat_count - 1) and self.is_playing:
                     pause_duration = 0.5 / speed_factor
-                    print(f"[Player] Пауза между повторениями: {pause_duration:.2f} сек.")
-                    remaining_pause = pause_duration
-                    while remaining_pause > 0 and self.is_playing:
-                         sleep_time = min(0.1, remaining_pause)
-                         time.sleep(sleep_time)
-                         remaining_pause -= sleep_time
+                    log.debug("Пауза между повторениями: {:.2f} сек.", pause_duration)
+                    run_start = run_end + pause_duration
+                    self._stop_event.wait(max(0, run_start - time.perf_counter()))
         except Exception as e:
             error_message = f"Ошибка при воспроизведении: {str(e)}"
-            print(f"[Player] {error_message}")
+            log.error("{}", error_message)
         finally:
-            print("[Player] Завершение потока воспроизведения.")
-            was_playing = self.is_playing # Запоминаем, был ли флаг установлен до сброса
-            self.is_playing = False
+            log.info("Завершение потока воспроизведения.")
+            self.timer.stop()
+            self.stats['progress_signals'] = self.progress.notified
+            self.stats['progress_avoided'] = self.progress.avoided
+            log.debug("Сигналов прогресса: {}, прорежено: {}", self.progress.notified, self.progress.avoided)
+            events = self.stats.get('batched_events', 0)
+            if played_from is not None and events:
+                self.stats['events_per_second'] = events / max(time.perf_counter() - played_from, 1e-9)
+                if turbo is not None:
+                    log.info("Турбо ({}): {} событий, {:.0f} событий/с", turbo, events,
+                             self.stats['events_per_second'])
+            if played_from is not None:
+                status = 'error' if error_message else ('finished' if self.is_playing else 'stopped')
+                self._finish_report(actions, time.perf_counter() - played_from, status,
+                                    repeat_count=repeat_count, speed_factor=speed_factor, start=start,
+                                    end=end, loop=loop, max_gap=max_gap, gap_mode=gap_mode, turbo=turbo)
+            with self._play_lock:
+                # После stop() мог начаться новый запуск: его флаг этот поток не трогает
+                current = self.play_thread is threading.current_thread()
+                was_playing = self.is_playing and current # Запоминаем, был ли флаг установлен до сброса
+                if current:
+                    self.is_playing = False
             self.current_time = 0 # Сбрасываем время
             self.total_time = 0
             
-            # Испускаем сигналы из основного потока GUI (более безопасный способ будет в main.py)
-            # Здесь мы просто вызываем их, т.к. прямое испускание из другого потока может быть небезопасно в некоторых случаях
-            # Фактическая обработка должна быть в главном потоке через Qt.QueuedConnection
+            # Функции обратного вызова выполняются в потоке воспроизведения;
+            # GUI получает их через сигналы Qt с Qt.QueuedConnection (qtplayer.py)
             if error_message:
-                print(f"[Player] Испускаем сигнал playbackError: {error_message}")
-                try:
-                     self.playbackError.emit(error_message)
-                except Exception as emit_e:
-                     print(f"[Player] Ошибка при emit playbackError: {emit_e}")
+                log.debug("Вызываем on_error: {}", error_message)
+                self._call(self.on_error, error_message)
             elif was_playing: # Если не было ошибки и воспроизведение не было прервано ДО вызова play
-                print("[Player] Испускаем сигнал playbackFinished.")
-                try:
-                     self.playbackFinished.emit()
-                except Exception as emit_e:
-                     print(f"[Player] Ошибка при emit playbackFinished: {emit_e}")
+                log.debug("Вызываем on_finished.")
+                self._call(self.on_finished)
             else:
-                 print("[Player] Воспроизведение было остановлено до завершения, сигнал Finished не испускается.")
+                 log.info("Воспроизведение было остановлено до завершения, on_finished не вызывается.")
+
+    def _finish_report(self, actions, duration, status, **details):
+        """Собирает отчет о прогоне и, если задан report_dir, пишет его в файл"""
+        histograms = self._histograms or latency.kind_histograms()
+        self.report = latency.run_report(histograms, self.stats.get('batched_events', 0), duration,
+                                         self.stats.get('overruns', 0), status=status,
+                                         recording=getattr(actions, 'path', None), **details)
+        lateness = self.report['lateness']
+        if lateness['count']:
+            log.info("Опоздание действий: p50 {} мс, p99 {} мс, макс. {} мс, перегрузок: {}",
+                     lateness['p50_ms'], lateness['p99_ms'], lateness['max_ms'], self.report['overruns'])
+        if self.report_dir:
+            try:
+                path = latency.report_path(self.report_dir)
+                latency.write_report(path, self.report)
+                log.info("Отчет о прогоне: {}", os.path.basename(path))
+            except OSError as e:
+                log.warning("Не удалось записать отчет о прогоне: {}", e)
+
+    def _call(self, callback, *args):
+        """Вызывает функцию обратного вызова, не давая её ошибке уронить поток воспроизведения"""
+        if callback is None:
+            return
+        try:
+             callback(*args)
+        except Exception as callback_e:
+             log.error("Ошибка в функции обратного вызова {}: {}", callback, callback_e)
 
-    def _calculate_total_time(self, actions, repeat_count, speed_factor):
-         """Примерный расчет общего времени воспроизведения (без пауз между повторениями)"""
+    def _calculate_total_time(self, actions, repeat_count, speed_factor, start=None, end=None,
+                              max_gap=None, gap_mode=GAP_CAP, turbo=None, min_gap=0.0):
+         """
+         Примерный расчет общего времени воспроизведения (с паузами между повторениями).
+
+         С ограничением пауз длительность берется из timeline.GapProfile:
+         первый расчет проходит метки времени записи, следующие (другой
+         max_gap, режим или число повторов) - двоичный поиск по готовому профилю.
+         В турбо-режиме записанные паузы не важны: считается шаг min_gap на событие.
+         """
          if not actions or speed_factor <= 0:
               return 0
-         last_action_time = max(a['timestamp'] for a in actions) if actions else 0
-         single_run_time = last_action_time / speed_factor
-         # Упрощенный расчет, можно добавить паузы между повторениями, если нужно точнее
-         total_time = single_run_time * repeat_count
+         if turbo is not None:
+              # Без записанных пауз известен только нижний предел: шаг на каждое событие
+              single_run_time = len(actions) * min_gap
+              return single_run_time * repeat_count + 0.5 * max(0, repeat_count - 1)
+         if max_gap is not None:
+              single_run_time = gap_profile(actions, start, end).duration(max_gap, gap_mode) / speed_factor
+         else:
+              # Отсчет от первой строки фрагмента, как у GapProfile и при воспроизведении
+              last_action_time = actions.max_timestamp if end is None else min(end, actions.max_timestamp)
+              single_run_time = max(0, last_action_time - first_timestamp(actions, start)) / speed_factor
+         total_time = single_run_time * repeat_count + 0.5 / speed_factor * max(0, repeat_count - 1)
          return total_time
 
-    def _replay_actions(self, actions, speed_factor):
-        """Воспроизведение списка действий с заданной скоростью"""
-        if not actions:
-            return
-            
-        # Сортировка действий по времени (важно)
-        try:
-             sorted_actions = sorted(actions, key=lambda x: x.get('timestamp', 0))
-        except Exception as sort_e:
-             print(f"[Player] Ошибка сортировки действий: {sort_e}")
-             raise ValueError(f"Ошибка в данных действий: {sort_e}")
-             
-        start_time = time.perf_counter() # Используем более точный таймер
-        base_timestamp = sorted_actions[0]['timestamp'] # Время первого действия
+    def _replay_actions(self, compiled, start_time=None):
+        """
+        Воспроизведение скомпилированной записи (program.CompiledRecording).
+
+        Запись уже переведена в пачки готовых операций с заранее посчитанными
+        смещениями, поэтому цикл только ждет начала пачки и отдает её
+        в бэкенд одним вызовом send_batch. Если воспроизведение отстает,
+        следующие уже просроченные пачки отправляются вместе с текущей
+        (не больше max_batch операций).
+
+        В турбо-режиме TURBO_DRAIN после каждой пачки цикл ждет, пока
+        получатель обработает ввод, и сдвигает расписание на время ожидания:
+        следующая пачка идет через min_gap после подтверждения, а не сразу
+        пачкой "догоняющих".
+
+        :param start_time: Запланированный момент начала (perf_counter), по умолчанию - сейчас
+        :return: Запланированный момент последнего действия
+        """
+        if start_time is None:
+            start_time = time.perf_counter() # Используем более точный таймер
+        perf_counter = time.perf_counter
+        wait_until = self.timer.wait_until
+        stop_event = self._stop_event
+        max_batch = self.max_batch
+        publish = self.progress.publish
+        drain = self._drain
+        # None в турбо-режиме; иначе record гистограммы по коду типа действия
+        records = [histogram.record for histogram in self._histograms] if self._histograms else None
+        overrun_margin = latency.OVERRUN_MARGIN
+        overruns = 0
+        # Уровень проверяется один раз: отключенная трассировка пачек ничего не стоит в цикле
+        trace = log.enabled(applog.DEBUG)
+        # Прогресс считается от начала первого повторения
+        run_offset = start_time - self._first_start if self._first_start else 0.0
+        end_offset = 0.0
         
-        for action in sorted_actions:
+        for program in compiled.programs():
             # Проверяем, не была ли запрошена остановка воспроизведения
             if not self.is_playing:
-                print("[Player] Остановка обнаружена во время replay_actions.")
+                log.debug("Остановка обнаружена во время replay_actions.")
                 break
-                
-            # Расчет целевого времени выполнения действия от начала воспроизведения
-            target_elapsed_time = (action['timestamp'] - base_timestamp) / speed_factor
-            current_elapsed_time = time.perf_counter() - start_time
-            
-            # Расчет необходимой задержки
-            delay = target_elapsed_time - current_elapsed_time
-            
-            # Пауза для соблюдения временных интервалов
-            if delay > 0:
-                # Разбиваем задержку на маленькие части, чтобы быстрее реагировать на остановку
-                remaining_delay = delay
-                while remaining_delay > 0.001 and self.is_playing: # Добавим небольшой порог
-                    sleep_time = min(0.05, remaining_delay) # Уменьшим шаг для большей отзывчивости
-                    time.sleep(sleep_time)
-                    remaining_delay -= sleep_time
+            if program.skipped:
+                self.stats['skipped'] = self.stats.get('skipped', 0) + program.skipped
+            ops = program.ops
+            starts = program.starts
+            ends = program.ends
+            bounds = program.bounds
+            offsets = program.offsets
+            kinds = program.kinds
+            count = len(bounds)
+            index = 0
+            begin = 0
             
-            # Обновляем текущее время для прогресс-бара (даже если была задержка 0)
-            self.current_time = current_elapsed_time + max(0, delay)
-            try:
-                 self.playbackProgress.emit(int(self.current_time * 1000), int(self.total_time * 1000)) # Отправляем в мс
-            except Exception as emit_e:
-                 print(f"[Player] Ошибка emit playbackProgress: {emit_e}")
+            while index < count:
+                if not self.is_playing:
+                    break
+                
+                # Пауза до начала пачки; остановка будит таймер через stop_event
+                deadline = start_time + starts[index]
+                now = perf_counter()
+                if deadline > now:
+                    wait_until(deadline, stop_event)
+                elif now - deadline > overrun_margin and records is not None:
+                    overruns += 1 # Цикл не успел к сроку пачки
+                
+                # Обновляем текущее время для прогресс-бара; сигнал отправляется с прореживанием
+                self.current_time = run_offset + max(starts[index], perf_counter() - start_time)
+                publish(self.current_time, self.total_time)
+                
+                # Если остановка была запрошена во время задержки, прерываем выполнение
+                if not self.is_playing:
+                    log.debug("Остановка обнаружена после задержки.")
+                    break
+                
+                # Догоняем расписание: просроченные пачки уходят вместе с текущей
+                last = index + 1
+                elapsed = perf_counter() - start_time
+                while last < count and starts[last] <= elapsed and bounds[last] - begin <= max_batch:
+                    last += 1
+                stop = bounds[last - 1]
+                if records is not None:
+                    # Опоздание каждого действия: момент отправки пачки минус его срок
+                    for op_index in range(begin, stop):
+                        records[kinds[op_index]](elapsed - offsets[op_index])
+                if trace:
+                    log.debug("Пачка {}-{}: {} действий, опоздание {:.3f} мс", begin, stop, stop - begin,
+                              (elapsed - starts[index]) * 1000)
+                try:
+                     self._perform_batch(ops[begin:stop])
+                except Exception as perform_e:
+                     # Ошибка одной пачки не прерывает воспроизведение; операции не
+                     # форматируются здесь - только границы пачки, строку соберет писатель журнала
+                     log.error("Ошибка выполнения действий {}-{}: {}", begin, stop, perform_e)
+                if drain:
+                    waited_from = perf_counter()
+                    self._wait_idle()
+                    start_time += perf_counter() - waited_from
+                    drain = self._drain # Бэкенд мог оказаться без поддержки ожидания
+                end_offset = ends[last - 1]
+                begin = stop
+                index = last
+        
+        if overruns:
+            self.stats['overruns'] = self.stats.get('overruns', 0) + overruns
+        return start_time + end_offset
 
-            # Если остановка была запрошена во время задержки, прерываем выполнение
-            if not self.is_playing:
-                print("[Player] Остановка обнаружена после задержки.")
-                break
-            
-            # Выполнение действия в зависимости от типа
-            try:
-                 self._perform_action(action)
-            except Exception as perform_e:
-                 print(f"[Player] Ошибка выполнения действия {action}: {perform_e}")
-                 # Решаем, стоит ли прерывать воспроизведение при ошибке одного действия
-                 # пока продолжаем
-            
-            # prev_time больше не нужен
+    def _wait_idle(self):
+        """Ждет обработки отправленной пачки (TURBO_DRAIN); считает ожидания и таймауты"""
+        idle = self.backend.wait_idle(DRAIN_TIMEOUT)
+        stats = self.stats
+        if idle is None:
+            # Бэкенд не умеет ждать: дальше темп задает только min_gap
+            log.warning("Бэкенд {} не сообщает об обработке ввода, ожидание отключено.", self.backend.name)
+            self._drain = False
+            stats['drain_unsupported'] = True
+            return
+        stats['drain_waits'] = stats.get('drain_waits', 0) + 1
+        if not idle:
+            stats['drain_timeouts'] = stats.get('drain_timeouts', 0) + 1
 
-    def _perform_action(self, action):
-        """Выполнение конкретного действия"""
-        action_type = action['type']
-        
-        if action_type == 'mouse_move':
-            self.mouse.position = (action['x'], action['y'])
-        
-        elif action_type == 'mouse_click':
-            x, y = action['x'], action['y']
-            button_str = action['button']
-            pressed = action['pressed']
-            
-            # Определение кнопки мыши
-            button = self._parse_mouse_button(button_str)
-            
-            # Установка курсора в нужное положение
-            self.mouse.position = (x, y)
-            
-            if pressed:
-                self.mouse.press(button)
-            else:
-                self.mouse.release(button)
-        
-        elif action_type == 'mouse_scroll':
-            x, y = action['x'], action['y']
-            dx, dy = action['dx'], action['dy']
-            
-            # Установка курсора в нужное положение
-            self.mouse.position = (x, y)
-            self.mouse.scroll(dx, dy)
-        
-        elif action_type in ('key_press', 'key_release'):
-            key_str = action['key']
-            key = self._parse_key(key_str)
-            
-            if key:
-                if action_type == 'key_press':
-                    self.keyboard.press(key)
-                else:
-                    self.keyboard.release(key)
-    
-    def _parse_mouse_button(self, button_str):
-        """Преобразует строковое представление кнопки мыши в объект Button"""
-        button_map = {
-            'Button.left': Button.left,
-            'Button.right': Button.right,
-            'Button.middle': Button.middle
-        }
-        
-        return button_map.get(button_str, Button.left)
-    
-    def _parse_key(self, key_str):
-        """Преобразует строковое представление клавиши в объект Key или символ"""
-        special_keys = {
-            'Key.alt': Key.alt,
-            'Key.alt_l': Key.alt_l,
-            'Key.alt_r': Key.alt_r,
-            'Key.alt_gr': Key.alt_gr,
-            'Key.backspace': Key.backspace,
-            'Key.caps_lock': Key.caps_lock,
-            'Key.cmd': Key.cmd,
-            'Key.cmd_l': Key.cmd_l,
-            'Key.cmd_r': Key.cmd_r,
-            'Key.ctrl': Key.ctrl,
-            'Key.ctrl_l': Key.ctrl_l,
-            'Key.ctrl_r': Key.ctrl_r,
-            'Key.delete': Key.delete,
-            'Key.down': Key.down,
-            'Key.end': Key.end,
-            'Key.enter': Key.enter,
-            'Key.esc': Key.esc,
-            'Key.f1': Key.f1,
-            'Key.f2': Key.f2,
-            'Key.f3': Key.f3,
-            'Key.f4': Key.f4,
-            'Key.f5': Key.f5,
-            'Key.f6': Key.f6,
-            'Key.f7': Key.f7,
-            'Key.f8': Key.f8,
-            'Key.f9': Key.f9,
-            'Key.f10': Key.f10,
-            'Key.f11': Key.f11,
-            'Key.f12': Key.f12,
-            'Key.home': Key.home,
-            'Key.insert': Key.insert,
-            'Key.left': Key.left,
-            'Key.menu': Key.menu,
-            'Key.num_lock': Key.num_lock,
-            'Key.page_down': Key.page_down,
-            'Key.page_up': Key.page_up,
-            'Key.pause': Key.pause,
-            'Key.print_screen': Key.print_screen,
-            'Key.right': Key.right,
-            'Key.scroll_lock': Key.scroll_lock,
-            'Key.shift': Key.shift,
-            'Key.shift_l': Key.shift_l,
-            'Key.shift_r': Key.shift_r,
-            'Key.space': Key.space,
-            'Key.tab': Key.tab,
-            'Key.up': Key.up
-        }
-        
-        if key_str in special_keys:
-            return special_keys[key_str]
-        elif len(key_str) == 1:
-            return key_str
-        
-        return None
+    def _emit_progress(self, current_ms, total_ms):
+        self._call(self.on_progress, current_ms, total_ms) # Отправляем в мс
+
+    def _perform_batch(self, ops):
+        """Отправляет пачку готовых операций в бэкенд одним вызовом send_batch"""
+        self.backend.send_batch(ops)
+        stats = self.stats
+        stats['batches'] = stats.get('batches', 0) + 1
+        stats['batched_events'] = stats.get('batched_events', 0) + len(ops)
+        if len(ops) > stats.get('max_batch', 0):
+            stats['max_batch'] = len(ops)
     
+    @property
+    def is_running(self):
+        """Поток воспроизведения еще жив (после stop() он может дочитывать текущую пачку)"""
+        return self.play_thread is not None and self.play_thread.is_alive()
+
     def stop(self):
         """Останавливает воспроизведение"""
-        print("[Player] Установка флага is_playing = False")
+        log.debug("Установка флага is_playing = False")
         self.is_playing = False
-        # Это флаг проверяется в циклах, и они будут прерваны при следующей итерации
+        # Флаг проверяется в циклах, а событие сразу будит ожидание таймера
+        self._stop_event.set()
         
     def get_current_playback_time(self):
         """Возвращает текущее время воспроизведения в секундах"""
@@ -0,0 +1,231 @@
+"""
+Компиляция записи в исполняемую форму для Player.
+
+Перед воспроизведением строки записи один раз переводятся в Program:
+
+    ops    - готовые операции бэкенда (InputBackend.compile_op): по целому
+             коду действия уже выбран вызов, а кнопки и клавиши разрешены
+             бэкендом (resolve_button/resolve_key вызываются один раз на имя
+             в таблице строк, а не на каждое событие);
+    starts - смещение первой операции каждой пачки от начала записи
+             в секундах воспроизведения (уже поделено на скорость);
+    ends   - то же для последней операции пачки;
+    bounds - индекс конца каждой пачки в ops;
+    offsets, kinds - смещение и тип каждой операции (для учета опоздания
+             действий, см. latency.py).
+
+Цикл воспроизведения только ждет starts[i] и отдает ops[bounds[i-1]:bounds[i]]
+в send_batch - без разбора строк, ветвления по типам и арифметики на событие.
+
+Запись компилируется сегментами по segment_size строк по мере
+воспроизведения, поэтому старт не ждет компиляции всей записи, а для
+длинных и потоковых записей исполняемая форма не занимает память,
+сравнимую с самой записью.
+
+Фрагмент записи (start/end) компилируется так же: строки фрагмента
+находятся двоичным поиском (seek.rows_between), а перед ними и после них
+добавляются нажатия и отпускания удерживаемых клавиш и кнопок.
+Ограничение пауз (timeline.cap_gaps) тоже применяется здесь, к строкам
+перед компиляцией, и попадает в смещения starts/ends.
+"""
+from array import array
+from itertools import chain, islice
+
+import seek
+import timeline
+from actions import (ActionColumns, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE,
+                     KIND_KEY_PRESS, KIND_KEY_RELEASE)
+
+# Записи до такого размера (в памяти) компилируются один раз и переиспользуются во всех повторах
+COMPILE_LIMIT = 1000000
+
+# Размер сегмента для длинных и потоковых записей
+SEGMENT_SIZE = 65536
+
+# Первый сегмент короче: воспроизведение начинается, не дожидаясь компиляции целого сегмента
+FIRST_SEGMENT_SIZE = 4096
+
+
+class Program:
+    """Скомпилированный сегмент записи (см. описание модуля)"""
+
+    def __init__(self):
+        self.ops = []
+        self.starts = array('d')
+        self.ends = array('d')
+        self.bounds = array('I')
+        self.offsets = array('d')
+        self.kinds = array('B')
+        self.skipped = 0 # Клавиши, которые бэкенд не может воспроизвести
+
+    def __len__(self):
+        return len(self.bounds)
+
+    @property
+    def op_count(self):
+        return len(self.ops)
+
+
+class TokenTable:
+    """Разрешенные бэкендом кнопки и клавиши по коду строки записи"""
+
+    def __init__(self, backend, names):
+        self.backend = backend
+        self.names = names
+        self.buttons = {}
+        self.keys = {}
+
+    def button(self, code):
+        token = self.buttons.get(code, self)
+        if token is self:
+            token = self.buttons[code] = self.backend.resolve_button(self.names[code])
+        return token
+
+    def key(self, code):
+        token = self.keys.get(code, self)
+        if token is self:
+            token = self.keys[code] = self.backend.resolve_key(self.names[code])
+        return token
+
+
+def compile_rows(rows, tokens, base_timestamp, speed_factor, batch_window=0.0005, max_batch=64):
+    """
+    Компилирует строки (timestamp, kind, x, y, dx, dy, code) в Program.
+
+    События ближе batch_window секунд воспроизведения к первому событию
+    пачки попадают в одну пачку (не больше max_batch); batch_window=None -
+    каждое событие отдельно.
+    """
+    program = Program()
+    compile_op = tokens.backend.compile_op
+    ops = program.ops
+    starts = program.starts
+    ends = program.ends
+    bounds = program.bounds
+    offsets = program.offsets
+    kinds = program.kinds
+    window = batch_window if batch_window is not None else -1.0
+    batch_start = None
+    batch_size = 0
+    offset = 0.0
+    for timestamp, kind, x, y, dx, dy, code in rows:
+        token = None
+        if kind == KIND_MOUSE_PRESS or kind == KIND_MOUSE_RELEASE:
+            token = tokens.button(code)
+        elif kind == KIND_KEY_PRESS or kind == KIND_KEY_RELEASE:
+            token = tokens.key(code)
+            if token is None:
+                program.skipped += 1
+                continue
+        offset = (timestamp - base_timestamp) / speed_factor
+        if batch_start is None or batch_size >= max_batch or offset - batch_start > window:
+            if batch_start is not None:
+                bounds.append(len(ops))
+            starts.append(offset)
+            ends.append(offset)
+            batch_start = offset
+            batch_size = 0
+        ops.append(compile_op(kind, x, y, dx, dy, token))
+        offsets.append(offset)
+        kinds.append(kind)
+        ends[-1] = offset
+        batch_size += 1
+    if batch_start is not None:
+        bounds.append(len(ops))
+    return program
+
+
+class CompiledRecording:
+    """
+    Исполняемая форма всей записи: последовательность сегментов Program.
+
+    Сегменты компилируются по мере воспроизведения, поэтому старт не ждет
+    компиляции всей записи. Для записей в памяти до COMPILE_LIMIT событий
+    сегменты запоминаются и переиспользуются в повторах; длинные и потоковые
+    записи компилируются заново на каждом проходе.
+
+    start/end - границы фрагмента в секундах записи (None - с начала / до конца).
+    Смещения фрагмента считаются от start; клавиши и кнопки, удерживаемые
+    в момент start, нажимаются в начале, а удерживаемые в end - отпускаются.
+    max_gap/gap_mode - ограничение пауз (см. timeline.py), None - без изменений.
+    turbo_gap - турбо-режим: записанные метки не учитываются, события идут
+    с шагом turbo_gap секунд (0 - подряд); None - по записи.
+    """
+
+    def __init__(self, actions, backend, speed_factor, batch_window=0.0005, max_batch=64,
+                 stats=None, segment_size=SEGMENT_SIZE, start=None, end=None,
+                 max_gap=None, gap_mode=timeline.GAP_CAP, turbo_gap=None):
+        self.actions = actions
+        self.tokens = TokenTable(backend, actions.names)
+        self.speed_factor = speed_factor
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.stats = stats
+        self.segment_size = segment_size
+        self.start = start
+        self.end = end
+        self.max_gap = max_gap
+        self.gap_mode = gap_mode
+        self.turbo_gap = turbo_gap
+        self.base_timestamp = None
+        self._cacheable = isinstance(actions, ActionColumns) and len(actions) <= COMPILE_LIMIT
+        self._programs = None # Все сегменты, если запись уже скомпилирована целиком
+
+    def _compile(self):
+        rows = timeline_rows(self.actions, self.start, self.end, self.max_gap, self.gap_mode,
+                             self.turbo_gap, stats=self.stats)
+        first = next(rows, None)
+        if first is None:
+            return
+        # Фрагмент отсчитывается от start, даже если первое событие позже
+        self.base_timestamp = first[0] if self.start is None else self.start
+        rows = _prepend(first, rows)
+        segment_size = min(FIRST_SEGMENT_SIZE, self.segment_size)
+        while True:
+            program = compile_rows(islice(rows, segment_size), self.tokens, self.base_timestamp,
+                                   self.speed_factor, self.batch_window, self.max_batch)
+            segment_size = self.segment_size
+            if not program.ops and not program.skipped:
+                return
+            yield program
+
+    def _compile_and_cache(self):
+        programs = []
+        for program in self._compile():
+            programs.append(program)
+            yield program
+        # Проход дошел до конца (не прерван остановкой): запоминаем сегменты
+        self._programs = programs
+
+    def programs(self):
+        """Сегменты для одного прохода по записи"""
+        if self._programs is not None:
+            return iter(self._programs)
+        if self._cacheable:
+            return self._compile_and_cache()
+        return self._compile()
+
+
+def timeline_rows(actions, start=None, end=None, max_gap=None, gap_mode=timeline.GAP_CAP,
+                  turbo_gap=None, stats=None):
+    """
+    Строки записи в порядке воспроизведения со всеми преобразованиями шкалы
+    времени (фрагмент, удерживаемые клавиши, паузы, турбо) - то, что
+    компилирует CompiledRecording. Не зависит от бэкенда, поэтому его можно
+    подготовить заранее и в другом процессе (см. batch.py).
+    """
+    rows = seek.rows_between(actions, start, end, stats=stats)
+    if start is not None:
+        rows = chain(seek.prologue_rows(actions, start), rows)
+    if end is not None:
+        rows = chain(rows, seek.epilogue_rows(actions, end))
+    if turbo_gap is not None:
+        rows = timeline.paced_rows(rows, turbo_gap, origin=start)
+    elif max_gap is not None:
+        rows = timeline.cap_gaps(rows, max_gap, gap_mode, origin=start)
+    return rows
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
@@ -0,0 +1,64 @@
+"""
+Канал прогресса воспроизведения.
+
+Поток воспроизведения публикует прогресс на каждую пачку событий, но
+уведомление (сигнал Qt через очередь событий GUI) отправляется не чаще
+rate раз в секунду или когда меняется целый процент. Последнее значение
+всегда можно прочитать без сигналов через snapshot() - так его читает
+строка состояния, обновляясь по уведомлению.
+"""
+import time
+
+# Частота уведомлений по умолчанию, Гц
+DEFAULT_RATE = 20.0
+
+
+class ProgressChannel:
+    """
+    :param notify: Функция notify(current_ms, total_ms), вызываемая при уведомлении
+    :param rate: Максимальная частота уведомлений без смены процента, Гц
+    """
+
+    def __init__(self, notify=None, rate=DEFAULT_RATE):
+        self.notify = notify
+        self.interval = 1.0 / rate if rate else 0.0
+        self._state = (0.0, 0.0)   # (текущее время, общее время) в секундах
+        self._last_notify = 0.0
+        self._last_percent = -1
+        self.published = 0  # Сколько раз поток воспроизведения сообщил прогресс
+        self.notified = 0   # Сколько уведомлений (сигналов) реально отправлено
+
+    @property
+    def avoided(self):
+        """Сколько сигналов не отправлено благодаря прореживанию"""
+        return self.published - self.notified
+
+    def reset(self, total=0.0):
+        self._state = (0.0, total)
+        self._last_notify = 0.0
+        self._last_percent = -1
+        self.published = 0
+        self.notified = 0
+
+    def publish(self, current, total):
+        """Сообщает прогресс (вызывается из потока воспроизведения)"""
+        # Кортеж заменяется одним присваиванием, читатель всегда видит согласованную пару
+        self._state = (current, total)
+        self.published += 1
+        percent = int(current * 100 / total) if total > 0 else 0
+        now = time.perf_counter()
+        if percent == self._last_percent and now - self._last_notify < self.interval:
+            return
+        self._last_percent = percent
+        self._last_notify = now
+        self.notified += 1
+        if self.notify:
+            self.notify(int(current * 1000), int(total * 1000))
+
+    def snapshot(self):
+        """Последний опубликованный прогресс (текущее, общее время) в секундах"""
+        return self._state
+
+    def percent(self):
+        current, total = self._state
+        return min(100, int(current * 100 / total)) if total > 0 else 0
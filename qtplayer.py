@@ -0,0 +1,61 @@
+"""
+Адаптер Player для интерфейса на Qt.
+
+Player ничего не знает о Qt и сообщает о событиях через функции обратного
+вызова из своего потока. QtPlayer превращает их в сигналы, которые GUI
+подключает с Qt.QueuedConnection, чтобы обработчики выполнялись в главном потоке.
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from player import Player
+
+
+class QtPlayer(QObject):
+    # Определяем сигналы
+    playbackFinished = pyqtSignal()
+    playbackError = pyqtSignal(str)
+    # Сигнал для обновления прогресса (с прореживанием, см. progress.py)
+    playbackProgress = pyqtSignal(int, int) # current_time, total_time
+
+    def __init__(self, player=None, parent=None):
+        super().__init__(parent)
+        self.player = player or Player()
+        self.player.on_finished = self.playbackFinished.emit
+        self.player.on_error = self.playbackError.emit
+        self.player.on_progress = self.playbackProgress.emit
+
+    def play(self, actions, repeat_count=1, speed_factor=1.0, start=None, end=None, loop=False,
+             max_gap=None, gap_mode='cap', turbo=None, min_gap=0.0):
+        return self.player.play(actions, repeat_count, speed_factor, start, end, loop, max_gap, gap_mode,
+                         turbo, min_gap)
+
+    def calculate_total_time(self, actions, repeat_count, speed_factor, start=None, end=None,
+                             max_gap=None, gap_mode='cap', turbo=None, min_gap=0.0):
+        """Ожидаемое время воспроизведения (для предпросмотра в интерфейсе)"""
+        return self.player._calculate_total_time(actions, repeat_count, speed_factor, start, end,
+                                                 max_gap, gap_mode, turbo, min_gap)
+
+    def stop(self):
+        self.player.stop()
+
+    @property
+    def is_playing(self):
+        return self.player.is_playing
+
+    @property
+    def is_running(self):
+        return self.player.is_running
+
+    @property
+    def progress(self):
+        return self.player.progress
+
+    @property
+    def stats(self):
+        return self.player.stats
+
+    def get_current_playback_time(self):
+        return self.player.get_current_playback_time()
+
+    def get_total_playback_time(self):
+        return self.player.get_total_playback_time()
@@ -1,26 +1,106 @@
+import os
 import time
 import threading
-from pynput import mouse, keyboard
+import clkformat
+import journal
+from actions import (ActionBuffer, KIND_MOUSE_MOVE, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE,
+                     KIND_MOUSE_SCROLL, KIND_KEY_PRESS, KIND_KEY_RELEASE)
+from ringbuf import SPSCRing, DEFAULT_CAPACITY
+from simplify import MoveSimplifier
+
+# Не чаще какого интервала (секунд) рекордер сообщает о новых действиях (on_activity)
+ACTIVITY_INTERVAL = 0.2
 
 class Recorder:
-    def __init__(self):
-        self.actions = []
+    def __init__(self, move_tolerance_px=0, move_tolerance_s=0.05,
+                 ring_capacity=DEFAULT_CAPACITY, drain_interval=0.005, journal_dir=None,
+                 block_size=journal.DEFAULT_BLOCK_SIZE, flush_interval=journal.DEFAULT_FLUSH_INTERVAL,
+                 activity_interval=ACTIVITY_INTERVAL):
+        """
+        :param move_tolerance_px: Допуск упрощения траектории мыши в пикселях (0 - писать все движения)
+        :param move_tolerance_s: Максимальный интервал между сохраненными движениями, секунды
+        :param ring_capacity: Емкость кольцевого буфера каждого слушателя
+        :param drain_interval: Как часто поток-потребитель забирает события, секунды
+        :param journal_dir: Каталог журнала записи (см. journal.py); None - запись только в памяти
+        :param block_size: Сколько действий копится в памяти до записи блока в журнал
+        :param flush_interval: Как часто неполный блок дописывается в журнал, секунды
+        :param activity_interval: Не чаще какого интервала вызывается on_activity, секунды
+        """
+        self.move_tolerance_px = move_tolerance_px
+        self.move_tolerance_s = move_tolerance_s
+        self.ring_capacity = ring_capacity
+        self.drain_interval = drain_interval
+        self.journal_dir = journal_dir
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.journal = None
+        self.journaled_count = 0 # Действий, уже перенесенных из памяти в журнал
+        self._last_flush = 0.0
+        self.simplifier = None
+        self.actions = ActionBuffer()
         self.start_time = None
         self.recording = False
         self.mouse_listener = None
         self.keyboard_listener = None
         self.callback = None
+        # on_activity() - появились новые действия (из потока-потребителя, не чаще activity_interval);
+        # GUI по нему обновляет счетчик вместо опроса по таймеру
+        self.on_activity = None
+        self.activity_interval = activity_interval
+        self._activity_pending = False
+        self._last_activity = 0.0
+        # У каждого слушателя свое кольцо: ровно один писатель на кольцо
+        self.mouse_ring = None
+        self.keyboard_ring = None
+        self._consumer = None
+        self._stop_event = threading.Event()
+        self.drain_batches = 0
     
-    def start_recording(self, callback):
-        """Запускает запись действий пользователя"""
-        self.actions = []
+    def start_recording(self, callback=None):
+        """
+        Запускает запись действий пользователя.
+
+        Слушатели только кладут события в кольцевые буферы, а в колоночный
+        буфер self.actions их переносит поток-потребитель. С журналом
+        self.actions - только текущий блок: потребитель периодически дописывает
+        его в журнал и начинает новый, а после остановки self.actions -
+        собранная из журнала запись (MappedActions).
+        callback (необязательный) получает словарный вид каждого действия
+        в потоке-потребителе - только для старого кода, без него словари не создаются.
+        """
+        self.actions = ActionBuffer()
+        self.simplifier = None
+        if self.move_tolerance_px > 0:
+            self.simplifier = MoveSimplifier(self.move_tolerance_px, self.move_tolerance_s)
+            # Допуск попадет в заголовок файла при сохранении
+            self.actions.meta['move_tolerance_px'] = self.move_tolerance_px
+            self.actions.meta['move_tolerance_s'] = self.move_tolerance_s
+        self.journaled_count = 0
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            # Собранные из прошлых журналов записи больше не нужны: текущую запись заменяет новая
+            journal.remove_recordings(self.journal_dir)
+            self.journal = journal.JournalWriter(journal.journal_path(self.journal_dir), self.actions.meta)
+            self._last_flush = time.monotonic()
         self.callback = callback
+        self.mouse_ring = SPSCRing(self.ring_capacity)
+        self.keyboard_ring = SPSCRing(self.ring_capacity)
+        self.drain_batches = 0
+        self._stop_event.clear()
         self.start_time = time.time()
         self.recording = True
         
+        self._consumer = threading.Thread(target=self._consume, name="RecorderConsumer", daemon=True)
+        self._consumer.start()
+        
         # Запуск обработчиков событий в отдельных потоках
-        self.start_mouse_listener()
-        self.start_keyboard_listener()
+        try:
+            self.start_mouse_listener()
+            self.start_keyboard_listener()
+        except Exception:
+            # Например, pynput не установлен: не оставляем поток-потребитель работать
+            self.stop_recording()
+            raise
     
     def stop_recording(self):
         """Останавливает запись действий пользователя"""
@@ -33,57 +113,164 @@ class Recorder:
         if self.keyboard_listener:
             self.keyboard_listener.stop()
             self.keyboard_listener = None
+        
+        # Слушатели остановлены: потребитель забирает остатки и завершается
+        self._stop_event.set()
+        if self._consumer:
+            self._consumer.join()
+            self._consumer = None
+        
+        # Дописываем последнюю отложенную точку упрощенной траектории
+        if self.simplifier:
+            self._append_moves(self.simplifier.flush())
+            self.actions.meta['raw_moves'] = self.simplifier.raw_count
+        
+        if self.journal is not None:
+            self._finish_journal()
+            return
+        
+        # Потоки слушателей могли записать соседние события не по порядку.
+        # Упорядочиваем один раз здесь, чтобы воспроизведение больше не сортировало
+        self.actions.sort()
+    
+    def stop(self):
+        """Синоним stop_recording (так его вызывает MainWindow)"""
+        self.stop_recording()
+
+    def ring_stats(self):
+        """Счетчики кольцевых буферов: принято, через запасную очередь, потеряно, пик заполнения"""
+        stats = {'drain_batches': self.drain_batches}
+        for name, ring in (('mouse', self.mouse_ring), ('keyboard', self.keyboard_ring)):
+            if ring is not None:
+                stats[name] = ring.stats()
+        return stats
+
+    def action_count(self):
+        """Сколько действий записано (в журнале и в текущем блоке)"""
+        return self.journaled_count + len(self.actions)
+
+    def dropped_count(self):
+        return sum(ring.dropped for ring in (self.mouse_ring, self.keyboard_ring) if ring is not None)
+
+    def _consume(self):
+        """Поток-потребитель: пачками переносит события из колец в буфер действий"""
+        rings = (self.mouse_ring, self.keyboard_ring)
+        while True:
+            stopping = self._stop_event.wait(self.drain_interval)
+            for ring in rings:
+                events = ring.drain()
+                if events:
+                    self.drain_batches += 1
+                    self._store(events)
+                    self._activity_pending = True
+            # Уведомление откладывается, а не теряется: последняя пачка сообщается после паузы
+            if self._activity_pending and time.monotonic() - self._last_activity >= self.activity_interval:
+                self._activity_pending = False
+                self._last_activity = time.monotonic()
+                if self.on_activity is not None:
+                    self.on_activity()
+            if self.journal is not None and self.actions and (
+                    len(self.actions) >= self.block_size or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_block()
+            if stopping:
+                return
+
+    def _flush_block(self):
+        """Дописывает текущий блок в журнал и начинает новый с той же таблицей имен"""
+        block = self.actions
+        block.sort() # Внутри блока порядок восстанавливается сразу
+        self.journal.append_block(block)
+        fresh = ActionBuffer()
+        for name in block.names:
+            fresh.intern(name)
+        fresh.meta = block.meta
+        # Сначала счетчик, потом новый блок: action_count() может на миг учесть блок дважды, но не пропустит его
+        self.journaled_count += len(block)
+        self.actions = fresh
+        self._last_flush = time.monotonic()
+
+    def _finish_journal(self):
+        """Дописывает последний блок и собирает из журнала файл записи"""
+        self._flush_block()
+        self.journal.write_meta(self.actions.meta) # raw_moves известно только в конце
+        self.journal.close()
+        path = self.journal.path
+        self.journal = None
+        if not self.journaled_count:
+            os.remove(path)
+            return
+        clk_path = journal.recording_path(self.journal_dir)
+        journal.finalize(path, clk_path)
+        # Журнал удаляется только после того, как запись целиком на диске
+        os.remove(path)
+        self.actions = clkformat.load(clk_path)
+
+    def _store(self, events):
+        actions = self.actions
+        simplifier = self.simplifier
+        for timestamp, kind, x, y, dx, dy, name in events:
+            if kind == KIND_MOUSE_MOVE:
+                if simplifier:
+                    self._append_moves(simplifier.add(timestamp, x, y))
+                    continue
+                index = actions.append_move(timestamp, x, y)
+            elif kind == KIND_MOUSE_PRESS or kind == KIND_MOUSE_RELEASE:
+                if simplifier:
+                    # Путь до точки клика дописывается целиком, сам клик - с точными координатами
+                    self._append_moves(simplifier.flush())
+                index = actions.append_click(timestamp, x, y, name, kind == KIND_MOUSE_PRESS)
+            elif kind == KIND_MOUSE_SCROLL:
+                if simplifier:
+                    self._append_moves(simplifier.flush())
+                index = actions.append_scroll(timestamp, x, y, dx, dy)
+            else:
+                if simplifier:
+                    # Отложенная точка пути раньше клавиши по времени: дописываем до нее,
+                    # иначе она встанет после клавиш и потребует сортировки (а в журнале -
+                    # может не попасть в окно переупорядочивания блока)
+                    self._append_moves(simplifier.flush())
+                index = actions.append_key(timestamp, name, kind == KIND_KEY_PRESS)
+            self._notify(index)
+
+    def compression_ratio(self):
+        """Во сколько раз упрощение уменьшило число движений мыши (None, если оно выключено)"""
+        return self.simplifier.ratio if self.simplifier else None
+
+    def _append_moves(self, points):
+        for timestamp, x, y in points:
+            self._notify(self.actions.append_move(timestamp, x, y))
+
+    def _notify(self, index):
+        """Передает действие в callback в старом словарном виде"""
+        if self.callback:
+            self.callback(self.actions[index])
     
     def start_mouse_listener(self):
         """Запускает прослушивание событий мыши"""
+        # pynput загружается при первой записи, а не при запуске приложения
+        from pynput import mouse
+        # Обработчики выполняются внутри хука ОС: только метка времени и запись в кольцо
+        push = self.mouse_ring.push
+        
         def on_move(x, y):
             if not self.recording:
                 return
             
-            timestamp = time.time() - self.start_time
-            action = {
-                'type': 'mouse_move',
-                'timestamp': timestamp,
-                'x': x,
-                'y': y
-            }
-            
-            if self.callback:
-                self.callback(action)
+            push((time.time() - self.start_time, KIND_MOUSE_MOVE, x, y, 0, 0, None))
         
         def on_click(x, y, button, pressed):
             if not self.recording:
                 return
             
-            timestamp = time.time() - self.start_time
-            action = {
-                'type': 'mouse_click',
-                'timestamp': timestamp,
-                'x': x,
-                'y': y,
-                'button': str(button),
-                'pressed': pressed
-            }
-            
-            if self.callback:
-                self.callback(action)
+            kind = KIND_MOUSE_PRESS if pressed else KIND_MOUSE_RELEASE
+            push((time.time() - self.start_time, kind, x, y, 0, 0, str(button)))
         
         def on_scroll(x, y, dx, dy):
             if not self.recording:
                 return
             
-            timestamp = time.time() - self.start_time
-            action = {
-                'type': 'mouse_scroll',
-                'timestamp': timestamp,
-                'x': x,
-                'y': y,
-                'dx': dx,
-                'dy': dy
-            }
-            
-            if self.callback:
-                self.callback(action)
+            push((time.time() - self.start_time, KIND_MOUSE_SCROLL, x, y, dx, dy, None))
         
         self.mouse_listener = mouse.Listener(
             on_move=on_move,
@@ -94,6 +281,9 @@ class Recorder:
     
     def start_keyboard_listener(self):
         """Запускает прослушивание событий клавиатуры"""
+        from pynput import keyboard
+        push = self.keyboard_ring.push
+        
         def on_press(key):
             if not self.recording:
                 return
@@ -107,14 +297,7 @@ class Recorder:
                 # Для специальных клавиш (Enter, Shift и т.д.)
                 key_char = str(key)
             
-            action = {
-                'type': 'key_press',
-                'timestamp': timestamp,
-                'key': key_char
-            }
-            
-            if self.callback:
-                self.callback(action)
+            push((timestamp, KIND_KEY_PRESS, 0, 0, 0, 0, key_char))
         
         def on_release(key):
             if not self.recording:
@@ -127,17 +310,10 @@ class Recorder:
             except AttributeError:
                 key_char = str(key)
             
-            action = {
-                'type': 'key_release',
-                'timestamp': timestamp,
-                'key': key_char
-            }
-            
-            if self.callback:
-                self.callback(action)
+            push((timestamp, KIND_KEY_RELEASE, 0, 0, 0, 0, key_char))
         
         self.keyboard_listener = keyboard.Listener(
             on_press=on_press,
             on_release=on_release
         )
-        self.keyboard_listener.start() 
\ No newline at end of file
+        self.keyboard_listener.start()
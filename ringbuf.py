@@ -0,0 +1,103 @@
+"""
+Кольцевой буфер между потоками слушателей pynput и потоком-потребителем.
+
+На Windows хуки мыши и клавиатуры должны возвращаться быстро: если
+обработчик задерживается, ОС снимает хук. Поэтому слушатель только
+кладет кортеж события в SPSCRing (один писатель, один читатель, без
+блокировок), а разбор, упрощение траектории и запись в ActionBuffer
+делает отдельный поток, забирающий события пачками.
+
+Буфер без блокировок за счет того, что индекс записи меняет только
+писатель, а индекс чтения - только читатель; присваивание атрибута
+в CPython атомарно. Если кольцо переполнено, события уходят в запасную
+очередь (deque, append/popleft потокобезопасны), пока читатель ее не
+разберет, - запись остается без потерь. Только если и запасная очередь
+выросла до max_overflow, событие отбрасывается и учитывается в dropped.
+"""
+from collections import deque
+
+# Емкость кольца по умолчанию (степень двойки): ~1 с самого плотного потока мыши
+DEFAULT_CAPACITY = 1 << 16
+
+# Сколько событий может ждать в запасной очереди, прежде чем начнутся потери
+DEFAULT_MAX_OVERFLOW = 1 << 20
+
+
+class SPSCRing:
+    """
+    Ограниченная очередь для одного писателя и одного читателя.
+
+    :param capacity: Емкость кольца (округляется вверх до степени двойки)
+    :param max_overflow: Предел запасной очереди при переполнении кольца
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_overflow=DEFAULT_MAX_OVERFLOW):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._slots = [None] * size
+        self._head = 0   # Следующий индекс чтения (меняет только читатель)
+        self._tail = 0   # Следующий индекс записи (меняет только писатель)
+        self._overflow = deque()
+        self.max_overflow = max_overflow
+        # Счетчики пишет только писатель, читатель их только читает
+        self.pushed = 0      # Принято событий
+        self.overflowed = 0  # Из них прошло через запасную очередь
+        self.dropped = 0     # Потеряно (запасная очередь тоже полна)
+        self.high_water = 0  # Максимальное заполнение кольца
+
+    def push(self, item):
+        """Кладет событие (вызывается только из потока писателя). Возвращает False, если событие потеряно"""
+        tail = self._tail
+        used = tail - self._head
+        # Пока в запасной очереди что-то есть, пишем туда же, чтобы не нарушить порядок
+        if used >= self.capacity or self._overflow:
+            if len(self._overflow) >= self.max_overflow:
+                self.dropped += 1
+                return False
+            self._overflow.append(item)
+            self.overflowed += 1
+            self.pushed += 1
+            return True
+        self._slots[tail & self._mask] = item
+        self._tail = tail + 1 # Публикуем слот только после записи
+        self.pushed += 1
+        if used >= self.high_water:
+            self.high_water = used + 1
+        return True
+
+    def drain(self, limit=None):
+        """Забирает накопленные события пачкой (вызывается только из потока читателя)"""
+        head = self._head
+        tail = self._tail
+        if limit is not None:
+            tail = min(tail, head + limit)
+        items = []
+        slots = self._slots
+        mask = self._mask
+        for index in range(head, tail):
+            slot = index & mask
+            items.append(slots[slot])
+            slots[slot] = None
+        self._head = tail # Освобождаем слоты только после чтения
+        # Запасные события идут строго после кольца: берем их, только если кольцо
+        # пусто (писатель пишет в кольцо, лишь когда запасная очередь пуста)
+        if self._overflow and self._tail == tail and (limit is None or len(items) < limit):
+            overflow = self._overflow
+            while overflow and (limit is None or len(items) < limit):
+                items.append(overflow.popleft())
+        return items
+
+    def __len__(self):
+        return self._tail - self._head + len(self._overflow)
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'pushed': self.pushed,
+            'overflowed': self.overflowed,
+            'dropped': self.dropped,
+            'high_water': self.high_water,
+        }
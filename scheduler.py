@@ -0,0 +1,518 @@
+"""
+Планировщик запусков: много заданий в одной куче по времени срабатывания.
+
+Задания бывают двух видов:
+
+    KIND_INTERVAL - каждые interval секунд с привязкой к anchor: моменты
+                    запуска anchor + k * interval не зависят от того, когда
+                    фактически стартовал предыдущий запуск, поэтому задержки
+                    не накапливаются;
+    KIND_CRON     - по расписанию cron из пяти полей "минуты часы день месяц
+                    день_недели" (*, списки, диапазоны, шаг /n; воскресенье - 0 или 7).
+
+Моменты запуска хранятся как время на часах (их можно сохранить в файл
+и пересчитать после перезапуска), а ждет планировщик по монотонным часам
+(perf_counter): next_wakeup() - сколько осталось до ближайшего задания.
+Если часы и монотонное время разошлись (сон системы, перевод часов),
+куча пересчитывается от времени на часах.
+
+Запуск, опоздавший больше MISFIRE_GRACE (компьютер спал, приложение было
+закрыто), считается пропущенным. Политика задания решает, что с ним делать:
+POLICY_SKIP - пропустить и ждать следующего, POLICY_CATCH_UP - выполнить
+пропущенные сразу, но не больше catch_up_limit подряд.
+
+Если владелец занят (on_fire вернул False - предыдущий запуск еще
+играет), наступивший запуск обрабатывается по политике перекрытия задания:
+
+    OVERLAP_SKIP     - отбросить (счетчик dropped), оставшиеся запуски
+                       (runs) при этом не расходуются;
+    OVERLAP_QUEUE    - поставить в очередь, не больше queue_depth запусков
+                       задания; лишние отбрасываются;
+    OVERLAP_COALESCE - держать в очереди один запуск, следующие сливаются
+                       с ним (счетчик coalesced).
+
+Очередь разбирает release(): владелец вызывает его, когда освободился.
+
+По каждому заданию считается опоздание срабатывания относительно расписания
+(error_*: точность самого планировщика) и задержка фактического старта
+(delay_*: включает ожидание в очереди), см. ScheduledJob.stats; последние
+TICK_HISTORY запусков с исходом лежат в ScheduledJob.ticks. Догоняющие
+запуски после пропуска в точность не входят (caught_up).
+"""
+import heapq
+from collections import deque
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import applog
+
+KIND_INTERVAL = 'interval'
+KIND_CRON = 'cron'
+
+POLICY_SKIP = 'skip'
+POLICY_CATCH_UP = 'catch_up'
+
+# Опоздание, после которого запуск считается пропущенным, секунд
+MISFIRE_GRACE = 1.0
+
+OVERLAP_SKIP = 'skip'
+OVERLAP_QUEUE = 'queue'
+OVERLAP_COALESCE = 'coalesce'
+OVERLAP_POLICIES = (OVERLAP_SKIP, OVERLAP_QUEUE, OVERLAP_COALESCE)
+
+# Глубина очереди по умолчанию для OVERLAP_QUEUE
+DEFAULT_QUEUE_DEPTH = 3
+
+# Сколько последних запусков задания хранится в памяти для диагностики
+TICK_HISTORY = 100
+
+# Исходы запуска в ScheduledJob.ticks
+TICK_STARTED = 'started'
+TICK_QUEUED = 'queued'
+TICK_DROPPED = 'dropped'
+TICK_COALESCED = 'coalesced'
+TICK_FAILED = 'failed'
+
+# Счетчики задания (ScheduledJob.stats): секунды в *_sum/*_max/*_last
+EMPTY_STATS = {
+    'fired': 0, 'started': 0, 'missed': 0, 'caught_up': 0,
+    'dropped': 0, 'coalesced': 0, 'queued': 0, 'queue_max': 0, 'failed': 0,
+    'measured': 0, 'error_sum': 0.0, 'error_max': 0.0, 'error_last': 0.0,
+    'delayed': 0, 'delay_sum': 0.0, 'delay_max': 0.0, 'delay_last': 0.0,
+}
+
+# Расхождение часов и монотонного времени, после которого куча пересчитывается
+CLOCK_JUMP = 2.0
+
+STATE_VERSION = 1
+
+log = applog.get_logger('Scheduler')
+
+
+class CronSpec:
+    """Разобранное выражение cron из пяти полей"""
+
+    # (минимум, максимум) для минут, часов, дней месяца, месяцев, дней недели
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"В выражении cron должно быть 5 полей: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays} # 7 - тоже воскресенье
+        # Как в cron: если заданы и дни месяца, и дни недели, подходит любое из условий
+        self._any_day = fields[2] != '*' and fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Шаг в поле cron должен быть положительным: {field!r}")
+            if part == '*':
+                first, last = low, high
+            elif '-' in part:
+                first_text, last_text = part.split('-', 1)
+                first, last = int(first_text), int(last_text)
+            else:
+                first = last = int(part)
+            if first < low or last > high or first > last:
+                raise ValueError(f"Значение поля cron вне диапазона {low}-{high}: {field!r}")
+            values.update(range(first, last + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        # datetime: понедельник - 0; cron: воскресенье - 0
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        return (in_month or in_week) if self._any_day else (in_month and in_week)
+
+    def next_after(self, moment):
+        """Первый подходящий момент (с точностью до минуты) строго позже moment"""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Месяцы, дни и часы пропускаются целиком, поэтому шагов немного даже для редких расписаний
+        for _step in range(100000):
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year=moment.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Расписание cron никогда не срабатывает: {self.expression!r}")
+
+
+class ScheduledJob:
+    """
+    Задание планировщика.
+
+    :param interval: Период в секундах (KIND_INTERVAL)
+    :param anchor: Время на часах (time.time()), от которого отсчитываются периоды;
+                   по умолчанию - момент добавления, первый запуск сразу
+    :param cron: Выражение cron (KIND_CRON)
+    :param runs: Сколько раз выполнить (None - без ограничения); расходуется
+                 запусками, которые стартовали или встали в очередь
+    :param overlap: Что делать с запуском, пока владелец занят (OVERLAP_*)
+    :param queue_depth: Сколько запусков задания может ждать в очереди (OVERLAP_QUEUE)
+    :param recording: Путь к записи (None - текущая запись в окне)
+    :param persist: Сохранять ли задание в файл состояния планировщика
+    """
+
+    def __init__(self, job_id, kind, interval=None, anchor=None, cron=None, runs=None,
+                 policy=POLICY_SKIP, catch_up_limit=1, recording=None, repeat=1, speed=1.0,
+                 overlap=OVERLAP_SKIP, queue_depth=DEFAULT_QUEUE_DEPTH, persist=True,
+                 next_due=None, stats=None):
+        if kind == KIND_INTERVAL:
+            if not interval or interval <= 0:
+                raise ValueError("Период задания должен быть больше 0")
+        elif kind == KIND_CRON:
+            self._cron = CronSpec(cron)
+        else:
+            raise ValueError(f"Неизвестный вид задания: {kind}")
+        if policy not in (POLICY_SKIP, POLICY_CATCH_UP):
+            raise ValueError(f"Неизвестная политика пропущенных запусков: {policy}")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Неизвестная политика перекрытия: {overlap}")
+        if queue_depth < 1:
+            raise ValueError("Глубина очереди должна быть не меньше 1")
+        self.job_id = job_id
+        self.kind = kind
+        self.interval = interval
+        self.anchor = anchor
+        self.cron = cron
+        self.runs = runs
+        self.policy = policy
+        self.catch_up_limit = catch_up_limit
+        self.recording = recording
+        self.repeat = repeat
+        self.speed = speed
+        self.overlap = overlap
+        self.queue_depth = queue_depth
+        self.persist = persist
+        self.next_due = next_due # Время на часах следующего запуска
+        self.stats = dict(EMPTY_STATS, **(stats or {}))
+        self.ticks = deque(maxlen=TICK_HISTORY) # {'due', 'outcome', 'delay'}; не сохраняется
+
+    def due_after(self, wall):
+        """Время на часах первого запуска строго позже wall"""
+        if self.kind == KIND_INTERVAL:
+            periods = int((wall - self.anchor) // self.interval) + 1
+            return self.anchor + max(periods, 0) * self.interval
+        return self._cron.next_after(datetime.fromtimestamp(wall)).timestamp()
+
+    def first_due(self, wall):
+        """Первый запуск после добавления в планировщик"""
+        if self.kind == KIND_INTERVAL:
+            if self.anchor is None:
+                self.anchor = wall
+            if self.anchor >= wall:
+                return self.anchor
+        return self.due_after(wall)
+
+    def _measure(self, name, value):
+        stats = self.stats
+        stats[name + '_sum'] += value
+        stats[name + '_last'] = value
+        if value > stats[name + '_max']:
+            stats[name + '_max'] = value
+
+    def record_fire(self, error):
+        """Учитывает срабатывание; error=None - догоняющий запуск после пропуска, в точность не входит"""
+        self.stats['fired'] += 1
+        if error is None:
+            self.stats['caught_up'] += 1
+            return
+        self.stats['measured'] += 1
+        self._measure('error', error)
+
+    def record_tick(self, due, outcome, delay=None):
+        """Учитывает исход запуска; delay - от момента по расписанию до фактического старта"""
+        if outcome in (TICK_STARTED, TICK_FAILED):
+            self.stats['started' if outcome == TICK_STARTED else 'failed'] += 1
+            if delay is not None:
+                self.stats['delayed'] += 1
+                self._measure('delay', delay)
+        else:
+            self.stats[outcome] += 1
+        self.ticks.append({'due': due, 'outcome': outcome, 'delay': delay})
+
+    @property
+    def mean_error(self):
+        measured = self.stats['measured']
+        return self.stats['error_sum'] / measured if measured else 0.0
+
+    @property
+    def mean_delay(self):
+        delayed = self.stats['delayed']
+        return self.stats['delay_sum'] / delayed if delayed else 0.0
+
+    @property
+    def finished(self):
+        return self.runs is not None and self.runs <= 0
+
+    def to_dict(self):
+        data = dict(vars(self))
+        data.pop('_cron', None)
+        data.pop('persist')
+        data.pop('ticks')
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class Scheduler:
+    """
+    Куча заданий по монотонному времени срабатывания.
+
+    Планировщик сам не ждет: владелец спрашивает next_wakeup(), засыпает
+    (например, однократным QTimer) и вызывает poll(). poll() вызывает
+    on_fire(job, error) для каждого наступившего запуска; on_fire
+    возвращает False, если запуск не состоялся (занято), и тогда
+    действует политика перекрытия задания. Освободившись, владелец
+    вызывает release(), чтобы запустить следующий запуск из очереди.
+
+    :param state_path: Файл для сохраняемых заданий (persist=True)
+    """
+
+    def __init__(self, on_fire, state_path=None, clock=time.perf_counter, wall=time.time):
+        self.on_fire = on_fire
+        self.state_path = state_path
+        self.clock = clock
+        self.wall = wall
+        self.jobs = {}
+        self._heap = [] # (монотонное время запуска, номер постановки, id задания)
+        self._sequence = 0
+        self._queued = {} # id задания -> номер его актуальной записи в куче
+        self._backlog = deque() # (время по расписанию, задание) - запуски, ждущие владельца
+        self._sync_clocks()
+        if state_path and os.path.exists(state_path):
+            self._load()
+
+    # --- Часы ---
+
+    def _sync_clocks(self):
+        self._clock_ref = self.clock()
+        self._wall_ref = self.wall()
+
+    def _to_clock(self, wall):
+        return self._clock_ref + (wall - self._wall_ref)
+
+    def _check_clock(self):
+        """Пересчитывает кучу, если часы ушли от монотонного времени (сон, перевод часов)"""
+        expected = self._wall_ref + (self.clock() - self._clock_ref)
+        if abs(self.wall() - expected) <= CLOCK_JUMP:
+            return False
+        log.warning("Часы сдвинулись на {:+.1f} с, расписание пересчитано.", self.wall() - expected)
+        self._sync_clocks()
+        self._heap = []
+        self._queued = {}
+        for job in self.jobs.values():
+            self._push(job)
+        return True
+
+    # --- Задания ---
+
+    def _push(self, job):
+        self._sequence += 1
+        self._queued[job.job_id] = self._sequence
+        heapq.heappush(self._heap, (self._to_clock(job.next_due), self._sequence, job.job_id))
+
+    def add(self, job):
+        """Добавляет (или заменяет) задание; возвращает время на часах первого запуска"""
+        if job.next_due is None:
+            job.next_due = job.first_due(self.wall())
+        self.jobs[job.job_id] = job
+        self._push(job)
+        if job.persist:
+            self.save()
+        return job.next_due
+
+    def remove(self, job_id):
+        """Снимает задание с расписания вместе с его запусками в очереди"""
+        job = self.jobs.pop(job_id, None)
+        self._queued.pop(job_id, None) # Запись в куче станет устаревшей и будет пропущена
+        self._backlog = deque(entry for entry in self._backlog if entry[1].job_id != job_id)
+        if job is not None and job.persist:
+            self.save()
+        return job
+
+    def pending(self, job_id=None):
+        """Сколько запусков (задания или всех) ждет в очереди"""
+        return sum(1 for _due, job in self._backlog if job_id is None or job.job_id == job_id)
+
+    def next_wakeup(self):
+        """Секунд до ближайшего запуска (0 - уже пора) или None, если заданий нет"""
+        while self._heap and self._queued.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap) # Удаленное или переставленное задание
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock())
+
+    def poll(self):
+        """Выполняет наступившие запуски; возвращает число вызовов on_fire"""
+        self._check_clock()
+        fired = 0
+        changed = False
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            due, sequence, job_id = heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is None or self._queued.get(job_id) != sequence:
+                continue
+            fired += self._run(job, now - due)
+            changed = changed or job.persist
+            if self.jobs.get(job_id) is not job:
+                pass # on_fire снял или заменил задание
+            elif job.finished:
+                del self.jobs[job_id]
+                del self._queued[job_id] # Его запуски в очереди еще выполнятся
+            else:
+                self._push(job)
+            now = self.clock()
+        if changed:
+            self.save()
+        return fired
+
+    def _run(self, job, error):
+        """Обрабатывает наступивший запуск задания и назначает следующий"""
+        if error > MISFIRE_GRACE:
+            # Сколько запусков пропущено, пока планировщик не мог их выполнить
+            wall_now = self.wall()
+            missed = 0
+            last_missed = due = job.next_due
+            while due <= wall_now and missed < 100000:
+                missed += 1
+                last_missed = due
+                due = job.due_after(due)
+            starts = 0 if job.policy == POLICY_SKIP else min(missed, job.catch_up_limit)
+            if job.runs is not None:
+                starts = min(starts, job.runs)
+            job.stats['missed'] += missed - starts
+            log.info("{}: пропущено запусков {}, выполняется {} ({}).", job.job_id, missed, starts, job.policy)
+            # Следующий запуск - первый по расписанию в будущем, а не подряд за пропущенными
+            # Догоняющие запуски отсчитывают задержку от последнего пропущенного момента
+            job.next_due = job.due_after(wall_now)
+            for _ in range(starts):
+                job.record_fire(None)
+                self._dispatch(job, last_missed, error)
+            return starts
+        job.record_fire(error)
+        log.debug("{}: срабатывание, опоздание {:.1f} мс (среднее {:.1f}, макс. {:.1f})", job.job_id,
+                  error * 1000, job.mean_error * 1000, job.stats['error_max'] * 1000)
+        due = job.next_due
+        job.next_due = job.due_after(due)
+        self._dispatch(job, due, error)
+        return 1
+
+    def _dispatch(self, job, due, error):
+        """Передает запуск владельцу; если тот занят - поступает по политике перекрытия"""
+        if self._start(job, due, error) is not False:
+            return # Запущен или не запустился из-за ошибки (учтен как failed): в очередь не ставится
+        pending = self.pending(job.job_id)
+        if job.overlap == OVERLAP_QUEUE and pending < job.queue_depth or \
+                job.overlap == OVERLAP_COALESCE and not pending:
+            self._backlog.append((due, job))
+            if job.runs is not None:
+                job.runs -= 1
+            job.stats['queue_max'] = max(job.stats['queue_max'], pending + 1)
+            job.record_tick(due, TICK_QUEUED)
+            log.info("{}: владелец занят, запуск в очереди ({}).", job.job_id, pending + 1)
+        elif job.overlap == OVERLAP_COALESCE:
+            job.record_tick(due, TICK_COALESCED)
+            log.info("{}: владелец занят, запуск слит с ожидающим.", job.job_id)
+        else:
+            job.record_tick(due, TICK_DROPPED)
+            log.info("{}: владелец занят, запуск пропущен (всего пропущено {}).", job.job_id,
+                     job.stats['dropped'])
+
+    def _start(self, job, due, error, queued=False):
+        """
+        Вызывает on_fire: True - запуск начался, False - владелец занят,
+        None - on_fire выбросил исключение (учтено как failed). Запуск из очереди runs уже израсходовал.
+        """
+        try:
+            started = self.on_fire(job, error) is not False
+        except Exception as e:
+            log.error("Ошибка запуска задания {}: {}", job.job_id, e)
+            started = None
+        if started is False:
+            return False
+        if job.runs is not None and not queued:
+            job.runs -= 1
+        job.record_tick(due, TICK_STARTED if started else TICK_FAILED, self.wall() - due)
+        return started
+
+    def report_failure(self, job_id, error):
+        """Запуск, который on_fire начал асинхронно (например, с загрузки записи), не состоялся"""
+        log.error("Ошибка запуска задания {}: {}", job_id, error)
+        job = self.jobs.get(job_id)
+        if job is None or not job.ticks or job.ticks[-1]['outcome'] != TICK_STARTED:
+            return
+        job.ticks[-1]['outcome'] = TICK_FAILED
+        job.stats['started'] -= 1
+        job.stats['failed'] += 1
+
+    def release(self):
+        """
+        Запускает самый ранний запуск из очереди, который владелец примет; True - запуск начался.
+
+        Запуски, которые не начались из-за ошибки, убираются из очереди, и пробуется следующий.
+        """
+        index = 0
+        while index < len(self._backlog):
+            due, job = self._backlog[index]
+            started = self._start(job, due, self.wall() - due, queued=True)
+            if started is False:
+                index += 1 # Владелец занят для этого задания - пробуем следующее
+                continue
+            del self._backlog[index]
+            if started:
+                delay = job.ticks[-1]['delay']
+                log.info("{}: запуск из очереди, задержка {:.1f} мс", job.job_id, delay * 1000)
+                return True
+        return False
+
+    # --- Файл состояния ---
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                raise ValueError(f"версия {state.get('version')}")
+            jobs = [ScheduledJob.from_dict(data) for data in state['jobs']]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("Не удалось прочитать {}: {}", self.state_path, e)
+            return
+        for job in jobs:
+            self.add(job)
+        log.info("Загружено заданий: {}", len(jobs))
+
+    def save(self):
+        """Сохраняет задания с persist=True (атомарно: временный файл и переименование)"""
+        if not self.state_path:
+            return
+        state = {'version': STATE_VERSION,
+                 'jobs': [job.to_dict() for job in self.jobs.values() if job.persist]}
+        tmp_path = self.state_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            log.warning("Не удалось сохранить {}: {}", self.state_path, e)
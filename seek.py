@@ -0,0 +1,137 @@
+"""
+Воспроизведение фрагмента записи: с момента start до момента end.
+
+rows_between() находит первую строку фрагмента двоичным поиском по меткам
+времени и не просматривает запись до неё:
+
+    ActionBuffer, MappedActions - bisect по колонке timestamps (index_at);
+    StreamedActions             - bisect с чтением меток из файла (index_at);
+    CompressedActions (v3)      - bisect по индексу блоков (iter_rows_from).
+
+Чтобы фрагмент, начатый с середины, воспроизводился как оригинал, перед
+первой строкой нужно нажать клавиши и кнопки, которые в момент start уже
+удерживались, а после end - отпустить удерживаемые, иначе они "залипнут".
+Это состояние дает HeldIndex: разреженный список только нажатий и
+отпусканий с контрольными точками состояния через каждые CHECKPOINT_INTERVAL
+таких строк, поэтому состояние в любой момент - копия ближайшей точки
+и не больше CHECKPOINT_INTERVAL шагов.
+"""
+import bisect
+import re
+import weakref
+from itertools import takewhile
+
+from actions import (ActionColumns, ordered_rows, KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE,
+                     KIND_KEY_PRESS, KIND_KEY_RELEASE)
+
+CHECKPOINT_INTERVAL = 1024
+
+_PRESS_KINDS = (KIND_MOUSE_PRESS, KIND_KEY_PRESS)
+_HELD_KINDS = frozenset((KIND_MOUSE_PRESS, KIND_MOUSE_RELEASE, KIND_KEY_PRESS, KIND_KEY_RELEASE))
+# Поиск строк нажатий/отпусканий в колонке kinds (байты) выполняется в C, а не циклом Python
+_HELD_PATTERN = re.compile(b'[' + bytes(sorted(_HELD_KINDS)) + b']')
+# Отпускание - следующий код после нажатия (MOUSE_PRESS -> MOUSE_RELEASE, KEY_PRESS -> KEY_RELEASE)
+_RELEASE_OF = {KIND_MOUSE_PRESS: KIND_MOUSE_RELEASE, KIND_KEY_PRESS: KIND_KEY_RELEASE}
+
+# Индексы по записям; пересчитываются, если запись выросла (живой буфер)
+_held_cache = weakref.WeakKeyDictionary()
+
+
+def rows_between(actions, start=None, end=None, stats=None):
+    """Строки записи по порядку времени с start <= timestamp <= end (None - без границы)"""
+    if start is None and end is None:
+        return ordered_rows(actions, stats=stats)
+    if not actions.is_sorted:
+        # Без порядка двоичный поиск невозможен: фильтруем упорядоченный поток
+        rows = ordered_rows(actions, stats=stats)
+        if start is not None:
+            rows = (row for row in rows if row[0] >= start)
+    elif start is None:
+        rows = actions.iter_rows()
+    elif hasattr(actions, 'iter_rows_from'):
+        rows = actions.iter_rows_from(start)
+    else:
+        rows = actions.iter_rows(start=actions.index_at(start))
+    if end is not None:
+        rows = takewhile(lambda row: row[0] <= end, rows)
+    return rows
+
+
+class HeldIndex:
+    """Нажатия и отпускания клавиш и кнопок записи с контрольными точками состояния"""
+
+    def __init__(self, actions):
+        rows = []
+        if isinstance(actions, ActionColumns):
+            # Колонки в памяти или mmap: строки кнопок и клавиш находим по байтам kinds
+            timestamps, kinds, xs, ys, codes = (actions.timestamps, actions.kinds, actions.xs,
+                                                actions.ys, actions.codes)
+            for match in _HELD_PATTERN.finditer(bytes(kinds)):
+                i = match.start()
+                rows.append((timestamps[i], kinds[i], xs[i], ys[i], codes[i]))
+            if not actions.is_sorted:
+                rows.sort(key=lambda row: row[0])
+        else:
+            # Потоковые источники читаются один раз целиком; индекс кэшируется
+            for timestamp, kind, x, y, _dx, _dy, code in ordered_rows(actions):
+                if kind in _HELD_KINDS:
+                    rows.append((timestamp, kind, x, y, code))
+        self.rows = rows
+        self.timestamps = [row[0] for row in rows]
+        self.checkpoints = []
+        held = {}
+        for i, row in enumerate(rows):
+            if i % CHECKPOINT_INTERVAL == 0:
+                self.checkpoints.append(dict(held))
+            _apply(held, row)
+
+    def held_at(self, timestamp, inclusive=False):
+        """
+        Нажатия, действующие в момент timestamp: {(тип, код): (timestamp, kind, x, y, code)}.
+
+        Учитываются строки с меткой меньше timestamp (inclusive=True - и равной).
+        """
+        if inclusive:
+            stop = bisect.bisect_right(self.timestamps, timestamp)
+        else:
+            stop = bisect.bisect_left(self.timestamps, timestamp)
+        if not self.checkpoints:
+            return {}
+        checkpoint = min(stop // CHECKPOINT_INTERVAL, len(self.checkpoints) - 1)
+        held = dict(self.checkpoints[checkpoint])
+        for row in self.rows[checkpoint * CHECKPOINT_INTERVAL:stop]:
+            _apply(held, row)
+        return held
+
+
+def _apply(held, row):
+    kind = row[1]
+    pressed = kind in _PRESS_KINDS
+    # Клавиши и кнопки с одинаковым кодом строки различаются типом
+    key = (kind if pressed else kind - 1, row[4])
+    if pressed:
+        held[key] = row
+    else:
+        held.pop(key, None)
+
+
+def held_index(actions):
+    """HeldIndex записи (кэшируется, пока запись существует и не изменилась)"""
+    cached = _held_cache.get(actions)
+    if cached is not None and cached[0] == len(actions):
+        return cached[1]
+    index = HeldIndex(actions)
+    _held_cache[actions] = (len(actions), index)
+    return index
+
+
+def prologue_rows(actions, start):
+    """Строки нажатий клавиш и кнопок, удерживаемых в момент start (воспроизводятся в start)"""
+    held = held_index(actions).held_at(start)
+    return [(start, kind, x, y, 0, 0, code) for _ts, kind, x, y, code in sorted(held.values())]
+
+
+def epilogue_rows(actions, end):
+    """Строки отпускания всего, что удерживается после строк с меткой end (воспроизводятся в end)"""
+    held = held_index(actions).held_at(end, inclusive=True)
+    return [(end, _RELEASE_OF[kind], x, y, 0, 0, code) for _ts, kind, x, y, code in sorted(held.values())]
@@ -0,0 +1,103 @@
+"""
+Онлайн-упрощение траектории мыши при записи.
+
+Слушатель мыши присылает движение на каждый пиксель, поэтому записи
+состоят в основном из избыточных mouse_move. MoveSimplifier отбрасывает
+точки, лежащие (с допуском tolerance_px) на отрезке между последней
+сохраненной точкой и текущей - как Рамер-Дуглас-Пекер, но в потоке,
+без всей траектории. Плеер не интерполирует движение между точками, поэтому
+max_interval ограничивает, как долго курсор может "стоять" между
+сохраненными точками: на быстрых участках сохраняется больше точек.
+
+Клики и прокрутка не проходят через упрощение и пишутся точно, а перед
+ними simplifier.flush() дописывает последнюю отложенную точку пути.
+"""
+
+# Сколько точек может ждать решения (ограничивает стоимость проверки одной точки)
+MAX_PENDING = 256
+
+
+class MoveSimplifier:
+    """
+    :param tolerance_px: Допустимое отклонение отброшенных точек от прямой, пиксели
+    :param max_interval: Максимальное время между сохраненными точками, секунды
+    """
+
+    def __init__(self, tolerance_px=1.0, max_interval=0.05):
+        self.tolerance_px = tolerance_px
+        self.max_interval = max_interval
+        self._anchor = None   # Последняя сохраненная точка (t, x, y)
+        self._pending = []    # Точки после якоря, которые пока можно отбросить
+        self.raw_count = 0    # Сколько движений пришло
+        self.kept_count = 0   # Сколько движений сохранено
+
+    def add(self, timestamp, x, y):
+        """
+        Принимает новое движение.
+
+        Возвращает список точек (t, x, y), которые нужно записать сейчас
+        (пустой, если точка отложена).
+        """
+        self.raw_count += 1
+        point = (timestamp, x, y)
+        if self._anchor is None:
+            return self._keep(point)
+        if self._pending and not self._fits(point):
+            # Новая точка не продолжает прямую: сохраняем предыдущую как новый якорь
+            kept = self._keep(self._pending[-1])
+            self._pending = [point]
+            return kept
+        self._pending.append(point)
+        return []
+
+    def flush(self):
+        """Сохраняет последнюю отложенную точку (перед кликом, прокруткой или при остановке)"""
+        if not self._pending:
+            return []
+        kept = self._keep(self._pending[-1])
+        self._pending = []
+        return kept
+
+    def reset(self):
+        self._anchor = None
+        self._pending = []
+        self.raw_count = 0
+        self.kept_count = 0
+
+    @property
+    def ratio(self):
+        """Коэффициент сжатия (во сколько раз меньше движений сохранено)"""
+        return self.raw_count / self.kept_count if self.kept_count else 1.0
+
+    def _keep(self, point):
+        self._anchor = point
+        self.kept_count += 1
+        return [point]
+
+    def _fits(self, point):
+        """Можно ли отбросить все отложенные точки, если следующей сохраненной станет point"""
+        if len(self._pending) >= MAX_PENDING:
+            return False
+        at, ax, ay = self._anchor
+        t, x, y = point
+        if t - at > self.max_interval:
+            return False
+        dx, dy = x - ax, y - ay
+        length_sq = dx * dx + dy * dy
+        tolerance = self.tolerance_px
+        if length_sq == 0:
+            # Курсор вернулся к якорю: отложенные точки должны быть не дальше допуска от него
+            return all((px - ax) ** 2 + (py - ay) ** 2 <= tolerance * tolerance
+                       for _pt, px, py in self._pending)
+        # Расстояние до прямой: |векторное произведение| / длина, сравниваем без корня
+        limit = tolerance * tolerance * length_sq
+        # Точка за концами отрезка (курсор ушел назад или дальше) - тоже излом
+        slack = tolerance * length_sq ** 0.5
+        for _pt, px, py in self._pending:
+            cross = dx * (py - ay) - dy * (px - ax)
+            if cross * cross > limit:
+                return False
+            projection = (px - ax) * dx + (py - ay) * dy
+            if projection < -slack or projection > length_sq + slack:
+                return False
+        return True
@@ -0,0 +1,42 @@
+"""
+Замер времени запуска GUI по фазам (python main.py --profile-startup).
+
+main.py отмечает конец каждой фазы (импорты, QApplication, построение окна,
+первый проход цикла событий), а после появления окна печатает отчет и
+завершает приложение. Модуль должен импортироваться первым и только из
+стандартной библиотеки, чтобы не искажать замер.
+"""
+import sys
+import time
+
+# Модули, которые не должны загружаться до первой записи/воспроизведения
+LAZY_MODULES = ('pynput',)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = [] # (название, длительность в секундах)
+
+    def mark(self, name):
+        """Отмечает конец фазы name (длительность - с предыдущей отметки)"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        width = max([len(name) for name, _ in self.phases] + [5])
+        lines = ["Профиль запуска:"]
+        for name, duration in self.phases:
+            lines.append(f"  {name:<{width}}  {duration * 1000:8.1f} мс")
+        lines.append(f"  {'Итого':<{width}}  {self.total() * 1000:8.1f} мс")
+        loaded = [name for name in LAZY_MODULES if name in sys.modules]
+        lines.append(f"  Загружены до первого действия: {', '.join(loaded) if loaded else 'нет'}")
+        return '\n'.join(lines)
+
+
+PROFILE = StartupProfile()
@@ -0,0 +1,319 @@
+"""
+Тесты планировщика (scheduler.py) на поддельных часах.
+
+Запуск: python -m unittest discover tests (или python -m pytest tests)
+"""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import applog
+from scheduler import (CronSpec, Scheduler, ScheduledJob, KIND_CRON, KIND_INTERVAL,
+                       POLICY_CATCH_UP, POLICY_SKIP, OVERLAP_COALESCE, OVERLAP_QUEUE, OVERLAP_SKIP,
+                       TICK_FAILED, TICK_STARTED)
+
+# Понедельник, 19.10.2026 12:00 (местное время, как и в CronSpec)
+START = datetime(2026, 10, 19, 12, 0).timestamp()
+
+
+class FakeClock:
+    """Монотонные часы и часы на стене, которые двигает тест"""
+
+    def __init__(self, wall=START):
+        self.now = 1000.0
+        self.wall_now = wall
+
+    def clock(self):
+        return self.now
+
+    def wall(self):
+        return self.wall_now
+
+    def advance(self, seconds):
+        """Обычный ход времени: идут и те, и другие часы"""
+        self.now += seconds
+        self.wall_now += seconds
+
+    def jump(self, seconds):
+        """Сон системы или перевод часов: сдвигаются только часы на стене"""
+        self.wall_now += seconds
+
+
+class FakeOwner:
+    """on_fire владельца: busy - занят, fail - id заданий, запуск которых выбрасывает исключение"""
+
+    def __init__(self):
+        self.busy = False
+        self.fail = set()
+        self.started = []
+
+    def on_fire(self, job, error):
+        if self.busy:
+            return False
+        if job.job_id in self.fail:
+            raise OSError("запись не найдена")
+        self.started.append(job.job_id)
+        return True
+
+
+def interval_job(job_id='job', interval=10, anchor=START, **kwargs):
+    return ScheduledJob(job_id, KIND_INTERVAL, interval=interval, anchor=anchor, **kwargs)
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        applog.configure(stream=False) # Сообщения планировщика тестам не нужны
+
+    def setUp(self):
+        self.time = FakeClock()
+        self.owner = FakeOwner()
+        self.scheduler = Scheduler(self.owner.on_fire, clock=self.time.clock, wall=self.time.wall)
+
+    def add(self, job):
+        self.scheduler.add(job)
+        return job
+
+
+class CronSpecTest(unittest.TestCase):
+
+    def test_weekdays_skip_weekend(self):
+        spec = CronSpec("30 9 * * 1-5")
+        friday = datetime(2026, 10, 23, 10, 0)
+        self.assertEqual(spec.next_after(friday), datetime(2026, 10, 26, 9, 30))
+
+    def test_next_is_strictly_later(self):
+        spec = CronSpec("*/15 * * * *")
+        self.assertEqual(spec.next_after(datetime(2026, 10, 19, 10, 15)), datetime(2026, 10, 19, 10, 30))
+        self.assertEqual(spec.next_after(datetime(2026, 10, 19, 10, 14, 59)), datetime(2026, 10, 19, 10, 15))
+
+    def test_month_rollover(self):
+        spec = CronSpec("0 0 1 1 *")
+        self.assertEqual(spec.next_after(datetime(2026, 10, 19)), datetime(2027, 1, 1))
+
+    def test_day_of_month_or_weekday(self):
+        # Заданы оба поля - подходит любое из условий: 1-е число или воскресенье
+        spec = CronSpec("0 8 1 * 0")
+        self.assertEqual(spec.next_after(datetime(2026, 10, 19)), datetime(2026, 10, 25, 8, 0))
+        self.assertEqual(spec.next_after(datetime(2026, 10, 26)), datetime(2026, 11, 1, 8, 0))
+
+    def test_sunday_as_seven(self):
+        self.assertEqual(CronSpec("0 0 * * 7").weekdays, {0})
+
+    def test_invalid(self):
+        for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "0 0 31 2 *"):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    CronSpec(expression).next_after(datetime(2026, 10, 19))
+
+
+class IntervalTest(SchedulerTestCase):
+
+    def test_anchored_runs(self):
+        job = self.add(interval_job(runs=3))
+        self.assertEqual(self.scheduler.next_wakeup(), 0.0)
+        self.assertEqual(self.scheduler.poll(), 1)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 10.0)
+        self.time.advance(9.5)
+        self.assertEqual(self.scheduler.poll(), 0)
+        self.time.advance(0.6)
+        self.assertEqual(self.scheduler.poll(), 1)
+        # Следующий момент - anchor + 2 * interval, опоздание не накапливается
+        self.assertEqual(job.next_due, START + 20)
+        self.time.advance(10)
+        self.scheduler.poll()
+        self.assertEqual(job.stats['started'], 3)
+        self.assertNotIn(job.job_id, self.scheduler.jobs)
+        self.assertIsNone(self.scheduler.next_wakeup())
+
+    def test_cron_job(self):
+        job = self.add(ScheduledJob('cron', KIND_CRON, cron="5 12 * * *"))
+        self.assertEqual(job.next_due, START + 300)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 300.0)
+        self.time.advance(300)
+        self.assertEqual(self.scheduler.poll(), 1)
+        self.assertEqual(job.next_due, START + 300 + 24 * 3600)
+
+
+class MissedRunTest(SchedulerTestCase):
+
+    def miss(self, policy, **kwargs):
+        job = self.add(interval_job(policy=policy, **kwargs))
+        self.scheduler.poll()
+        # Планировщик не опрашивался 35 с: пропущены запуски в 10, 20 и 30 с
+        self.time.advance(35)
+        fired = self.scheduler.poll()
+        return job, fired
+
+    def test_skip(self):
+        job, fired = self.miss(POLICY_SKIP)
+        self.assertEqual(fired, 0)
+        self.assertEqual(job.stats['missed'], 3)
+        self.assertEqual(self.owner.started, ['job'])
+        self.assertEqual(job.next_due, START + 40)
+
+    def test_catch_up(self):
+        job, fired = self.miss(POLICY_CATCH_UP, catch_up_limit=2)
+        self.assertEqual(fired, 2)
+        self.assertEqual(job.stats['missed'], 1)
+        self.assertEqual(job.stats['caught_up'], 2)
+        self.assertEqual(len(self.owner.started), 3)
+        # Догоняющие запуски в точность таймера не входят
+        self.assertEqual(job.stats['measured'], 1)
+        self.assertEqual(job.next_due, START + 40)
+
+    def test_catch_up_limited_by_runs(self):
+        job, fired = self.miss(POLICY_CATCH_UP, catch_up_limit=5, runs=2)
+        self.assertEqual(fired, 1)
+        self.assertEqual(job.stats['missed'], 2)
+        self.assertTrue(job.finished)
+
+
+class ClockJumpTest(SchedulerTestCase):
+
+    def test_jump_forward(self):
+        job = self.add(interval_job(interval=60))
+        self.scheduler.poll()
+        # Компьютер спал час: монотонные часы стояли, часы на стене ушли вперед
+        self.time.jump(3600)
+        # Сдвиг замечает только poll() (владелец просыпается не реже SCHEDULER_MAX_SLEEP_MS)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 60.0)
+        self.assertEqual(self.scheduler.poll(), 0)
+        self.assertEqual(job.stats['missed'], 60)
+        self.assertEqual(job.next_due, START + 3660)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 60.0)
+
+    def test_jump_backward(self):
+        job = self.add(interval_job(interval=60))
+        self.scheduler.poll()
+        self.time.advance(30)
+        # Часы переведены на час назад: запуск по расписанию - через полтора часа, а не через 30 с
+        self.time.jump(-3600)
+        self.time.advance(30)
+        self.assertEqual(self.scheduler.poll(), 0)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 3600.0)
+        self.assertEqual(job.stats['started'], 1)
+
+    def test_small_drift_ignored(self):
+        self.add(interval_job(interval=60))
+        self.scheduler.poll()
+        self.time.jump(1.5)
+        self.assertAlmostEqual(self.scheduler.next_wakeup(), 60.0)
+
+
+class OverlapTest(SchedulerTestCase):
+
+    def fire_busy(self, job, count):
+        """Выполняет count запусков подряд, пока владелец занят"""
+        self.owner.busy = True
+        for _ in range(count):
+            self.time.advance(job.interval)
+            self.scheduler.poll()
+        self.owner.busy = False
+
+    def test_skip(self):
+        job = self.add(interval_job(overlap=OVERLAP_SKIP, runs=5))
+        self.scheduler.poll()
+        self.fire_busy(job, 3)
+        self.assertEqual(job.stats['dropped'], 3)
+        self.assertEqual(self.scheduler.pending(), 0)
+        # Отброшенные запуски не расходуют runs
+        self.assertEqual(job.runs, 4)
+        self.assertFalse(self.scheduler.release())
+
+    def test_queue(self):
+        job = self.add(interval_job(overlap=OVERLAP_QUEUE, queue_depth=2, runs=10))
+        self.scheduler.poll()
+        self.fire_busy(job, 3)
+        self.assertEqual(job.stats['queued'], 2)
+        self.assertEqual(job.stats['dropped'], 1)
+        self.assertEqual(job.stats['queue_max'], 2)
+        self.assertEqual(job.runs, 7)
+        self.time.advance(1)
+        self.assertTrue(self.scheduler.release())
+        self.assertEqual(self.scheduler.pending('job'), 1)
+        # Задержка из очереди - от первого запуска в очереди (10 с) до старта
+        self.assertAlmostEqual(job.ticks[-1]['delay'], 21.0)
+        self.assertTrue(self.scheduler.release())
+        self.assertFalse(self.scheduler.release())
+        self.assertEqual(job.stats['started'], 3)
+        self.assertEqual(job.runs, 7)
+
+    def test_coalesce(self):
+        job = self.add(interval_job(overlap=OVERLAP_COALESCE))
+        self.scheduler.poll()
+        self.fire_busy(job, 4)
+        self.assertEqual(job.stats['queued'], 1)
+        self.assertEqual(job.stats['coalesced'], 3)
+        self.assertEqual(self.scheduler.pending(), 1)
+        self.assertTrue(self.scheduler.release())
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_release_busy_keeps_queue(self):
+        job = self.add(interval_job(overlap=OVERLAP_QUEUE))
+        self.scheduler.poll()
+        self.fire_busy(job, 1)
+        self.owner.busy = True
+        self.assertFalse(self.scheduler.release())
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_remove_drops_queued_runs(self):
+        job = self.add(interval_job(overlap=OVERLAP_QUEUE))
+        self.scheduler.poll()
+        self.fire_busy(job, 2)
+        self.scheduler.remove('job')
+        self.assertEqual(self.scheduler.pending(), 0)
+        self.assertIsNone(self.scheduler.next_wakeup())
+
+
+class FailedStartTest(SchedulerTestCase):
+
+    def test_failed_fire(self):
+        job = self.add(interval_job())
+        self.owner.fail.add('job')
+        self.assertEqual(self.scheduler.poll(), 1)
+        self.assertEqual(job.stats['failed'], 1)
+        self.assertEqual(job.stats['started'], 0)
+        # Ошибка - не занятость: запуск не ставится в очередь
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_release_skips_failed(self):
+        broken = self.add(interval_job('broken', overlap=OVERLAP_QUEUE))
+        good = self.add(interval_job('good', overlap=OVERLAP_QUEUE))
+        self.owner.busy = True
+        self.scheduler.poll()
+        self.owner.busy = False
+        self.assertEqual(self.scheduler.pending(), 2)
+        self.owner.fail.add('broken')
+        self.assertTrue(self.scheduler.release())
+        self.assertEqual(self.owner.started, ['good'])
+        self.assertEqual(broken.ticks[-1]['outcome'], TICK_FAILED)
+        self.assertEqual(good.ticks[-1]['outcome'], TICK_STARTED)
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_release_only_failed(self):
+        job = self.add(interval_job(overlap=OVERLAP_QUEUE))
+        self.owner.busy = True
+        self.scheduler.poll()
+        self.owner.busy = False
+        self.owner.fail.add('job')
+        # Запуск не начался - release не должен сообщать, что владелец снова занят
+        self.assertFalse(self.scheduler.release())
+        self.assertEqual(self.scheduler.pending(), 0)
+        self.assertEqual(job.stats['failed'], 1)
+
+    def test_report_failure(self):
+        job = self.add(interval_job())
+        self.scheduler.poll()
+        self.scheduler.report_failure('job', OSError("запись не найдена"))
+        self.assertEqual(job.stats['started'], 0)
+        self.assertEqual(job.stats['failed'], 1)
+        self.assertEqual(job.ticks[-1]['outcome'], TICK_FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Преобразование шкалы времени записи: ограничение и удаление пауз, турбо-режим.
+
+Пока пользователь думал, запись стоит на месте, а воспроизведение честно
+ждет каждую такую паузу в каждом повторе. speed_factor ускоряет всё
+одинаково, поэтому паузы обрабатываются отдельно:
+
+    GAP_CAP    - пауза длиннее max_gap сокращается до max_gap;
+    GAP_REMOVE - пауза длиннее max_gap удаляется целиком (короче - остается).
+
+Преобразование применяется к строкам один раз при компиляции
+(program.CompiledRecording): метки времени после паузы сдвигаются на
+накопленный выигрыш, и дальше Player работает с готовыми смещениями,
+ничего не проверяя на каждое событие.
+
+Турбо-режим (paced_rows) вообще не смотрит на записанные метки: строки
+идут одна за другой с шагом min_gap (0 - без ожидания, насколько успевает
+бэкенд), порядок действий сохраняется.
+
+Для предпросмотра общего времени GapProfile один раз собирает паузы
+длиннее MIN_GAP, сортирует их и считает префиксные суммы: выигрыш
+при любом max_gap - двоичный поиск, а не проход по записи.
+"""
+import bisect
+import weakref
+from itertools import accumulate
+
+import seek
+from actions import ActionColumns
+
+GAP_CAP = 'cap'
+GAP_REMOVE = 'remove'
+GAP_MODES = (GAP_CAP, GAP_REMOVE)
+
+# Самый короткий допустимый max_gap: паузы короче не считаются простоем
+MIN_GAP = 0.1
+
+# Профили по записям; пересчитываются, если запись выросла или изменился фрагмент
+_profile_cache = weakref.WeakKeyDictionary()
+
+
+def check_gap(max_gap, mode):
+    """Проверяет параметры преобразования (ValueError для неверных)"""
+    if max_gap is None:
+        return
+    if max_gap < MIN_GAP:
+        raise ValueError(f"Максимальная пауза не может быть меньше {MIN_GAP} с")
+    if mode not in GAP_MODES:
+        raise ValueError(f"Неизвестный режим пауз: {mode}")
+
+
+def cap_gaps(rows, max_gap, mode=GAP_CAP, origin=None):
+    """
+    Сдвигает метки времени строк так, чтобы паузы были не длиннее max_gap.
+
+    origin - момент, от которого отсчитывается первая пауза (начало
+    фрагмента); None - первая строка остается на месте.
+    """
+    kept = max_gap if mode == GAP_CAP else 0.0
+    shift = 0.0
+    previous = origin
+    for row in rows:
+        timestamp = row[0]
+        if previous is not None:
+            gap = timestamp - previous
+            if gap > max_gap:
+                shift += gap - kept
+        # Опоздавшие строки (вне окна упорядочивания) не отодвигают отсчет назад
+        if previous is None or timestamp > previous:
+            previous = timestamp
+        if shift:
+            row = (timestamp - shift,) + row[1:]
+        yield row
+
+
+def paced_rows(rows, min_gap=0.0, origin=None):
+    """Заменяет метки времени строк равномерным шагом min_gap от origin (или от первой строки)"""
+    for index, row in enumerate(rows):
+        if origin is None:
+            origin = row[0]
+        yield (origin + index * min_gap,) + row[1:]
+
+
+def _timestamps(actions, start, end):
+    if isinstance(actions, ActionColumns) and actions.is_sorted:
+        # Колонка меток читается срезом, без сборки строк
+        first = 0 if start is None else actions.index_at(start)
+        stop = len(actions) if end is None else bisect.bisect_right(actions.timestamps, end)
+        return actions.timestamps[first:stop]
+    return (row[0] for row in seek.rows_between(actions, start, end))
+
+
+def first_timestamp(actions, start=None):
+    """Момент, от которого отсчитывается фрагмент: start или метка первой строки (как в CompiledRecording)"""
+    if start is not None:
+        return start
+    for row in seek.rows_between(actions):
+        return row[0]
+    return 0.0
+
+
+class GapProfile:
+    """Паузы фрагмента записи длиннее MIN_GAP (по возрастанию) с префиксными суммами"""
+
+    def __init__(self, actions, start=None, end=None):
+        gaps = []
+        origin = previous = start
+        for timestamp in _timestamps(actions, start, end):
+            if previous is None:
+                origin = previous = timestamp
+                continue
+            gap = timestamp - previous
+            if gap > MIN_GAP:
+                gaps.append(gap)
+            if timestamp > previous:
+                previous = timestamp
+        gaps.sort()
+        self.gaps = gaps
+        self.sums = list(accumulate(gaps, initial=0.0))
+        # Длительность фрагмента без преобразования: от начала до последней строки
+        self.span = previous - origin if previous is not None else 0.0
+
+    def saved(self, max_gap, mode=GAP_CAP):
+        """На сколько секунд записи сокращается фрагмент"""
+        first = bisect.bisect_right(self.gaps, max_gap)
+        total = self.sums[-1] - self.sums[first]
+        if mode == GAP_CAP:
+            total -= max_gap * (len(self.gaps) - first)
+        return total
+
+    def duration(self, max_gap=None, mode=GAP_CAP):
+        """Длительность фрагмента в секундах записи после преобразования"""
+        if max_gap is None:
+            return self.span
+        return self.span - self.saved(max_gap, mode)
+
+
+def gap_profile(actions, start=None, end=None):
+    """GapProfile фрагмента (кэшируется, пока запись существует и не изменилась)"""
+    key = (len(actions), start, end)
+    cached = _profile_cache.get(actions)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    profile = GapProfile(actions, start, end)
+    _profile_cache[actions] = (key, profile)
+    return profile
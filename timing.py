@@ -0,0 +1,89 @@
+"""
+Стратегии ожидания для Player.
+
+Стратегия получает абсолютный момент (по time.perf_counter) и событие
+остановки и ждет до этого момента. Ожидание прерывается сразу, как только
+выставлено событие остановки, без опроса флага.
+"""
+import sys
+import time
+
+
+class SleepTimer:
+    """
+    Грубое ожидание через Event.wait (как раньше: без досыпания последней миллисекунды).
+
+    Почти не нагружает процессор, но точность ограничена разрешением
+    системного таймера (на Windows по умолчанию ~15.6 мс).
+    """
+
+    def __init__(self, threshold=0.001):
+        self.threshold = threshold
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def wait_until(self, deadline, stop_event):
+        """Ждет до deadline. Возвращает False, если ожидание прервано остановкой"""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.threshold:
+            return not stop_event.wait(remaining)
+        return not stop_event.is_set()
+
+
+class HybridTimer:
+    """
+    Гибридное ожидание: грубый сон до deadline - spin, затем активное ожидание по perf_counter.
+
+    Сон идет через stop_event.wait, поэтому остановка будит поток сразу.
+    На последних spin секундах поток крутится на perf_counter: это стоит
+    процессора, но убирает джиттер планировщика ОС для плотных траекторий мыши.
+    """
+
+    def __init__(self, spin=0.002):
+        self.spin = spin
+        self._period_set = False
+
+    def start(self):
+        """Вызывается перед воспроизведением: на Windows поднимает разрешение системного таймера до 1 мс"""
+        if sys.platform == 'win32' and not self._period_set:
+            try:
+                import ctypes
+                self._period_set = ctypes.windll.winmm.timeBeginPeriod(1) == 0
+            except Exception:
+                self._period_set = False
+
+    def stop(self):
+        """Вызывается после воспроизведения: возвращает разрешение системного таймера"""
+        if self._period_set:
+            try:
+                import ctypes
+                ctypes.windll.winmm.timeEndPeriod(1)
+            except Exception:
+                pass
+            self._period_set = False
+
+    def wait_until(self, deadline, stop_event):
+        """Ждет до deadline. Возвращает False, если ожидание прервано остановкой"""
+        perf_counter = time.perf_counter
+        remaining = deadline - perf_counter()
+        if remaining > self.spin:
+            if stop_event.wait(remaining - self.spin):
+                return False
+        # Досыпаем остаток активным ожиданием; флаг остановки проверяется каждую итерацию
+        while perf_counter() < deadline:
+            if stop_event.is_set():
+                return False
+        return not stop_event.is_set()
+
+
+def make_timer(name):
+    """Создает стратегию ожидания по имени ('hybrid' или 'sleep')"""
+    if name == 'hybrid':
+        return HybridTimer()
+    if name == 'sleep':
+        return SleepTimer()
+    raise ValueError(f"Неизвестная стратегия ожидания: {name}")